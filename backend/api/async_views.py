@@ -0,0 +1,41 @@
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def render_view(view, request, *args, **kwargs):
+    """Выполняет синхронное представление DRF и рендерит ответ."""
+    close_old_connections()
+    metrics = getattr(request, 'metrics', None)
+    try:
+        with metrics.track() if metrics else nullcontext():
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                if metrics:
+                    metrics.start_render()
+                    response.add_post_render_callback(metrics.finish_render)
+                response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_view(viewset, actions):
+    """Асинхронное представление для действий чтения вьюсета.
+
+    В Django 3.2 нет асинхронного ORM, а синхронные представления под
+    ASGI выполняются по очереди в одном общем потоке. Здесь
+    представление вместе с рендерингом уходит в пул потоков, поэтому
+    медленные запросы к БД не блокируют остальные.
+    """
+    view = viewset.as_view(actions)
+
+    async def handler(request, *args, **kwargs):
+        return await sync_to_async(render_view, thread_sensitive=False)(
+            view, request, *args, **kwargs
+        )
+
+    handler.csrf_exempt = True
+    handler.cls = viewset
+    return handler
@@ -0,0 +1,111 @@
+from collections import Counter
+from hashlib import sha256
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from backend.constants import TOKEN_CACHE_REVOKED_TIMEOUT
+
+TOKEN_KEY = 'auth:token:{digest}'
+REVOKED = 'revoked'
+
+
+class TokenCache:
+    """Кеш пользователей по ключу токена в общем кеше Django.
+
+    Кеш включается настройкой TOKEN_CACHE_ALIAS, алиас должен указывать
+    на кеш, общий для всех процессов: сброс записи должен быть сразу
+    виден каждому воркеру. Без алиаса пользователь всегда читается из
+    БД.
+
+    Запись, прочитанная из БД до сброса, не должна вернуться в кеш после
+    него: сброс оставляет метку отзыва, которую не перезаписывает
+    cache.add.
+    """
+
+    def __init__(self, timeout, alias=None):
+        self.timeout = timeout
+        self.alias = alias
+        self.lock = Lock()
+        self.counters = Counter()
+
+    @property
+    def enabled(self):
+        return bool(self.alias)
+
+    @staticmethod
+    def cache_key(key):
+        return TOKEN_KEY.format(digest=sha256(key.encode()).hexdigest())
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def get(self, key):
+        user = caches[self.alias].get(self.cache_key(key))
+        if user == REVOKED:
+            user = None
+        self.count('misses' if user is None else 'hits')
+        return user
+
+    def set(self, key, user):
+        caches[self.alias].add(self.cache_key(key), user, self.timeout)
+
+    def invalidate(self, *keys):
+        if not self.enabled or not keys:
+            return
+        caches[self.alias].set_many(
+            {self.cache_key(key): REVOKED for key in keys},
+            TOKEN_CACHE_REVOKED_TIMEOUT
+        )
+        self.count('invalidations', len(keys))
+
+    def invalidate_user(self, user_id):
+        if self.enabled:
+            self.invalidate(*Token.objects.filter(
+                user_id=user_id
+            ).values_list('key', flat=True))
+
+    def stats(self):
+        with self.lock:
+            return dict(hits=self.counters['hits'],
+                        misses=self.counters['misses'],
+                        invalidations=self.counters['invalidations'])
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_TIMEOUT,
+                         settings.TOKEN_CACHE_ALIAS or None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запросов к БД при попадании в кеш.
+
+    Записи сбрасываются при удалении токена (в том числе при выходе
+    через djoser) и при сохранении пользователя, то есть при смене
+    пароля и деактивации. QuerySet.update сигналов не отправляет,
+    такие изменения видны после TOKEN_CACHE_TIMEOUT.
+    """
+
+    cache_status = None
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None and self.cache_status:
+            metrics.auth_cache = self.cache_status
+        return result
+
+    def authenticate_credentials(self, key):
+        if not token_cache.enabled:
+            return super().authenticate_credentials(key)
+        user = token_cache.get(key)
+        if user is not None:
+            self.cache_status = 'hit'
+            return user, Token(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user)
+        self.cache_status = 'miss'
+        return user, token
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from hashlib import md5
+from threading import Lock
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from backend.constants import CATALOG_CACHE_SIZE
+from recipes.catalog import get_catalog_version, now_version
+
+
+class CatalogCacheMixin:
+    """Кеширование ответов справочников по версии каталога.
+
+    Ответы получают ETag и Last-Modified, условные запросы обрабатываются
+    без обращения к БД, а сериализованные данные хранятся в памяти до
+    следующего изменения каталога. Ставится перед ReplicaReadMixin.
+
+    Ключ ответа — действие, id объекта и значения filter_query_params;
+    остальные параметры запроса на ответ не влияют и в ключ не входят.
+    В памяти хранятся только ответы без фильтров, не больше
+    CATALOG_CACHE_SIZE на класс, давно не запрошенные вытесняются.
+    """
+
+    authentication_classes = ()
+    cached_actions = ('list', 'retrieve')
+    filter_query_params = ()
+    catalog_cache = OrderedDict()
+    catalog_cache_version = None
+    catalog_cache_lock = Lock()
+
+    def get_cached_data(self, version, key):
+        cls = type(self)
+        with cls.catalog_cache_lock:
+            if cls.catalog_cache_version != version:
+                cls.catalog_cache = OrderedDict()
+                cls.catalog_cache_version = version
+            data = cls.catalog_cache.get(key)
+            if data is not None:
+                cls.catalog_cache.move_to_end(key)
+            return data
+
+    def set_cached_data(self, version, key, data):
+        cls = type(self)
+        with cls.catalog_cache_lock:
+            if cls.catalog_cache_version == version:
+                cls.catalog_cache[key] = data
+                if len(cls.catalog_cache) > CATALOG_CACHE_SIZE:
+                    cls.catalog_cache.popitem(last=False)
+
+    def get_cache_key(self, request, kwargs):
+        return (self.action_map.get('get'),
+                kwargs.get(self.lookup_url_kwarg or self.lookup_field),
+                tuple(request.GET.get(name, '')
+                      for name in self.filter_query_params))
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    def use_replica(self, request):
+        """Свежие изменения справочника читаются с основной БД.
+
+        Иначе данные реплики, отстающей от версии каталога, попали бы в
+        кеш под новой версией.
+        """
+        age = now_version() - get_catalog_version()
+        return (age > settings.REPLICA_STICKY_SECONDS * 1_000_000
+                and super().use_replica(request))
+
+    def dispatch(self, request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD')
+                or self.action_map.get('get') not in self.cached_actions):
+            return super().dispatch(request, *args, **kwargs)
+        version = get_catalog_version()
+        self.cache_key = self.get_cache_key(request, kwargs)
+        digest = md5(repr(self.cache_key).encode()).hexdigest()
+        etag = quote_etag(f'{version}-{digest}')
+        last_modified = version // 1_000_000
+        not_modified = get_conditional_response(request, etag=etag,
+                                                last_modified=last_modified)
+        if not_modified is not None:
+            return self.set_validators(not_modified, etag, last_modified)
+        self.catalog_version = version
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve,
+                                    request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if any(self.cache_key[2]):
+            return handler(request, *args, **kwargs)
+        data = self.get_cached_data(self.catalog_version, self.cache_key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            data = response.data
+            self.set_cached_data(self.catalog_version, self.cache_key, data)
+        return Response(data)
@@ -0,0 +1,126 @@
+import csv
+import json
+import os
+from functools import lru_cache
+from io import BytesIO, StringIO
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+from backend.constants import (PDF_FONT_SIZE, PDF_LINE_HEIGHT, PDF_MARGIN,
+                               SHOPPING_CART_CHUNK_SIZE)
+
+PDF_FALLBACK_FONT = 'Helvetica'
+PDF_FONT_NAME = 'ShoppingCartFont'
+
+
+@lru_cache(maxsize=None)
+def get_pdf_font():
+    """Шрифт с кириллицей, если он есть, иначе стандартный Helvetica."""
+    font_path = settings.SHOPPING_CART_PDF_FONT
+    if not font_path or not os.path.exists(font_path):
+        return PDF_FALLBACK_FONT
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    return PDF_FONT_NAME
+
+
+def build_pdf(lines):
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=A4)
+    font = get_pdf_font()
+    _, height = A4
+    y = height - PDF_MARGIN
+    canvas.setFont(font, PDF_FONT_SIZE)
+    for line in lines:
+        if y < PDF_MARGIN:
+            canvas.showPage()
+            canvas.setFont(font, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        canvas.drawString(PDF_MARGIN, y, line)
+        y -= PDF_LINE_HEIGHT
+    canvas.save()
+    return buffer.getvalue()
+
+
+def greeting(user):
+    return f'Здравствуйте, {user}, это foodgram, ваш список покупок:'
+
+
+def text_lines(user, items):
+    yield greeting(user) + '\n'
+    for name, unit, amount in items:
+        yield f'\n{name} ({unit}) - {amount}'
+
+
+def csv_lines(user, items):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    yield buffer.getvalue()
+    for row in items:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def json_lines(user, items):
+    user_json = json.dumps(str(user), ensure_ascii=False)
+    yield f'{{"user": {user_json}, "ingredients": ['
+    separator = ''
+    for name, unit, amount in items:
+        yield separator + json.dumps(
+            {'name': name, 'measurement_unit': unit, 'amount': amount},
+            ensure_ascii=False
+        )
+        separator = ', '
+    yield ']}'
+
+
+def pdf_lines(user, items):
+    yield greeting(user)
+    yield ''
+    for name, unit, amount in items:
+        yield f'{name} ({unit}) - {amount}'
+
+
+STREAMED_FORMATS = {
+    'txt': text_lines,
+    'csv': csv_lines,
+    'json': json_lines,
+}
+
+
+def export_shopping_cart(user, queryset, export_format, content_type):
+    """Отдает список покупок файлом.
+
+    Текст, CSV и JSON передаются потоком и не собираются в памяти. PDF
+    reportlab строит целиком: таблица перекрестных ссылок пишется в
+    конец файла. Его размер ограничен справочником — в списке покупок
+    не больше одной строки на ингредиент, — поэтому PDF отдается
+    обычным ответом с Content-Length.
+
+    queryset должен возвращать кортежи (название, единица, количество).
+    """
+    items = queryset.iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
+    if export_format in STREAMED_FORMATS:
+        response = StreamingHttpResponse(
+            (chunk.encode() for chunk
+             in STREAMED_FORMATS[export_format](user, items)),
+            content_type=f'{content_type}; charset=utf-8'
+        )
+    else:
+        content = build_pdf(pdf_lines(user, items))
+        response = HttpResponse(content, content_type=content_type)
+        response['Content-Length'] = len(content)
+    filename = f'shopping_cart_{user}.{export_format}'
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_cart.{export_format}"; '
+        f"filename*=UTF-8''{quote(filename)}"
+    )
+    return response
@@ -0,0 +1,60 @@
+from rest_framework import serializers
+
+from recipes.images import DEFAULT_EXTENSION, variant_url
+
+
+class RecipeImageField(serializers.Field):
+    """Абсолютный URL нужного варианта картинки рецепта.
+
+    Без явного варианта в списках отдается card, в одиночном рецепте —
+    full.
+    """
+
+    def __init__(self, variant=None, extension=DEFAULT_EXTENSION, **kwargs):
+        self.variant = variant
+        self.extension = extension
+        kwargs.update(source='*', read_only=True)
+        super().__init__(**kwargs)
+
+    def get_variant(self):
+        if self.variant:
+            return self.variant
+        in_list = isinstance(self.parent.parent, serializers.ListSerializer)
+        return 'card' if in_list else 'full'
+
+    def to_representation(self, recipe):
+        url = variant_url(recipe, self.get_variant(), self.extension)
+        request = self.context.get('request')
+        if url is None or request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+
+class CatalogRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField, читающий объекты из context['catalog'].
+
+    Родительский сериализатор заранее загружает все упомянутые объекты,
+    поэтому поле не делает запросов, а ошибки остаются у своего
+    элемента.
+    """
+
+    def to_internal_value(self, data):
+        catalog = self.context.get('catalog')
+        if catalog is None:
+            return super().to_internal_value(data)
+        pk = catalog_pk(data)
+        if pk is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = catalog.get(self.queryset.model, {}).get(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+def catalog_pk(data):
+    if isinstance(data, bool) or not isinstance(data, (int, str)):
+        return None
+    try:
+        return int(data)
+    except ValueError:
+        return None
@@ -1,8 +1,12 @@
+from django.db import connections
 from rest_framework.filters import SearchFilter
-from django_filters import FilterSet, ModelMultipleChoiceFilter
+from django_filters import (CharFilter, ChoiceFilter, FilterSet,
+                            ModelMultipleChoiceFilter)
 from django_filters.rest_framework import BooleanFilter
 
 from recipes.models import Recipe, Tag
+from recipes.popularity import popular_recipes
+from recipes.search import search_recipes
 
 
 class NameSearchFilter(SearchFilter):
@@ -17,7 +21,18 @@ class RecipeFilter(FilterSet):
     )
     is_favorited = BooleanFilter(field_name='is_favorited')
     is_in_shopping_cart = BooleanFilter(field_name='is_in_shopping_cart')
+    search = CharFilter(method='filter_search')
+    ordering = ChoiceFilter(choices=(('popular', 'Популярные'),),
+                            method='filter_ordering')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search', 'ordering')
+
+    def filter_search(self, queryset, name, value):
+        queryset = search_recipes(queryset, value, connections[queryset.db])
+        return queryset.order_by('-search_rank', '-pub_date', '-id')
+
+    def filter_ordering(self, queryset, name, value):
+        return popular_recipes(queryset)
@@ -1,8 +1,192 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from backend.constants import PAGINATION_PAGE_SIZE
+from recipes.feed import sources as feed_sources
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = PAGINATION_PAGE_SIZE
     page_size_query_param = "limit"
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу сортировки без OFFSET и COUNT.
+
+    Курсор хранит значения полей ordering последнего (или первого)
+    объекта страницы, поэтому стоимость запроса не зависит от глубины.
+    Результаты полнотекстового поиска сначала сортируются по search_rank,
+    популярные рецепты — по popularity_score.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = PAGINATION_PAGE_SIZE
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def encode_cursor(self, values, reverse):
+        data = json.dumps({'v': values, 'r': reverse},
+                          default=lambda value: value.isoformat())
+        cursor = urlsafe_b64encode(data.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   cursor)
+
+    @staticmethod
+    def get_ordering_field(queryset, name):
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    def decode_cursor(self, request, queryset):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(cursor.encode()))
+            values, reverse = data['v'], bool(data['r'])
+        except (BinasciiError, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        position = []
+        for field, value in zip(self.ordering, values):
+            if value is None or isinstance(value, (dict, list)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                position.append(self.get_ordering_field(
+                    queryset, field.lstrip('-')
+                ).to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def invert(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}'
+                     for field in ordering)
+
+    @staticmethod
+    def keyset_filter(ordering, values):
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def get_position(self, instance):
+        return [getattr(instance, field.lstrip('-'))
+                for field in self.ordering]
+
+    def ordered_slice(self, queryset, ordering, position, reverse, limit):
+        if reverse:
+            ordering = self.invert(ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+        return queryset[:limit]
+
+    def fetch(self, queryset, position, reverse, limit):
+        return list(self.ordered_slice(queryset, self.ordering, position,
+                                       reverse, limit))
+
+    def get_ordering(self, queryset):
+        if 'popularity_score' in queryset.query.annotations:
+            return ('-popularity_score', '-id')
+        if 'search_rank' in queryset.query.annotations:
+            return ('-search_rank', *type(self).ordering)
+        return type(self).ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, queryset)
+        self.request = request
+        page = self.fetch(queryset, position, reverse, page_size + 1)
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        if reverse:
+            page.reverse()
+        has_next, has_previous = (
+            (position is not None, has_more) if reverse
+            else (has_more, position is not None)
+        )
+        self.next_link = (self.encode_cursor(self.get_position(page[-1]),
+                                             False)
+                          if has_next and page else None)
+        if has_previous and page:
+            self.previous_link = self.encode_cursor(
+                self.get_position(page[0]), True
+            )
+        elif has_previous:
+            self.previous_link = replace_query_param(
+                self.base_url, self.cursor_query_param, ''
+            )
+        else:
+            self.previous_link = None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
+
+
+class FeedPagination(KeysetPagination):
+    """Пагинация ленты по ключу с объединением нескольких источников.
+
+    Из каждого источника ленты берутся ключи (pub_date, id) следующей
+    страницы, ключи объединяются, после чего рецепты страницы
+    загружаются одним запросом.
+    """
+
+    def fetch(self, queryset, position, reverse, limit):
+        keys = set()
+        for source, ordering in feed_sources(self.request.user):
+            keys.update(self.ordered_slice(
+                source, ordering, position, reverse, limit
+            ).values_list(*(field.lstrip('-') for field in ordering)))
+        keys = sorted(keys, reverse=not reverse)[:limit]
+        recipes = queryset.in_bulk([recipe_id for _, recipe_id in keys])
+        return [recipes[recipe_id] for _, recipe_id in keys
+                if recipe_id in recipes]
+
+
+class RecipePagination(CustomPageNumberPagination):
+    """Постраничная пагинация или, при наличии ?cursor, пагинация по ключу."""
+
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
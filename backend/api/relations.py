@@ -0,0 +1,72 @@
+from django.db import models
+from rest_framework import serializers
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+
+class ViewerRelations:
+    """Подписки, избранное и список покупок текущего пользователя.
+
+    Связи подгружаются одним запросом на всю страницу и дальше
+    читаются из памяти.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.subscriptions = set()
+        self.favorites = set()
+        self.shopping_cart = set()
+        self.loaded_authors = set()
+        self.loaded_recipes = set()
+
+    def load(self, author_ids=(), recipe_ids=()):
+        if not self.user.is_authenticated:
+            return
+        author_ids = set(author_ids) - self.loaded_authors
+        if author_ids:
+            self.subscriptions.update(Follow.objects.filter(
+                user=self.user, author__in=author_ids
+            ).values_list('author_id', flat=True))
+            self.loaded_authors |= author_ids
+        recipe_ids = set(recipe_ids) - self.loaded_recipes
+        if recipe_ids:
+            self.favorites.update(Favorite.objects.filter(
+                user=self.user, recipe__in=recipe_ids
+            ).values_list('recipe_id', flat=True))
+            self.shopping_cart.update(ShoppingCart.objects.filter(
+                user=self.user, recipe__in=recipe_ids
+            ).values_list('recipe_id', flat=True))
+            self.loaded_recipes |= recipe_ids
+
+    def is_subscribed(self, author_id):
+        self.load(author_ids=(author_id,))
+        return author_id in self.subscriptions
+
+    def is_favorited(self, recipe_id):
+        self.load(recipe_ids=(recipe_id,))
+        return recipe_id in self.favorites
+
+    def is_in_shopping_cart(self, recipe_id):
+        self.load(recipe_ids=(recipe_id,))
+        return recipe_id in self.shopping_cart
+
+
+def get_relations(context):
+    request = context.get('request')
+    if 'relations' not in context:
+        context['relations'] = ViewerRelations(request.user)
+    return context['relations']
+
+
+class RelationsListSerializer(serializers.ListSerializer):
+    """Перед сериализацией страницы загружает связи для всех объектов."""
+
+    def to_representation(self, data):
+        instances = list(
+            data.all() if isinstance(data, models.Manager) else data
+        )
+        if self.context.get('request'):
+            self.child.load_relations(get_relations(self.context),
+                                      instances)
+        return super().to_representation(instances)
@@ -0,0 +1,37 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .exports import build_pdf
+
+
+def as_text(data):
+    if isinstance(data, dict) and 'detail' in data:
+        return str(data['detail'])
+    return str(data)
+
+
+class PlainTextRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return as_text(data).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFRenderer(BaseRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return build_pdf([as_text(data)])
+
+
+SHOPPING_CART_RENDERERS = (PlainTextRenderer, CSVRenderer,
+                           JSONRenderer, PDFRenderer)
@@ -0,0 +1,37 @@
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from backend.routers import (is_pinned_to_primary, pin_to_primary,
+                             replica_reads)
+
+
+class ReplicaReadMixin:
+    """Чтение безопасных запросов с реплик.
+
+    После успешной записи пользователь на REPLICA_STICKY_SECONDS
+    закрепляется за основной БД, чтобы сразу видеть свои изменения.
+    """
+
+    replica_token = None
+
+    def use_replica(self, request):
+        return not (request.user.is_authenticated
+                    and is_pinned_to_primary(request.user.pk))
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (settings.DATABASE_REPLICAS
+                and request.method in SAFE_METHODS
+                and self.use_replica(request)):
+            self.replica_token = replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.replica_token is not None:
+            replica_reads.reset(self.replica_token)
+            self.replica_token = None
+        if (settings.DATABASE_REPLICAS
+                and request.method not in SAFE_METHODS
+                and request.user.is_authenticated
+                and response.status_code < 400):
+            pin_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,35 +1,33 @@
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
+
+from django.db import models, transaction
+from django.db.models import prefetch_related_objects
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
-from rest_framework.status import HTTP_400_BAD_REQUEST
 from rest_framework.validators import ValidationError
 
-from backend.constants import MIN_VALUE, MAX_P_INT_VALUE
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
-from users.models import Follow, User
+from backend.constants import (BULK_RELATIONS_LIMIT, MIN_VALUE,
+                               MAX_P_INT_VALUE)
+from recipes.catalog import catalog_objects
+from recipes.fragments import get_fragments, invalidate_recipe_fragment
+from recipes.images import content_hash, schedule_image_processing
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.queries import latest_recipes
+from recipes.shopping_list import apply_recipe_delta
+from recipes.similar import schedule_similar_update
+from users.models import User
+from .fields import CatalogRelatedField, RecipeImageField, catalog_pk
+from .relations import RelationsListSerializer, get_relations
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
+    image = RecipeImageField('thumbnail')
+    image_webp = RecipeImageField('thumbnail', 'webp')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
-
-
-class ShoppingFavoriteAbstractSerializer(serializers.ModelSerializer):
-    def validate(self, data):
-        if self.Meta.model.objects.filter(
-                user=data.get('user'),
-                recipe=data.get('recipe')
-        ).exists():
-            raise ValidationError(
-                detail='Выбранный рецепт уже есть в '
-                       f'{self.Meta.model.__name__}.',
-                code=HTTP_400_BAD_REQUEST)
-        return data
-
-    def to_representation(self, instance):
-        return RecipeShortSerializer(instance.recipe,
-                                     context=self.context).data
+        fields = ('id', 'name', 'image', 'image_webp', 'cooking_time')
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -37,9 +35,12 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
-        return (request
-                and request.user.is_authenticated
-                and request.user.follower.filter(author=obj).exists())
+        return bool(request
+                    and get_relations(self.context).is_subscribed(obj.id))
+
+    @staticmethod
+    def load_relations(relations, instances):
+        relations.load(author_ids=[user.id for user in instances])
 
     class Meta:
         model = User
@@ -51,6 +52,7 @@ class UserSerializer(serializers.ModelSerializer):
             'last_name',
             'is_subscribed',
         )
+        list_serializer_class = RelationsListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -77,15 +79,53 @@ class RecipeIngredientGetSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipeFragmentSerializer(serializers.ModelSerializer):
+    ingredients = RecipeIngredientGetSerializer(
+        source='recipe_ingredient',
+        many=True
+    )
+    tags = TagSerializer(many=True)
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'tags', 'ingredients', 'name', 'text', 'cooking_time')
+
+
+def render_fragments(recipes):
+    prefetch_related_objects(recipes, 'tags', 'recipe_ingredient__ingredient')
+    return {
+        fragment['id']: fragment for fragment
+        in RecipeFragmentSerializer(recipes, many=True).data
+    }
+
+
+class RecipeListSerializer(RelationsListSerializer):
+    def to_representation(self, data):
+        instances = list(
+            data.all() if isinstance(data, models.Manager) else data
+        )
+        self.child.load_fragments(instances)
+        return super().to_representation(instances)
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
+    """Рецепт из кешированного фрагмента и полей текущего пользователя.
+
+    Теги, ингредиенты и текст берутся из кеша фрагментов, а автор,
+    картинка и флаги избранного и списка покупок вычисляются на каждый
+    запрос.
+    """
+
     ingredients = RecipeIngredientGetSerializer(
         source='recipe_ingredient',
         many=True
     )
     tags = TagSerializer(many=True)
     author = UserSerializer()
-    is_favorited = serializers.BooleanField(default=0)
-    is_in_shopping_cart = serializers.BooleanField(default=0)
+    image = RecipeImageField()
+    image_webp = RecipeImageField(extension='webp')
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -93,15 +133,60 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             'id', 'tags',
             'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image',
+            'name', 'image', 'image_webp',
             'text', 'cooking_time'
         )
+        list_serializer_class = RecipeListSerializer
+
+    def load_fragments(self, instances):
+        fragments = self.context.setdefault('recipe_fragments', {})
+        missing = [recipe for recipe in instances
+                   if recipe.id not in fragments]
+        if missing:
+            metrics = getattr(self.context.get('request'), 'metrics', None)
+            fragments.update(get_fragments(
+                missing, render_fragments, getattr(metrics, 'fragments', None)
+            ))
+
+    def to_representation(self, instance):
+        self.load_fragments((instance,))
+        fragment = self.context['recipe_fragments'][instance.id]
+        data = OrderedDict()
+        for name in self.Meta.fields:
+            if name in fragment:
+                data[name] = fragment[name]
+                continue
+            field = self.fields[name]
+            attribute = field.get_attribute(instance)
+            data[name] = (None if attribute is None
+                          else field.to_representation(attribute))
+        return data
+
+    def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        return bool(self.context.get('request')
+                    and get_relations(self.context).is_favorited(obj.id))
+
+    def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        return bool(
+            self.context.get('request')
+            and get_relations(self.context).is_in_shopping_cart(obj.id)
+        )
+
+    @staticmethod
+    def load_relations(relations, instances):
+        relations.load(
+            author_ids=[recipe.author_id for recipe in instances],
+            recipe_ids=[recipe.id for recipe in instances
+                        if not hasattr(recipe, 'is_favorited')]
+        )
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = CatalogRelatedField(queryset=Ingredient.objects.all())
     amount = serializers.IntegerField(error_messages={
         'invalid': 'Введено неверное число.',
         'max_value':
@@ -121,7 +206,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 class RecipeCreateSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
     ingredients = RecipeIngredientSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = CatalogRelatedField(
         queryset=Tag.objects.all(),
         many=True,
         required=True
@@ -150,6 +235,31 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return RecipeGetSerializer(instance,
                                    context=self.context).data
 
+    @staticmethod
+    def load_catalog(data):
+        """Все упомянутые теги и ингредиенты, не больше запроса на модель."""
+        tags = (data.getlist('tags') if hasattr(data, 'getlist')
+                else data.get('tags'))
+        ingredients = data.get('ingredients')
+        ids = {
+            Tag: tags if isinstance(tags, list) else [],
+            Ingredient: [item.get('id') for item in ingredients
+                         if isinstance(item, Mapping)]
+            if isinstance(ingredients, list) else [],
+        }
+        return {
+            model: catalog_objects.get_many(
+                model, {pk for pk in map(catalog_pk, values)
+                        if pk is not None}
+            )
+            for model, values in ids.items()
+        }
+
+    def to_internal_value(self, data):
+        if isinstance(data, Mapping):
+            self.context['catalog'] = self.load_catalog(data)
+        return super().to_internal_value(data)
+
     @staticmethod
     def add_recipes_ingredients_tags(recipe, ingredients, tags):
         recipe.tags.set(tags)
@@ -166,14 +276,81 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
         self.add_recipes_ingredients_tags(recipe, ingredients, tags)
+        invalidate_recipe_fragment(recipe)
+        schedule_image_processing(recipe)
+        schedule_similar_update(recipe.id)
         return recipe
 
+    @staticmethod
+    def update_recipe_tags(recipe, tags):
+        current = set(recipe.tags.values_list('id', flat=True))
+        new = {tag.id for tag in tags}
+        if current - new:
+            recipe.tags.remove(*(current - new))
+        if new - current:
+            recipe.tags.add(*(new - current))
+        return current != new
+
+    @staticmethod
+    def update_recipe_ingredients(recipe, ingredients):
+        """Меняет только отличающиеся строки ингредиентов рецепта.
+
+        Возвращает изменение количества по ингредиентам.
+        """
+        amounts = {item['id'].id: item['amount'] for item in ingredients}
+        delta = defaultdict(int)
+        changed, removed = [], []
+        for row in RecipeIngredient.objects.filter(recipe=recipe):
+            amount = amounts.pop(row.ingredient_id, None)
+            if amount is None:
+                removed.append(row.id)
+            elif amount != row.amount:
+                changed.append(row)
+            delta[row.ingredient_id] += (amount or 0) - row.amount
+            row.amount = amount
+        if removed:
+            RecipeIngredient.objects.filter(id__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        if amounts:
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient_id=ingredient,
+                                 amount=amount)
+                for ingredient, amount in amounts.items()
+            )
+        for ingredient, amount in amounts.items():
+            delta[ingredient] += amount
+        return {ingredient: n for ingredient, n in delta.items() if n}
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.add_recipes_ingredients_tags(instance, ingredients, tags)
-        return super().update(instance, validated_data)
+        validated_data.pop('author', None)
+        image = validated_data.get('image')
+        if image is not None and instance.image_hash:
+            image.seek(0)
+            if content_hash(image.read()) == instance.image_hash:
+                del validated_data['image']
+            image.seek(0)
+        if 'image' in validated_data:
+            validated_data['image_hash'] = ''
+        fields = [name for name, value in validated_data.items()
+                  if getattr(instance, name) != value]
+        tags_changed = self.update_recipe_tags(instance, tags)
+        delta = self.update_recipe_ingredients(instance, ingredients)
+        apply_recipe_delta(instance.id, delta)
+        if fields:
+            for name in fields:
+                setattr(instance, name, validated_data[name])
+            instance.save(update_fields=fields)
+        elif tags_changed or delta:
+            invalidate_recipe_fragment(instance)
+        if 'image' in fields:
+            schedule_image_processing(instance)
+        if delta:
+            schedule_similar_update(instance.id)
+        return instance
 
     def validate(self, data):
         tags = data.get('tags')
@@ -204,20 +381,24 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return value
 
 
-class FavoriteSerializer(ShoppingFavoriteAbstractSerializer):
-    class Meta:
-        model = Favorite
-        fields = ('user', 'recipe')
+class FollowListSerializer(RelationsListSerializer):
+    def to_representation(self, data):
+        instances = list(
+            data.all() if isinstance(data, models.Manager) else data
+        )
+        self.child.load_recipes(instances)
+        return super().to_representation(instances)
 
 
-class ShoppingCartSerializer(ShoppingFavoriteAbstractSerializer):
-    class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe')
+class FollowGetSerializer(UserSerializer):
+    """Автор с превью рецептов для страницы подписок.
 
+    Рецепты всех авторов страницы загружаются одним запросом с
+    ROW_NUMBER() OVER (PARTITION BY author_id), число рецептов берется
+    из счетчика recipes_count.
+    """
 
-class FollowGetSerializer(UserSerializer):
-    recipes_count = serializers.ReadOnlyField(source='recipes.count')
+    recipes_count = serializers.ReadOnlyField()
     recipes = serializers.SerializerMethodField()
 
     class Meta:
@@ -228,41 +409,38 @@ class FollowGetSerializer(UserSerializer):
             'last_name', 'is_subscribed',
             'recipes', 'recipes_count'
         )
+        list_serializer_class = FollowListSerializer
 
-    def get_recipes(self, obj):
+    def get_recipes_limit(self):
         request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        queryset = obj.recipes.all()
-        if recipes_limit:
-            try:
-                queryset = queryset[:int(recipes_limit)]
-            except ValueError:
-                pass
+        try:
+            limit = int(request.query_params['recipes_limit'])
+        except (AttributeError, KeyError, ValueError):
+            return None
+        return limit if limit >= 0 else None
+
+    def load_recipes(self, authors):
+        previews = self.context.setdefault('recipe_previews', {})
+        author_ids = [author.id for author in authors
+                      if author.id not in previews]
+        if author_ids:
+            for author_id in author_ids:
+                previews[author_id] = []
+            for recipe in latest_recipes(author_ids,
+                                         self.get_recipes_limit()):
+                previews[recipe.author_id].append(recipe)
+
+    def get_recipes(self, obj):
+        self.load_recipes((obj,))
         return RecipeShortSerializer(
-            queryset, context=self.context, many=True
+            self.context['recipe_previews'][obj.id],
+            context=self.context, many=True
         ).data
 
 
-class FollowPostSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Follow
-        fields = ('user', 'author')
-
-    def to_representation(self, instance):
-        return FollowGetSerializer(instance.author,
-                                   context=self.context).data
-
-    def validate(self, data):
-        user = data.get('user')
-        author = data.get('author')
-        if user == author:
-            raise ValidationError(
-                detail='Самоподписка запрещена.',
-                code=HTTP_400_BAD_REQUEST)
-        if Follow.objects.filter(
-                author=author,
-                user=user).exists():
-            raise ValidationError(
-                detail='Подписка на этого пользователя уже существует.',
-                code=HTTP_400_BAD_REQUEST)
-        return data
+class IdListSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_RELATIONS_LIMIT
+    )
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import runpy
+from unittest import mock
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase
+
+from backend.middleware import RequestMetricsMiddleware
+from recipes.tests.utils import (create_ingredients, create_recipe,
+                                 create_tags, create_user)
+
+GUNICORN_CONFIG = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+SHARED_CACHE = 'django.core.cache.backends.memcached.PyMemcacheCache'
+
+
+class RequestMetricsMiddlewareTests(TransactionTestCase):
+
+    def test_sync_chain(self):
+        middleware = RequestMetricsMiddleware(lambda request: HttpResponse())
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+        response = middleware(RequestFactory().get('/api/tags/'))
+        self.assertIn('Server-Timing', response)
+
+    def test_async_chain(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = asyncio.run(middleware(RequestFactory().get('/api/tags/')))
+        self.assertIn('Server-Timing', response)
+
+
+class AsyncViewsTests(TransactionTestCase):
+    """Асинхронные эндпоинты отдают то же, что синхронные."""
+
+    def setUp(self):
+        author = create_user('author')
+        tags = create_tags(2)
+        ingredients = create_ingredients(3)
+        self.recipe = create_recipe(author, ingredients, tags)
+
+    async def assert_same(self, path):
+        expected = await asyncio.to_thread(self.client.get, f'/api/{path}')
+        response = await self.async_client.get(f'/api/async/{path}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected.json())
+
+    async def test_endpoints(self):
+        for path in ('recipes/', f'recipes/{self.recipe.id}/', 'tags/',
+                     'ingredients/', 'ingredients/?name=инг', 'users/'):
+            with self.subTest(path=path):
+                await self.assert_same(path)
+
+
+class GunicornConfigTests(TransactionTestCase):
+
+    def load_config(self, **environment):
+        with mock.patch.dict(os.environ, environment):
+            return runpy.run_path(GUNICORN_CONFIG)
+
+    def test_single_worker_by_default(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('GUNICORN_WORKERS', None)
+            self.assertEqual(runpy.run_path(GUNICORN_CONFIG)['workers'], 1)
+
+    def test_several_workers_require_shared_cache(self):
+        with self.assertRaises(RuntimeError):
+            self.load_config(GUNICORN_WORKERS='3', CACHE_BACKEND='')
+        config = self.load_config(GUNICORN_WORKERS='3',
+                                  CACHE_BACKEND=SHARED_CACHE)
+        self.assertEqual(config['workers'], 3)
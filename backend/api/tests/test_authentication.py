@@ -0,0 +1,62 @@
+from unittest import mock
+
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from recipes.tests.utils import FoodgramTestCase, create_user
+
+
+class TokenCacheTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('user')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def me(self):
+        return self.client.get('/api/users/me/').status_code
+
+    def enable_cache(self):
+        patcher = mock.patch.object(token_cache, 'alias', 'default')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assert_cached(self):
+        self.assertEqual(self.me(), 200)
+        hits = token_cache.stats()['hits']
+        self.assertEqual(self.me(), 200)
+        self.assertEqual(token_cache.stats()['hits'], hits + 1)
+
+    def test_disabled_without_alias(self):
+        self.assertFalse(token_cache.enabled)
+        hits = token_cache.stats()['hits']
+        self.assertEqual(self.me(), 200)
+        self.assertEqual(self.me(), 200)
+        self.assertEqual(token_cache.stats()['hits'], hits)
+
+    def test_logout(self):
+        self.enable_cache()
+        self.assert_cached()
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.me(), 401)
+
+    def test_token_deleted(self):
+        self.enable_cache()
+        self.assert_cached()
+        self.token.delete()
+        self.assertEqual(self.me(), 401)
+
+    def test_user_deactivated(self):
+        self.enable_cache()
+        self.assert_cached()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.me(), 401)
+
+    def test_entry_read_before_invalidation_is_not_stored(self):
+        self.enable_cache()
+        token_cache.invalidate(self.token.key)
+        token_cache.set(self.token.key, self.user)
+        self.assertIsNone(token_cache.get(self.token.key))
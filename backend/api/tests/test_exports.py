@@ -0,0 +1,96 @@
+import csv
+import json
+from io import StringIO
+
+from recipes.tests.utils import (FoodgramTestCase, create_ingredients,
+                                 create_recipe, create_user)
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingCartExportTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.ingredients = create_ingredients(3)
+        cls.recipe = create_recipe(cls.user, cls.ingredients)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def add_to_cart(self):
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def download(self, export_format=None, **headers):
+        query = f'?format={export_format}' if export_format else ''
+        response = self.client.get(f'{URL}{query}', **headers)
+        self.assertEqual(response.status_code, 200)
+        content = (b''.join(response.streaming_content)
+                   if response.streaming else response.content)
+        return response, content
+
+    def assert_attachment(self, response, extension):
+        self.assertIn(f'filename="shopping_cart.{extension}"',
+                      response['Content-Disposition'])
+
+    def test_empty_cart(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 204)
+
+    def test_text(self):
+        self.add_to_cart()
+        response, content = self.download('txt')
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assert_attachment(response, 'txt')
+        lines = content.decode().splitlines()
+        self.assertIn('user', lines[0])
+        self.assertEqual(
+            lines[2:],
+            [f'{ingredient.name} (г) - 10' for ingredient in self.ingredients]
+        )
+
+    def test_csv(self):
+        self.add_to_cart()
+        response, content = self.download('csv')
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assert_attachment(response, 'csv')
+        rows = list(csv.reader(StringIO(content.decode())))
+        self.assertEqual(
+            rows[0], ['Ингредиент', 'Единица измерения', 'Количество']
+        )
+        self.assertEqual(rows[1:], [[ingredient.name, 'г', '10']
+                                    for ingredient in self.ingredients])
+
+    def test_json(self):
+        self.add_to_cart()
+        response, content = self.download('json')
+        self.assertTrue(response.streaming)
+        self.assert_attachment(response, 'json')
+        data = json.loads(content)
+        self.assertEqual(data['user'], str(self.user))
+        self.assertEqual(data['ingredients'], [
+            {'name': ingredient.name, 'measurement_unit': 'г', 'amount': 10}
+            for ingredient in self.ingredients
+        ])
+
+    def test_pdf(self):
+        self.add_to_cart()
+        response, content = self.download('pdf')
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assert_attachment(response, 'pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(content))
+
+    def test_format_from_accept_header(self):
+        self.add_to_cart()
+        response, content = self.download(HTTP_ACCEPT='text/csv')
+        self.assert_attachment(response, 'csv')
+        self.assertTrue(content.decode().startswith('Ингредиент,'))
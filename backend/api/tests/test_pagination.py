@@ -0,0 +1,51 @@
+import json
+from base64 import urlsafe_b64encode
+
+from recipes.tests.utils import FoodgramTestCase, create_recipe, create_user
+
+RECIPES_COUNT = 5
+
+
+def make_cursor(data):
+    return urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+class KeysetPaginationTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.recipe_ids = [create_recipe(author, name=f'Рецепт {number}').id
+                          for number in range(RECIPES_COUNT)]
+
+    def test_pages_cover_all_recipes(self):
+        url = '/api/recipes/?cursor=&limit=2'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, sorted(self.recipe_ids, reverse=True))
+
+    def test_previous_page(self):
+        first = self.client.get('/api/recipes/?cursor=&limit=2').data
+        second = self.client.get(first['next']).data
+        previous = self.client.get(second['previous']).data
+        self.assertEqual(previous['results'], first['results'])
+
+    def test_invalid_cursor(self):
+        cursors = (
+            'not-base64!',
+            make_cursor([1, 2]),
+            make_cursor({'v': ['2024-01-01T00:00:00'], 'r': 0}),
+            make_cursor({'v': [{}, None], 'r': 0}),
+            make_cursor({'v': [None, 1], 'r': 0}),
+            make_cursor({'v': ['2024-01-01T00:00:00', [1]], 'r': 0}),
+            make_cursor({'v': ['вчера', 1], 'r': 0}),
+            make_cursor({'v': ['2024-01-01T00:00:00', 'один'], 'r': 0}),
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/api/recipes/?cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
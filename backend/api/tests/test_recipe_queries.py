@@ -0,0 +1,180 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, ShoppingCart
+from recipes.tests.utils import (FoodgramTestCase, create_ingredients,
+                                 create_recipe, create_tags, create_user)
+from users.models import User
+
+RECIPES_COUNT = 8
+CROWD_SIZE = 10000
+BATCH_SIZE = 1000
+
+
+class RecipeQueriesTests(FoodgramTestCase):
+    """Число запросов к БД не зависит от размера страницы и отметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.other = create_user('other')
+        tags = create_tags(2)
+        ingredients = create_ingredients(3)
+        cls.recipes = [
+            create_recipe(cls.other if number % 2 else cls.user,
+                          ingredients, tags, name=f'Рецепт {number}')
+            for number in range(RECIPES_COUNT)
+        ]
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def assert_list_constant(self):
+        small, _ = self.count_queries('/api/recipes/?limit=2')
+        large, response = self.count_queries(
+            f'/api/recipes/?limit={RECIPES_COUNT}'
+        )
+        self.assertEqual(len(response.data['results']), RECIPES_COUNT)
+        self.assertEqual(small, large)
+        return large
+
+    def mark_recipes(self, user):
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(model(user=user, recipe=recipe)
+                                      for recipe in self.recipes)
+
+    def test_anonymous_list(self):
+        before = self.assert_list_constant()
+        self.mark_recipes(self.other)
+        self.assertEqual(self.assert_list_constant(), before)
+
+    def test_authenticated_list(self):
+        self.client.force_authenticate(self.user)
+        before = self.assert_list_constant()
+        self.mark_recipes(self.user)
+        self.mark_recipes(self.other)
+        self.assertEqual(self.assert_list_constant(), before)
+        _, response = self.count_queries('/api/recipes/')
+        self.assertTrue(all(recipe['is_favorited']
+                            and recipe['is_in_shopping_cart']
+                            for recipe in response.data['results']))
+
+    def assert_detail_constant(self, user=None):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.id}/'
+        before, response = self.count_queries(url)
+        self.assertFalse(response.data['is_favorited'])
+        self.mark_recipes(self.other)
+        if user is not None:
+            Favorite.objects.create(user=user, recipe=recipe)
+        after, response = self.count_queries(url)
+        self.assertEqual(before, after)
+        self.assertEqual(response.data['is_favorited'], user is not None)
+
+    def test_anonymous_detail(self):
+        self.assert_detail_constant()
+
+    def test_authenticated_detail(self):
+        self.client.force_authenticate(self.user)
+        self.assert_detail_constant(self.user)
+
+
+class ManyUsersTests(FoodgramTestCase):
+    """Отметки 10 000 других пользователей не влияют на выдачу и план."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.recipes = [create_recipe(cls.user, name=f'Рецепт {number}')
+                       for number in range(RECIPES_COUNT)]
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[:3]
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[:2]
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def add_crowd(self):
+        User.objects.bulk_create(
+            (User(email=f'crowd{number}@example.com',
+                  username=f'crowd{number}', first_name='Имя',
+                  last_name='Фамилия', password='!')
+             for number in range(CROWD_SIZE)),
+            batch_size=BATCH_SIZE
+        )
+        crowd = list(User.objects.filter(
+            username__startswith='crowd'
+        ).values_list('id', flat=True))
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                (model(user_id=user_id,
+                       recipe=self.recipes[number % RECIPES_COUNT])
+                 for number, user_id in enumerate(crowd)),
+                batch_size=BATCH_SIZE
+            )
+
+    def counts(self):
+        counts = {}
+        for query in ('', '?is_favorited=1', '?is_in_shopping_cart=1'):
+            response = self.client.get(f'/api/recipes/{query}')
+            self.assertEqual(response.status_code, 200)
+            counts[query] = (response.data['count'],
+                             len(response.data['results']))
+        return counts
+
+    def test_counts_do_not_grow(self):
+        before = self.counts()
+        self.assertEqual(before['?is_favorited=1'], (3, 3))
+        self.assertEqual(before['?is_in_shopping_cart=1'], (2, 2))
+        self.add_crowd()
+        self.assertEqual(Favorite.objects.count(), CROWD_SIZE + 3)
+        self.assertEqual(self.counts(), before)
+
+    def list_query(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/recipes/')
+        return next(query['sql'] for query in context.captured_queries
+                    if 'recipes_favorite' in query['sql']
+                    and 'COUNT(*)' not in query['sql'])
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}'
+                           if connection.vendor == 'sqlite'
+                           else f'EXPLAIN {sql}')
+            return [row[-1] if connection.vendor == 'sqlite' else row[0]
+                    for row in cursor.fetchall()]
+
+    @skipUnless(connection.vendor in ('sqlite', 'postgresql'),
+                'Проверяется план SQLite и PostgreSQL')
+    def test_relation_annotations_use_index(self):
+        self.add_crowd()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        plan = self.explain(self.list_query())
+        if connection.vendor == 'sqlite':
+            subqueries = [step for step in plan if ' U0 ' in step]
+            self.assertEqual(len(subqueries), 2, plan)
+            for step in subqueries:
+                self.assertTrue(step.startswith('SEARCH'), plan)
+                self.assertIn('recipe_id=?', step)
+        else:
+            text = '\n'.join(plan)
+            for table in ('recipes_favorite', 'recipes_shoppingcart'):
+                self.assertNotIn(f'Seq Scan on {table}', text)
+                self.assertRegex(text, rf'Index (Only )?Scan using \S+ on '
+                                       rf'{table}')
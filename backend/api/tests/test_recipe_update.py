@@ -0,0 +1,113 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe, RecipeIngredient
+from recipes.tests.utils import (FoodgramTestCase, create_ingredients,
+                                 create_recipe, create_tags, create_user)
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class RecipeDiffUpdateTests(FoodgramTestCase):
+    """Изменение рецепта пишет только отличающиеся строки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = create_tags(3)
+        cls.ingredients = create_ingredients(3)
+        cls.recipe = create_recipe(cls.author, cls.ingredients[:2],
+                                   cls.tags[:2])
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def rows(self):
+        return dict(RecipeIngredient.objects.filter(
+            recipe=self.recipe
+        ).values_list('ingredient_id', 'id'))
+
+    def amounts(self):
+        return dict(RecipeIngredient.objects.filter(
+            recipe=self.recipe
+        ).values_list('ingredient_id', 'amount'))
+
+    def tag_ids(self):
+        return set(self.recipe.tags.values_list('id', flat=True))
+
+    def patch(self, ingredients, tags):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(f'/api/recipes/{self.recipe.id}/', {
+                'name': self.recipe.name,
+                'text': self.recipe.text,
+                'cooking_time': self.recipe.cooking_time,
+                'tags': [tag.id for tag in tags],
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': amount}
+                    for ingredient, amount in ingredients
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in context.captured_queries
+                if query['sql'].startswith(WRITES)]
+
+    def test_unchanged_patch_writes_nothing(self):
+        rows = self.rows()
+        version = self.recipe.version
+        writes = self.patch(
+            [(ingredient, 10) for ingredient in self.ingredients[:2]],
+            self.tags[:2]
+        )
+        self.assertEqual(writes, [])
+        self.assertEqual(self.rows(), rows)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.version, version)
+
+    def test_only_changed_rows_written(self):
+        first, second, third = self.ingredients
+        kept = self.rows()[first.id]
+        version = self.recipe.version
+        writes = self.patch([(first, 10), (second, 25), (third, 5)],
+                            self.tags[1:])
+        ingredient_writes = [sql for sql in writes
+                             if 'recipes_recipeingredient' in sql]
+        self.assertEqual(len(ingredient_writes), 2)
+        self.assertTrue(ingredient_writes[0].startswith('UPDATE'))
+        self.assertTrue(ingredient_writes[1].startswith('INSERT'))
+        self.assertEqual(self.rows()[first.id], kept)
+        self.assertEqual(self.amounts(),
+                         {first.id: 10, second.id: 25, third.id: 5})
+        self.assertEqual(self.tag_ids(), {tag.id for tag in self.tags[1:]})
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.version, version)
+
+    def test_removed_rows_deleted(self):
+        first, second, _ = self.ingredients
+        kept = self.rows()[second.id]
+        writes = self.patch([(second, 10)], self.tags[:2])
+        ingredient_writes = [sql for sql in writes
+                             if 'recipes_recipeingredient' in sql]
+        self.assertEqual(len(ingredient_writes), 1)
+        self.assertTrue(ingredient_writes[0].startswith('DELETE'))
+        self.assertEqual(self.rows(), {second.id: kept})
+
+    def test_update_atomic(self):
+        amounts, tags = self.amounts(), self.tag_ids()
+        with mock.patch('api.serializers.apply_recipe_delta',
+                        side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.client.patch(f'/api/recipes/{self.recipe.id}/', {
+                'name': 'Новое название',
+                'text': self.recipe.text,
+                'cooking_time': self.recipe.cooking_time,
+                'tags': [self.tags[2].id],
+                'ingredients': [{'id': self.ingredients[2].id,
+                                 'amount': 50}],
+            }, format='json')
+        self.assertEqual(self.amounts(), amounts)
+        self.assertEqual(self.tag_ids(), tags)
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).name,
+                         self.recipe.name)
@@ -0,0 +1,113 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import override_settings
+from rest_framework.test import APITransactionTestCase
+
+from backend.routers import ReplicaRouter, replica_health, replica_reads
+from recipes.models import Favorite
+from recipes.tests.utils import create_recipe, create_user
+
+REPLICA = 'replica_test'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Реплика — копия файла SQLite')
+class ReplicaTestCase(APITransactionTestCase):
+    """Основная БД и реплика — два файла SQLite.
+
+    Реплика копируется с основной БД, после чего основная БД меняется,
+    то есть реплика отстает.
+    """
+
+    def setUp(self):
+        cache.clear()
+        replica_health.checked.clear()
+        executor = mock.patch('recipes.tasks.executor', None)
+        executor.start()
+        self.addCleanup(executor.stop)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        self.old = create_recipe(self.author, name='Старый')
+        self.add_replica(self.replica_path())
+        self.new = create_recipe(self.author, name='Новый')
+
+    def replica_path(self):
+        return os.path.join(self.directory, 'replica.sqlite3')
+
+    def add_replica(self, path):
+        if os.path.isdir(os.path.dirname(path)):
+            connection.ensure_connection()
+            with sqlite3.connect(path) as target:
+                connection.connection.backup(target)
+            target.close()
+        connections.databases[REPLICA] = {
+            **connections.databases[DEFAULT_DB_ALIAS], 'NAME': path
+        }
+        replicas = override_settings(DATABASE_REPLICAS=[REPLICA])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        self.addCleanup(self.remove_replica)
+
+    @staticmethod
+    def remove_replica():
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+
+    def recipe_names(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return {recipe['name'] for recipe in response.data['results']}
+
+
+class ReplicaRoutingTests(ReplicaTestCase):
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Favorite), DEFAULT_DB_ALIAS)
+        token = replica_reads.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Favorite), REPLICA)
+        finally:
+            replica_reads.reset(token)
+        self.assertEqual(router.db_for_write(Favorite), DEFAULT_DB_ALIAS)
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.recipe_names(), {'Старый'})
+        self.client.force_authenticate(self.reader)
+        self.assertEqual(self.recipe_names(), {'Старый'})
+
+    def test_read_after_write_goes_to_primary(self):
+        self.client.force_authenticate(self.reader)
+        response = self.client.post(f'/api/recipes/{self.new.id}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.recipe_names(), {'Старый', 'Новый'})
+        response = self.client.get(f'/api/recipes/{self.new.id}/')
+        self.assertTrue(response.data['is_favorited'])
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.recipe_names(), {'Старый'})
+
+
+class ReplicaFallbackTests(ReplicaTestCase):
+    """Недоступная реплика: чтение идет с основной БД."""
+
+    def replica_path(self):
+        return os.path.join(self.directory, 'missing', 'replica.sqlite3')
+
+    def test_router(self):
+        token = replica_reads.set(True)
+        try:
+            self.assertEqual(ReplicaRouter().db_for_read(Favorite),
+                             DEFAULT_DB_ALIAS)
+        finally:
+            replica_reads.reset(token)
+
+    def test_reads_go_to_primary(self):
+        self.assertEqual(self.recipe_names(), {'Старый', 'Новый'})
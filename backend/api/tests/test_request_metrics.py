@@ -0,0 +1,50 @@
+import json
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from backend.middleware import QueryBudgetExceeded
+from recipes.tests.utils import (FoodgramTestCase, create_ingredients,
+                                 create_recipe, create_user)
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/?format=csv'
+DOWNLOAD_BUDGET = 'GET recipes-download-shopping-cart'
+
+
+class StreamingMetricsTests(FoodgramTestCase):
+    """Запросы при отдаче потокового ответа попадают в метрики."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.recipe = create_recipe(cls.user, create_ingredients(3))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+
+    def download(self):
+        response = self.client.get(DOWNLOAD_URL)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_stream_queries_logged(self):
+        with self.assertLogs('backend.requests', 'INFO') as logs, \
+                CaptureQueriesContext(connection) as context:
+            response = self.client.get(DOWNLOAD_URL)
+            self.assertEqual(logs.records, [])
+            b''.join(response.streaming_content)
+        record, = logs.records
+        self.assertEqual(json.loads(record.getMessage())['queries'],
+                         len(context))
+
+    def test_budget_checked_after_stream(self):
+        with override_settings(QUERY_BUDGETS={DOWNLOAD_BUDGET: 1}):
+            with self.assertLogs('backend.requests', 'WARNING') as logs:
+                self.download()
+            self.assertIn(DOWNLOAD_BUDGET, logs.output[0])
+            with override_settings(QUERY_BUDGETS_STRICT=True), \
+                    self.assertRaises(QueryBudgetExceeded):
+                self.download()
@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework import routers
 
+from .async_views import async_view
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
 router = routers.DefaultRouter()
@@ -11,7 +12,26 @@ router.register(r'ingredients',
 router.register(r'tags', TagViewSet, basename='tags')
 router.register(r'users', UserViewSet, basename='users')
 
+async_urlpatterns = [
+    path('recipes/', async_view(RecipeViewSet, {'get': 'list'}),
+         name='async-recipes-list'),
+    path('recipes/<int:pk>/', async_view(RecipeViewSet, {'get': 'retrieve'}),
+         name='async-recipes-detail'),
+    path('tags/', async_view(TagViewSet, {'get': 'list'}),
+         name='async-tags-list'),
+    path('tags/<int:pk>/', async_view(TagViewSet, {'get': 'retrieve'}),
+         name='async-tags-detail'),
+    path('ingredients/', async_view(IngredientViewSet, {'get': 'list'}),
+         name='async-ingredients-list'),
+    path('ingredients/<int:pk>/',
+         async_view(IngredientViewSet, {'get': 'retrieve'}),
+         name='async-ingredients-detail'),
+    path('users/', async_view(UserViewSet, {'get': 'list'}),
+         name='async-users-list'),
+]
+
 urlpatterns = [
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken'))
 ]
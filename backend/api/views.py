@@ -1,86 +1,100 @@
-from django.db.models import Sum, Exists, OuterRef
-from django.http import HttpResponse
+from django.db.models import BooleanField, Exists, OuterRef, Value
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.status import (HTTP_201_CREATED, HTTP_204_NO_CONTENT,
                                    HTTP_400_BAD_REQUEST)
 
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
-from users.models import Follow, User
+from backend.constants import SIMILAR_RECIPES_LIMIT, SIMILAR_RECIPES_MAX_LIMIT
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingListItem, Tag)
+from recipes.popularity import popular_recipes
+from recipes.relations import (add_recipes, follow, remove_recipes,
+                               unfollow)
+from recipes.similar import similar_index
+from users.models import User
+from .caching import CatalogCacheMixin
+from .exports import export_shopping_cart
 from .filters import NameSearchFilter, RecipeFilter
-from .pagination import CustomPageNumberPagination
+from .pagination import (CustomPageNumberPagination, FeedPagination,
+                         KeysetPagination, RecipePagination)
 from .permissions import AdminOrAuthorOrReadOnly
-from .serializers import (FavoriteSerializer, UserSerializer,
-                          FollowPostSerializer, IngredientSerializer,
-                          RecipeCreateSerializer, RecipeGetSerializer,
-                          ShoppingCartSerializer, TagSerializer,
-                          FollowGetSerializer)
-
-
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Recipe.objects
-        .select_related('author')
-        .prefetch_related('tags', 'ingredients')
-    )
+from .renderers import SHOPPING_CART_RENDERERS
+from .replicas import ReplicaReadMixin
+from .serializers import (FollowGetSerializer, IdListSerializer,
+                          IngredientSerializer, RecipeCreateSerializer,
+                          RecipeGetSerializer, RecipeShortSerializer,
+                          TagSerializer, UserSerializer)
+
+
+class RecipeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    queryset = Recipe.objects.select_related('author')
+    lookup_value_regex = r'\d+'
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (AdminOrAuthorOrReadOnly,)
     http_method_names = ['get', 'post', 'patch', 'delete']
-    pagination_class = CustomPageNumberPagination
+    pagination_class = RecipePagination
 
     def get_queryset(self):
-        if self.request.user.is_authenticated:
+        user = self.request.user
+        if user.is_authenticated:
             return self.queryset.annotate(
                 is_favorited=Exists(Favorite.objects.filter(
-                    user=OuterRef('favorite__user'),
-                    recipe=OuterRef('id')
+                    user=user,
+                    recipe=OuterRef('pk')
                 )),
                 is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
-                    user=OuterRef('shopping_cart__user'),
-                    recipe=OuterRef('id')
+                    user=user,
+                    recipe=OuterRef('pk')
                 )))
-        return self.queryset
+        return self.queryset.annotate(
+            is_favorited=Value(False, output_field=BooleanField()),
+            is_in_shopping_cart=Value(False, output_field=BooleanField())
+        )
 
-    def favorite_shopping_post(self, request, pk, serializer):
-        user_recipe_data = {'recipe': pk, 'user': request.user.pk}
-        serializer_to_save = serializer(
-            data=user_recipe_data
+    def favorite_shopping_post(self, request, pk, model):
+        recipe = get_object_or_404(Recipe, pk=pk)
+        if not add_recipes(model, request.user.id, (recipe.id,)):
+            raise ValidationError(
+                f'Выбранный рецепт уже есть в {model.__name__}.'
+            )
+        return Response(
+            RecipeShortSerializer(recipe,
+                                  context=self.get_serializer_context()).data,
+            status=HTTP_201_CREATED
         )
-        serializer_to_save.is_valid(raise_exception=True)
-        serializer_to_save.save()
-        return Response(serializer_to_save.data,
-                        status=HTTP_201_CREATED)
 
     def favorite_shopping_delete(self, request, pk, model):
-        obj = model.objects.filter(user=request.user, recipe=pk)
-        if obj.exists():
-            obj.delete()
+        if remove_recipes(model, request.user.id, (int(pk),)):
             return Response('Рецепт успешно удален',
                             status=HTTP_204_NO_CONTENT)
         return Response('Рецепта нет в списке',
                         status=HTTP_400_BAD_REQUEST)
 
+    def favorite_shopping_bulk(self, request, model):
+        serializer = IdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if request.method == 'POST':
+            return Response({'added': add_recipes(model, request.user.id,
+                                                  ids)})
+        return Response({'removed': remove_recipes(model, request.user.id,
+                                                   ids)})
+
     def form_shopping_cart(self, recipes_ingredients):
-        shopping_cart = [f'Здравствуйте, {self.request.user}, это foodgram'
-                         ', ваш список покупок:\n']
-        shopping_cart += [
-            (f'{ingredient["ingredient__name"]} '
-             f'({ingredient["ingredient__measurement_unit"]})'
-             f' - {ingredient["amount"]}')
-            for ingredient in recipes_ingredients
-        ]
-        response = HttpResponse('\n'.join(shopping_cart),
-                                content_type="text/plain")
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename=shopping_cart_'
-                                           f'{self.request.user}')
-        return response
+        return export_shopping_cart(
+            self.request.user,
+            recipes_ingredients,
+            self.request.accepted_renderer.format,
+            self.request.accepted_media_type.split(';')[0]
+        )
 
     def get_serializer_class(self):
         if self.request.method in ('POST', 'PATCH'):
@@ -94,7 +108,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.favorite_shopping_post(
             request=self.request,
             pk=pk,
-            serializer=FavoriteSerializer
+            model=Favorite
         )
 
     @favorite.mapping.delete
@@ -112,7 +126,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.favorite_shopping_post(
             request=self.request,
             pk=pk,
-            serializer=ShoppingCartSerializer
+            model=ShoppingCart
         )
 
     @shopping_cart.mapping.delete
@@ -123,74 +137,152 @@ class RecipeViewSet(viewsets.ModelViewSet):
             model=ShoppingCart
         )
 
+    @action(detail=False,
+            methods=('post', 'delete'),
+            permission_classes=(IsAuthenticated,),
+            url_path='favorite',
+            url_name='favorite-bulk')
+    def favorite_bulk(self, request):
+        return self.favorite_shopping_bulk(request, Favorite)
+
+    @action(detail=False,
+            methods=('post', 'delete'),
+            permission_classes=(IsAuthenticated,),
+            url_path='shopping_cart',
+            url_name='shopping-cart-bulk')
+    def shopping_cart_bulk(self, request):
+        return self.favorite_shopping_bulk(request, ShoppingCart)
+
     @action(detail=False,
             methods=('get',),
-            permission_classes=(IsAuthenticated,))
+            permission_classes=(IsAuthenticated,),
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True,
+            methods=('get',),
+            pagination_class=None)
+    def similar(self, request, pk):
+        try:
+            limit = int(request.query_params.get('limit',
+                                                 SIMILAR_RECIPES_LIMIT))
+        except ValueError:
+            limit = SIMILAR_RECIPES_LIMIT
+        limit = min(max(limit, 1), SIMILAR_RECIPES_MAX_LIMIT)
+        pk = int(pk)
+        ids = [recipe_id for recipe_id, _
+               in similar_index.similar(pk, limit)]
+        # Исходный рецепт проверяется тем же запросом, что и похожие.
+        recipes = self.get_queryset().in_bulk([pk, *ids])
+        if pk not in recipes:
+            raise NotFound
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id in ids if recipe_id in recipes],
+            many=True
+        )
+        return Response(serializer.data)
+
+    @action(detail=False,
+            methods=('get',),
+            pagination_class=KeysetPagination)
+    def popular(self, request):
+        page = self.paginate_queryset(
+            popular_recipes(self.filter_queryset(self.get_queryset()))
+        )
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False,
+            methods=('get',),
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=SHOPPING_CART_RENDERERS)
     def download_shopping_cart(self, request):
-        if not self.request.user.shopping_cart.exists():
+        recipes_ingredients = ShoppingListItem.objects.filter(
+            user=self.request.user
+        ).values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).order_by('ingredient__name')
+        if not recipes_ingredients.exists():
             return Response('Список покупок пуст',
                             status=HTTP_204_NO_CONTENT)
-        recipes_ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=self.request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(
-            amount=Sum('amount')
-        ).order_by('ingredient__name', 'amount')
         return self.form_shopping_cart(recipes_ingredients)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogCacheMixin, ReplicaReadMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (NameSearchFilter,)
+    filter_query_params = (NameSearchFilter.search_param,)
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get(NameSearchFilter.search_param)
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(CatalogCacheMixin, ReplicaReadMixin,
+                 viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(ReplicaReadMixin, DjoserUserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     pagination_class = CustomPageNumberPagination
+    lookup_value_regex = r'\d+'
 
     def get_permissions(self):
         if self.action == 'me':
             return IsAuthenticated(),
         return super().get_permissions()
 
+    def get_instance(self):
+        return User.objects.get(pk=self.request.user.pk)
+
     @action(detail=True,
             methods=('post',),
             permission_classes=(IsAuthenticated,))
     def subscribe(self, request, id):
-        serializer = FollowPostSerializer(
-            data={
-                'user': self.request.user.pk,
-                'author': id
-            },
-            context={
-                'request': request,
-                'author': id
-            }
+        author = get_object_or_404(User, pk=id)
+        if author.id == request.user.id:
+            raise ValidationError('Самоподписка запрещена.')
+        if not follow(request.user.id, (author.id,)):
+            raise ValidationError(
+                'Подписка на этого пользователя уже существует.'
+            )
+        return Response(
+            FollowGetSerializer(author, context={'request': request}).data,
+            status=HTTP_201_CREATED
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data,
-                        status=HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, id):
-        obj = Follow.objects.filter(user=self.request.user, author=id)
-        if obj.exists():
-            obj.delete()
+        if unfollow(request.user.id, (int(id),)):
             return Response('Успешная отписка',
                             status=HTTP_204_NO_CONTENT)
         return Response('Подписки не существует!',
                         status=HTTP_400_BAD_REQUEST)
 
+    @action(detail=False,
+            methods=('post', 'delete'),
+            permission_classes=(IsAuthenticated,),
+            url_path='subscribe',
+            url_name='subscribe-bulk')
+    def subscribe_bulk(self, request):
+        serializer = IdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if request.method == 'POST':
+            return Response({'added': follow(request.user.id, ids)})
+        return Response({'removed': unfollow(request.user.id, ids)})
+
     @action(detail=False,
             methods=('get',),
             permission_classes=(IsAuthenticated,))
@@ -5,3 +5,39 @@ RECIPES_NAME_SIZE = 200
 MIN_VALUE = 1
 MAX_P_INT_VALUE = 32767
 PAGINATION_PAGE_SIZE = 6
+SHOPPING_CART_CHUNK_SIZE = 2000
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 18
+PDF_MARGIN = 50
+RECIPE_FRAGMENT_TIMEOUT = 60 * 60 * 24
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (640, 640),
+    'full': (1600, 1600),
+}
+RECIPE_IMAGE_FORMATS = {
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+}
+RECIPE_IMAGE_HASH_LENGTH = 64
+LOADER_READ_SIZE = 64 * 1024
+LOADER_BATCH_SIZE = 5000
+SLOW_QUERIES_LIMIT = 3
+SLOW_QUERY_SQL_LENGTH = 300
+FEED_FANOUT_FOLLOWERS_LIMIT = 10000
+FEED_BACKFILL_SIZE = 100
+FEED_BATCH_SIZE = 1000
+TOKEN_CACHE_REVOKED_TIMEOUT = 60
+CATALOG_OBJECTS_LIMIT = 50000
+CATALOG_VERSION_TIMEOUT = 1
+CATALOG_CACHE_SIZE = 256
+BULK_RELATIONS_LIMIT = 100
+ADMIN_ESTIMATED_COUNT_MIN = 10000
+POPULARITY_HALF_LIFE = 60 * 60 * 24 * 3
+POPULARITY_MIN_SCORE = 0.01
+POPULARITY_BATCH_SIZE = 1000
+POPULARITY_OVERLAP = 60 * 10
+SIMILAR_NUM_PERM = 64
+SIMILAR_BANDS = 32
+SIMILAR_RECIPES_LIMIT = 6
+SIMILAR_RECIPES_MAX_LIMIT = 50
@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models
+
+deleting_users = ContextVar('deleting_users', default=None)
+
+
+@contextmanager
+def cascade(user_ids=()):
+    """Каскадное удаление рецептов или пользователей.
+
+    Внутри блока обработчики удаления отдельных строк избранного, корзин
+    и подписок ничего не делают: счетчики и списки покупок одним
+    запросом на счетчик обновляют обработчики pre_delete удаляемых
+    рецептов и пользователей. deleting_users хранит id удаляемых
+    пользователей, вне блока — None.
+    """
+    outer = deleting_users.get() or frozenset()
+    token = deleting_users.set(outer | frozenset(user_ids))
+    try:
+        yield
+    finally:
+        deleting_users.reset(token)
+
+
+class CascadeQuerySet(models.QuerySet):
+
+    def cascade_user_ids(self):
+        return ()
+
+    def delete(self):
+        with cascade(self.cascade_user_ids()):
+            return super().delete()
+
+
+class CascadeModelMixin:
+
+    def cascade_user_ids(self):
+        return ()
+
+    def delete(self, *args, **kwargs):
+        with cascade(self.cascade_user_ids()):
+            return super().delete(*args, **kwargs)
@@ -0,0 +1,191 @@
+import heapq
+import json
+import logging
+from collections import Counter
+from contextlib import ExitStack, contextmanager, nullcontext
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .constants import SLOW_QUERIES_LIMIT, SLOW_QUERY_SQL_LENGTH
+
+logger = logging.getLogger('backend.requests')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestMetrics:
+    """Счетчики одного запроса: SQL, время БД и рендеринга ответа."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slowest = []
+        self.render_started = None
+        self.render_seconds = 0.0
+        self.auth_cache = None
+        self.fragments = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            self.queries += 1
+            self.db_seconds += duration
+            if len(self.slowest) < SLOW_QUERIES_LIMIT:
+                heapq.heappush(self.slowest, (duration, sql))
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (duration, sql))
+
+    @contextmanager
+    def track(self):
+        """Учитывает запросы соединений текущего потока."""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield
+
+    def start_render(self):
+        self.render_started = perf_counter()
+
+    def finish_render(self, response):
+        self.render_seconds = perf_counter() - self.render_started
+
+    def app_seconds(self, total):
+        return max(total - self.db_seconds - self.render_seconds, 0)
+
+
+class RequestMetricsMiddleware:
+    """Число SQL-запросов, время БД и рендеринга для каждого запроса.
+
+    Метрики отдаются в заголовке Server-Timing и пишутся одной строкой
+    JSON в лог backend.requests на уровне INFO; по умолчанию лог пишет
+    только WARNING, то есть превышения лимитов. app — время Python без
+    БД и рендеринга, в него входит работа сериализаторов. Лимиты
+    запросов QUERY_BUDGETS задаются по ключу "<метод> <имя url>"; при
+    превышении пишется предупреждение, а при QUERY_BUDGETS_STRICT
+    выбрасывается QueryBudgetExceeded.
+
+    Запросы, выполненные при отдаче потокового ответа, попадают в лог и
+    проверку лимита после отдачи, но не в Server-Timing: заголовок к
+    этому моменту уже отправлен.
+
+    В асинхронной цепочке запросы к БД учитываются только внутри
+    request.metrics.track(): обертка execute_wrapper ставится на
+    соединения текущего потока, а sync_to_async выполняет код в других.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.metrics = RequestMetrics()
+        start = perf_counter()
+        with request.metrics.track():
+            response = self.get_response(request)
+        return self.finish(request, response, start, track=True)
+
+    async def __acall__(self, request):
+        request.metrics = RequestMetrics()
+        start = perf_counter()
+        response = await self.get_response(request)
+        return self.finish(request, response, start, track=False)
+
+    def finish(self, request, response, start, track):
+        match = request.resolver_match
+        view = match.view_name if match else None
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = self.server_timing(
+                request.metrics, perf_counter() - start
+            )
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, view, start,
+                track
+            )
+        else:
+            self.report(request, response, view, perf_counter() - start)
+        return response
+
+    def stream(self, content, request, response, view, start, track):
+        with request.metrics.track() if track else nullcontext():
+            yield from content
+        self.report(request, response, view, perf_counter() - start)
+
+    def report(self, request, response, view, total):
+        self.log(request, response, view, request.metrics, total)
+        self.check_budget(f'{request.method} {view}', request.metrics)
+
+    def process_template_response(self, request, response):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None and not response.is_rendered:
+            metrics.start_render()
+            response.add_post_render_callback(metrics.finish_render)
+        return response
+
+    @staticmethod
+    def server_timing(metrics, total):
+        entries = [
+            f'db;dur={metrics.db_seconds * 1000:.2f};'
+            f'desc="{metrics.queries} queries"',
+            f'render;dur={metrics.render_seconds * 1000:.2f}',
+            f'app;dur={metrics.app_seconds(total) * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ]
+        if metrics.auth_cache:
+            entries.append(f'auth;desc="{metrics.auth_cache}"')
+        if metrics.fragments:
+            entries.append(f'fragments;desc="hits={metrics.fragments["hits"]} '
+                           f'misses={metrics.fragments["misses"]}"')
+        return ', '.join(entries)
+
+    @staticmethod
+    def log(request, response, view, metrics, total):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(metrics.db_seconds * 1000, 2),
+            'render_ms': round(metrics.render_seconds * 1000, 2),
+            'app_ms': round(metrics.app_seconds(total) * 1000, 2),
+            'queries': metrics.queries,
+            'auth_cache': metrics.auth_cache,
+            'fragments': dict(metrics.fragments) or None,
+            'slowest': [
+                {'ms': round(duration * 1000, 2),
+                 'sql': sql[:SLOW_QUERY_SQL_LENGTH]}
+                for duration, sql in sorted(metrics.slowest, reverse=True)
+            ],
+        }, ensure_ascii=False))
+
+    @staticmethod
+    def check_budget(endpoint, metrics):
+        budget = settings.QUERY_BUDGETS.get(endpoint)
+        if budget is None or metrics.queries <= budget:
+            return
+        message = (f'{endpoint}: {metrics.queries} SQL-запросов '
+                   f'при лимите {budget}')
+        if settings.QUERY_BUDGETS_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
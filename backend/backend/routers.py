@@ -0,0 +1,83 @@
+import random
+from contextvars import ContextVar
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PRIMARY_PIN_KEY = 'db:primary-pin:{user_id}'
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+class ReplicaHealth:
+    """Доступность реплик с проверкой не чаще раза в интервал."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.checked = {}
+
+    @staticmethod
+    def ping(alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except DatabaseError:
+            connections[alias].close()
+            return False
+
+    def is_healthy(self, alias):
+        with self.lock:
+            expires, healthy = self.checked.get(alias, (0, False))
+        if expires > monotonic():
+            return healthy
+        healthy = self.ping(alias)
+        with self.lock:
+            self.checked[alias] = (
+                monotonic() + settings.REPLICA_HEALTH_CHECK_INTERVAL,
+                healthy
+            )
+        return healthy
+
+    def healthy_replicas(self):
+        return [alias for alias in settings.DATABASE_REPLICAS
+                if self.is_healthy(alias)]
+
+
+replica_health = ReplicaHealth()
+
+
+def pin_to_primary(user_id):
+    """Чтение пользователя идет с основной БД после его записи."""
+    cache.set(PRIMARY_PIN_KEY.format(user_id=user_id), True,
+              settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned_to_primary(user_id):
+    return bool(cache.get(PRIMARY_PIN_KEY.format(user_id=user_id)))
+
+
+class ReplicaRouter:
+    """Чтение с реплик, пока установлен replica_reads, запись — в основную БД.
+
+    Если ни одна реплика не отвечает, чтение идет с основной БД.
+    Миграции применяются только к основной БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        replicas = replica_health.healthy_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,6 +80,41 @@ else:
         }
     }
 
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1):
+    if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        replica_settings = {'NAME': BASE_DIR / replica.strip()}
+    else:
+        host, _, port = replica.strip().partition(':')
+        replica_settings = {
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            'OPTIONS': {'connect_timeout': int(
+                os.getenv('DB_REPLICA_CONNECT_TIMEOUT', 2)
+            )},
+        }
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        **replica_settings,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['backend.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+REPLICA_HEALTH_CHECK_INTERVAL = int(
+    os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', 10)
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': (os.getenv('CACHE_BACKEND')
+                    or 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -102,7 +138,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
@@ -127,10 +163,67 @@ USE_TZ = True
 
 DATA_DIR_PATH = os.path.join(BASE_DIR, 'data')
 
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 STATIC_URL = '/backend_static/'
 STATIC_ROOT = BASE_DIR / 'static'
 
 MEDIA_URL = '/backend_media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', 2))
+
+SIMILAR_INDEX_DIR = os.getenv('SIMILAR_INDEX_DIR',
+                              os.path.join(BASE_DIR, 'similar_index'))
+
+REQUEST_METRICS = os.getenv('REQUEST_METRICS', 'True') == 'True'
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'True') == 'True'
+QUERY_BUDGETS = {
+    'POST recipes-list': 24,
+    'PATCH recipes-detail': 26,
+    'GET recipes-list': 8,
+    'GET recipes-detail': 8,
+    'GET recipes-feed': 6,
+    'GET recipes-popular': 8,
+    'GET recipes-similar': 8,
+    'GET recipes-download-shopping-cart': 4,
+    'GET users-list': 4,
+    'GET users-detail': 3,
+    'GET users-me': 3,
+    'GET users-subscriptions': 5,
+    'GET ingredients-list': 2,
+    'GET ingredients-detail': 2,
+    'GET tags-list': 2,
+    'GET tags-detail': 2,
+    'GET async-recipes-list': 8,
+    'GET async-recipes-detail': 8,
+    'GET async-users-list': 4,
+    'GET async-ingredients-list': 2,
+    'GET async-ingredients-detail': 2,
+    'GET async-tags-list': 2,
+    'GET async-tags-detail': 2,
+}
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 300))
+TOKEN_CACHE_ALIAS = os.getenv('TOKEN_CACHE_ALIAS', '')
+
+QUERY_BUDGETS_STRICT = os.getenv('QUERY_BUDGETS_STRICT', False) == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'backend.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
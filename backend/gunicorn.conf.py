@@ -0,0 +1,23 @@
+import os
+
+SERVER_INTERFACE = os.getenv('SERVER_INTERFACE', 'wsgi')
+
+if SERVER_INTERFACE == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi:application'
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8080')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+cache_backend = os.getenv('CACHE_BACKEND') or 'locmem'
+if workers > 1 and 'locmem' in cache_backend.lower():
+    raise RuntimeError(
+        'GUNICORN_WORKERS > 1 требует общего кеша в CACHE_BACKEND: '
+        'кеш в памяти процесса не виден другим воркерам'
+    )
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
@@ -1,29 +1,63 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
+from django.db.models import Prefetch
 from django.utils.safestring import mark_safe
 
 from .models import (Favorite, Ingredient, RecipeIngredient,
                      Recipe, ShoppingCart, Tag, )
+from .admin_tools import LargeTableAdminMixin, input_filter
+from .fragments import invalidate_fragment
+from .images import schedule_image_processing, variant_url
+from .shopping_list import tracking_recipe_ingredients
+from .similar import schedule_similar_update
 
 
 class IngredientsInline(admin.TabularInline):
     model = RecipeIngredient
     min_num = 1
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'author', 'name',
                     'get_ingredients', 'get_favorited', 'get_image')
-    list_filter = ('name', 'author', 'tags')
+    list_filter = (
+        input_filter('Название', 'name', 'name__istartswith'),
+        input_filter('Автор', 'author', 'author__username',
+                     'author__email'),
+        'tags',
+    )
+    list_select_related = ('author',)
     filter_horizontal = ('ingredients',)
     list_display_links = ('id', 'name',)
-    search_fields = ('author', 'name',)
+    search_fields = ('name', 'author__username',)
+    autocomplete_fields = ('author',)
     inlines = (IngredientsInline,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('recipe_ingredient',
+                     queryset=RecipeIngredient.objects.select_related(
+                         'ingredient'
+                     ))
+        )
+
+    def save_model(self, request, obj, form, change):
+        if 'image' in form.changed_data:
+            obj.image_hash = ''
+        super().save_model(request, obj, form, change)
+        schedule_image_processing(obj)
+
+    def save_related(self, request, form, formsets, change):
+        with tracking_recipe_ingredients((form.instance.id,)):
+            super().save_related(request, form, formsets, change)
+        invalidate_fragment(form.instance.id)
+        schedule_similar_update(form.instance.id)
+
     @admin.display(description='Избранное')
     def get_favorited(self, obj):
-        return obj.favorite.all().count()
+        return obj.favorites_count
 
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, obj):
@@ -33,14 +67,16 @@ class RecipeAdmin(admin.ModelAdmin):
 
     @admin.display(description='Картинка')
     def get_image(self, obj):
-        return mark_safe(f'<img src={obj.image.url} width="80" height="60">')
+        return mark_safe(f'<img src={variant_url(obj, "thumbnail")} '
+                         'width="80" height="60">')
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit')
-    list_filter = ('name',)
+    list_filter = (input_filter('Название', 'name', 'name__istartswith'),)
     search_fields = ('name',)
+    ordering = ('name',)
 
 
 @admin.register(Tag)
@@ -51,27 +87,56 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'recipe', 'ingredient', 'amount',)
-    list_filter = ('ingredient',)
+    list_filter = (input_filter('Ингредиент', 'ingredient',
+                                'ingredient__name__istartswith'),)
+    list_select_related = ('recipe', 'ingredient')
     list_display_links = ('recipe', 'ingredient')
-    search_fields = ('recipe',)
+    search_fields = ('recipe__name',)
+    autocomplete_fields = ('recipe', 'ingredient')
+
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id, form.initial.get('recipe')} - {None}
+        with tracking_recipe_ingredients(recipe_ids):
+            super().save_model(request, obj, form, change)
+        invalidate_fragment(*recipe_ids)
+        schedule_similar_update(*recipe_ids)
+
+    def delete_model(self, request, obj):
+        with tracking_recipe_ingredients((obj.recipe_id,)):
+            super().delete_model(request, obj)
+        invalidate_fragment(obj.recipe_id)
+        schedule_similar_update(obj.recipe_id)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        with tracking_recipe_ingredients(recipe_ids):
+            super().delete_queryset(request, queryset)
+        invalidate_fragment(*recipe_ids)
+        schedule_similar_update(*recipe_ids)
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'recipe')
-    list_filter = ('user',)
+    list_filter = (input_filter('Пользователь', 'user', 'user__username',
+                                'user__email'),)
+    list_select_related = ('user', 'recipe')
     list_display_links = ('recipe',)
-    search_fields = ('recipe',)
+    search_fields = ('recipe__name',)
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'recipe')
-    list_filter = ('user',)
+    list_filter = (input_filter('Пользователь', 'user', 'user__username',
+                                'user__email'),)
+    list_select_related = ('user', 'recipe')
     list_display_links = ('recipe',)
-    search_fields = ('recipe',)
+    search_fields = ('recipe__name',)
+    autocomplete_fields = ('user', 'recipe')
 
 
 admin.site.unregister(Group)
@@ -0,0 +1,85 @@
+from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from backend.constants import ADMIN_ESTIMATED_COUNT_MIN
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Фильтр списка по введенному значению.
+
+    В отличие от обычного list_filter не выбирает все различные
+    значения поля, поэтому боковая панель не зависит от размера таблицы.
+    Значение ищется по lookups, условия объединяются через OR.
+    """
+
+    template = 'admin/input_filter.html'
+    lookups_fields = ()
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return None
+        condition = Q()
+        for lookup in self.lookups_fields:
+            condition |= Q(**{lookup: value})
+        return queryset.filter(condition)
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                remove=(self.parameter_name,)
+            ),
+            'hidden_params': [
+                (name, value) for name, value in changelist.params.items()
+                if name not in (self.parameter_name, PAGE_VAR)
+            ],
+        }
+
+
+def input_filter(title, parameter_name, *lookups_fields):
+    return type(f'{parameter_name.title()}InputFilter', (InputFilter,), {
+        'title': title,
+        'parameter_name': parameter_name,
+        'lookups_fields': lookups_fields,
+    })
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор с оценкой числа строк для больших таблиц PostgreSQL.
+
+    Для списка без фильтров COUNT(*) заменяется на reltuples из
+    pg_class. Оценка используется, только если она не меньше
+    ADMIN_ESTIMATED_COUNT_MIN, иначе строки считаются как обычно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE oid = %s::regclass',
+                    (queryset.model._meta.db_table,)
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ADMIN_ESTIMATED_COUNT_MIN:
+                return row[0]
+        return super().count
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,95 @@
+from collections import defaultdict
+from threading import Lock
+from time import time_ns
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from backend.constants import CATALOG_OBJECTS_LIMIT, CATALOG_VERSION_TIMEOUT
+from .models import CatalogVersion
+
+CATALOG_VERSION_KEY = 'recipes:catalog-version'
+CATALOG_VERSION_PK = 1
+
+
+def now_version():
+    return time_ns() // 1000
+
+
+def get_catalog_version():
+    """Версия справочников тегов и ингредиентов.
+
+    Версия — время последнего изменения в микросекундах, поэтому из нее
+    же получается Last-Modified. Версия хранится в основной БД и общая
+    для всех процессов, в кеше она живет CATALOG_VERSION_TIMEOUT секунд.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        catalog, _ = CatalogVersion.objects.using(
+            DEFAULT_DB_ALIAS
+        ).get_or_create(pk=CATALOG_VERSION_PK,
+                        defaults={'version': now_version()})
+        version = catalog.version
+        cache.set(CATALOG_VERSION_KEY, version, CATALOG_VERSION_TIMEOUT)
+    return version
+
+
+def bump_catalog_version():
+    version = now_version()
+    if not CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).update(
+        version=Greatest(F('version') + 1, Value(version))
+    ):
+        CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_PK,
+                                             defaults={'version': version})
+    transaction.on_commit(lambda: cache.delete(CATALOG_VERSION_KEY))
+
+
+class CatalogObjects:
+    """Теги и ингредиенты по id в памяти процесса.
+
+    Объекты читаются из памяти, но их существование все равно
+    проверяется в БД: удаление в другом процессе могло еще не дойти до
+    этого. На модель выполняется один запрос — проверка id, если все
+    объекты есть в памяти, иначе загрузка всех объектов IN. Все объекты
+    сбрасываются при смене версии каталога.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.lock = Lock()
+        self.version = None
+        self.objects = defaultdict(dict)
+
+    def get_many(self, model, ids):
+        if not ids:
+            return {}
+        version = get_catalog_version()
+        with self.lock:
+            if self.version != version:
+                self.version = version
+                self.objects = defaultdict(dict)
+            cached = self.objects[model]
+            found = {pk: cached[pk] for pk in ids if pk in cached}
+        if len(found) == len(set(ids)):
+            existing = set(model.objects.filter(
+                pk__in=found
+            ).values_list('pk', flat=True))
+            with self.lock:
+                for pk in found.keys() - existing:
+                    self.objects[model].pop(pk, None)
+            return {pk: found[pk] for pk in existing}
+        loaded = model.objects.in_bulk(set(ids))
+        with self.lock:
+            if self.version == version:
+                cached = self.objects[model]
+                for pk in set(ids) - loaded.keys():
+                    cached.pop(pk, None)
+                if len(cached) + len(loaded) > self.limit:
+                    cached.clear()
+                cached.update(loaded)
+        return loaded
+
+
+catalog_objects = CatalogObjects(CATALOG_OBJECTS_LIMIT)
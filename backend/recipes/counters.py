@@ -0,0 +1,81 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Follow, User
+from .models import Favorite, Recipe, ShoppingCart
+
+RECIPE_COUNTERS = {
+    'favorites_count': (Favorite, 'recipe'),
+    'in_carts_count': (ShoppingCart, 'recipe'),
+}
+USER_COUNTERS = {
+    'recipes_count': (Recipe, 'author'),
+    'followers_count': (Follow, 'author'),
+    'subscriptions_count': (Follow, 'user'),
+}
+
+
+def increment(queryset, field, delta=1):
+    """Атомарно изменяет счетчик на delta одним UPDATE."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    if delta:
+        queryset.update(**{field: F(field) + delta})
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def actual_counts(queryset, counters):
+    return queryset.annotate(**{
+        f'actual_{name}': count_subquery(model, field)
+        for name, (model, field) in counters.items()
+    })
+
+
+def rebuild(queryset, counters):
+    """Пересчитывает счетчики по таблицам связей."""
+    return queryset.update(**{
+        name: count_subquery(model, field)
+        for name, (model, field) in counters.items()
+    })
+
+
+def find_drift(queryset, counters):
+    """Возвращает объекты, у которых счетчики расходятся с данными."""
+    drift = []
+    for obj in actual_counts(queryset, counters).iterator():
+        mismatched = {
+            name: (getattr(obj, name), getattr(obj, f'actual_{name}'))
+            for name in counters
+            if getattr(obj, name) != getattr(obj, f'actual_{name}')
+        }
+        if mismatched:
+            drift.append((obj, mismatched))
+    return drift
+
+
+def rebuild_recipes(ids=None):
+    queryset = Recipe.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return rebuild(queryset, RECIPE_COUNTERS)
+
+
+def rebuild_users(ids=None):
+    queryset = User.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return rebuild(queryset, USER_COUNTERS)
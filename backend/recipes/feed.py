@@ -0,0 +1,121 @@
+from collections import defaultdict
+
+from backend.constants import (FEED_BACKFILL_SIZE, FEED_BATCH_SIZE,
+                               FEED_FANOUT_FOLLOWERS_LIMIT)
+from users.models import Follow, User
+from .loaders import batched
+from .models import FeedEntry, Recipe
+from .queries import latest_recipes
+from .tasks import run_in_background
+
+
+def fan_out(recipe_id):
+    """Раскладывает новый рецепт по лентам подписчиков автора.
+
+    Рецепты авторов с числом подписчиков больше
+    FEED_FANOUT_FOLLOWERS_LIMIT не раскладываются, а подмешиваются при
+    чтении ленты.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).values(
+        'author_id', 'pub_date', 'author__followers_count'
+    ).first()
+    if (recipe is None
+            or recipe['author__followers_count']
+            > FEED_FANOUT_FOLLOWERS_LIMIT):
+        return
+    followers = Follow.objects.filter(
+        author_id=recipe['author_id']
+    ).values_list('user_id', flat=True).order_by('user_id')
+    for batch in batched(followers.iterator(chunk_size=FEED_BATCH_SIZE),
+                         FEED_BATCH_SIZE):
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                       author_id=recipe['author_id'],
+                       pub_date=recipe['pub_date'])
+             for user_id in batch],
+            ignore_conflicts=True
+        )
+
+
+def fill(follows):
+    """Добавляет в ленты последние рецепты по парам (подписчик, автор)."""
+    followers = defaultdict(list)
+    for user_id, author_id in follows:
+        followers[author_id].append(user_id)
+    if not followers:
+        return
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=recipe.id,
+                   author_id=recipe.author_id, pub_date=recipe.pub_date)
+         for recipe in latest_recipes(list(followers), FEED_BACKFILL_SIZE)
+         for user_id in followers[recipe.author_id]),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def pushed_follows(**filters):
+    return Follow.objects.filter(
+        author__followers_count__lte=FEED_FANOUT_FOLLOWERS_LIMIT, **filters
+    ).values_list('user_id', 'author_id')
+
+
+def follow_created(user_id, author_id):
+    fill(pushed_follows(user_id=user_id, author_id=author_id))
+
+
+def follows_created(user_id, author_ids):
+    fill(pushed_follows(user_id=user_id, author_id__in=author_ids))
+
+
+def follow_deleted(user_id, author_id, followers_count):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if followers_count == FEED_FANOUT_FOLLOWERS_LIMIT:
+        run_in_background(backfill_followers, author_id)
+
+
+def follows_deleted(user_id, author_ids):
+    """Убирает авторов из ленты после отписки от них.
+
+    Вызывается после уменьшения счетчиков подписчиков.
+    """
+    FeedEntry.objects.filter(user_id=user_id,
+                             author_id__in=author_ids).delete()
+    for author_id in User.objects.filter(
+            pk__in=author_ids,
+            followers_count=FEED_FANOUT_FOLLOWERS_LIMIT
+    ).values_list('id', flat=True):
+        run_in_background(backfill_followers, author_id)
+
+
+def backfill_followers(author_id):
+    """Заполняет ленты подписчиков автора, опустившегося ниже порога."""
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    ).order_by('user_id')
+    for batch in batched(followers.iterator(chunk_size=FEED_BATCH_SIZE),
+                         FEED_BATCH_SIZE):
+        fill((user_id, author_id) for user_id in batch)
+
+
+def rebuild(user_ids):
+    FeedEntry.objects.filter(user_id__in=user_ids).delete()
+    fill(pushed_follows(user_id__in=user_ids))
+
+
+def sources(user):
+    """Источники ленты и их сортировка.
+
+    Кроме входящих записей пользователя это рецепты популярных авторов,
+    которые не раскладываются по лентам при публикации.
+    """
+    feed_sources = [(FeedEntry.objects.filter(user=user),
+                     ('-pub_date', '-recipe_id'))]
+    pulled = list(Follow.objects.filter(
+        user=user,
+        author__followers_count__gt=FEED_FANOUT_FOLLOWERS_LIMIT
+    ).values_list('author_id', flat=True))
+    if pulled:
+        feed_sources.append((Recipe.objects.filter(author_id__in=pulled),
+                             ('-pub_date', '-id')))
+    return feed_sources
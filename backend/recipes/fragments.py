@@ -0,0 +1,74 @@
+from collections import Counter
+from threading import Lock
+
+from django.core.cache import cache
+from django.db.models import F
+
+from backend.constants import RECIPE_FRAGMENT_TIMEOUT
+from .catalog import get_catalog_version
+from .models import Recipe
+
+FRAGMENT_KEY = 'recipes:fragment:{recipe_id}:{version}:{catalog_version}'
+
+stats = Counter()
+stats_lock = Lock()
+
+
+def fragment_key(recipe, catalog_version=None):
+    return FRAGMENT_KEY.format(
+        recipe_id=recipe.id,
+        version=recipe.version,
+        catalog_version=catalog_version or get_catalog_version()
+    )
+
+
+def count(hits, misses, request_stats=None):
+    with stats_lock:
+        stats['hits'] += hits
+        stats['misses'] += misses
+    if request_stats is not None:
+        request_stats['hits'] += hits
+        request_stats['misses'] += misses
+
+
+def get_stats():
+    with stats_lock:
+        return dict(hits=stats['hits'], misses=stats['misses'])
+
+
+def get_fragments(recipes, render, request_stats=None):
+    """Пользовательски-независимые части рецептов: {id: fragment}.
+
+    Ключ фрагмента содержит версию рецепта, прочитанную вместе с его
+    строкой, поэтому фрагмент прежней версии не может быть прочитан ни
+    одним процессом, даже если он был сохранен после изменения.
+    Отсутствующие в кеше фрагменты строятся вызовом render(recipes)
+    одним пакетом и сохраняются. Попадания и промахи добавляются к общим
+    счетчикам и к request_stats — счетчикам текущего запроса.
+    """
+    catalog_version = get_catalog_version()
+    keys = {recipe.id: fragment_key(recipe, catalog_version)
+            for recipe in recipes}
+    cached = cache.get_many(keys.values())
+    fragments = {recipe_id: cached[key] for recipe_id, key in keys.items()
+                 if key in cached}
+    missing = [recipe for recipe in recipes if recipe.id not in fragments]
+    count(len(fragments), len(missing), request_stats)
+    if missing:
+        rendered = render(missing)
+        cache.set_many({keys[recipe_id]: fragment
+                        for recipe_id, fragment in rendered.items()},
+                       RECIPE_FRAGMENT_TIMEOUT)
+        fragments.update(rendered)
+    return fragments
+
+
+def invalidate_fragment(*recipe_ids):
+    """Новая версия рецептов: их прежние фрагменты больше не читаются."""
+    Recipe.objects.filter(pk__in=recipe_ids).update(version=F('version') + 1)
+
+
+def invalidate_recipe_fragment(recipe):
+    """То же для объекта рецепта; его версия перечитывается из БД."""
+    invalidate_fragment(recipe.id)
+    recipe.refresh_from_db(fields=('version',))
@@ -0,0 +1,118 @@
+from hashlib import sha256
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from backend.constants import RECIPE_IMAGE_FORMATS, RECIPE_IMAGE_VARIANTS
+from .models import Recipe
+from .tasks import run_in_background
+
+IMAGES_ROOT = 'recipes/images'
+DEFAULT_EXTENSION = 'jpg'
+WEBP_EXTENSION = 'webp'
+
+
+def available_extensions():
+    """Форматы вариантов, которые умеет кодировать установленный Pillow."""
+    return [extension for extension in RECIPE_IMAGE_FORMATS
+            if extension != WEBP_EXTENSION or features.check('webp')]
+
+
+def variant_path(image_hash, variant, extension=DEFAULT_EXTENSION):
+    return (f'{IMAGES_ROOT}/{image_hash[:2]}/{image_hash}/'
+            f'{variant}.{extension}')
+
+
+def is_variant(name):
+    return name.startswith(f'{IMAGES_ROOT}/') and name.count('/') == 4
+
+
+def variant_url(recipe, variant, extension=DEFAULT_EXTENSION):
+    """URL варианта картинки или исходного файла, пока варианты не готовы."""
+    if recipe.image_hash:
+        if extension not in available_extensions():
+            return None
+        return default_storage.url(
+            variant_path(recipe.image_hash, variant, extension)
+        )
+    if not recipe.image or extension != DEFAULT_EXTENSION:
+        return None
+    return recipe.image.url
+
+
+def flatten(image):
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def encode(image, extension):
+    image_format, options = RECIPE_IMAGE_FORMATS[extension]
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def content_hash(content):
+    return sha256(content).hexdigest()
+
+
+def store_variants(content):
+    """Сохраняет варианты картинки по хешу содержимого, возвращает хеш.
+
+    Метаданные (EXIF, ICC, комментарии) не переносятся: изображения
+    перекодируются из пикселей после поворота по EXIF.
+    """
+    image_hash = content_hash(content)
+    extensions = available_extensions()
+    paths = {
+        (variant, extension): variant_path(image_hash, variant, extension)
+        for variant in RECIPE_IMAGE_VARIANTS for extension in extensions
+    }
+    if all(default_storage.exists(path) for path in paths.values()):
+        return image_hash
+    with Image.open(BytesIO(content)) as source:
+        image = flatten(ImageOps.exif_transpose(source))
+    for variant, size in RECIPE_IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        for extension in extensions:
+            path = paths[variant, extension]
+            if not default_storage.exists(path):
+                default_storage.save(
+                    path, ContentFile(encode(resized, extension))
+                )
+    return image_hash
+
+
+def process_recipe_image(recipe_id):
+    """Фоновая обработка загруженной картинки рецепта.
+
+    Поле image переводится на полноразмерный JPEG-вариант, исходный
+    файл удаляется. Если за время обработки картинку заменили, результат
+    не применяется.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return
+    name = recipe.image.name
+    with default_storage.open(name) as upload:
+        image_hash = store_variants(upload.read())
+    full_path = variant_path(image_hash, 'full')
+    if name == full_path:
+        return
+    updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image=full_path, image_hash=image_hash
+    )
+    if updated and not is_variant(name):
+        default_storage.delete(name)
+
+
+def schedule_image_processing(recipe):
+    if recipe.image and not recipe.image_hash:
+        run_in_background(process_recipe_image, recipe.id)
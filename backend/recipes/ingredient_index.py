@@ -0,0 +1,64 @@
+from bisect import bisect_left
+from threading import Lock
+
+from .catalog import get_catalog_version
+from .models import Ingredient
+
+MAX_CHAR = chr(0x10FFFF)
+
+
+class IngredientIndex:
+    """Отсортированный по названию индекс ингредиентов в памяти процесса.
+
+    Поиск по префиксу выполняется двоичным поиском без обращения к БД.
+    Индекс строится при первом запросе и перестраивается, когда меняется
+    версия каталога.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.keys = None
+        self.items = None
+
+    def build(self):
+        rows = sorted(
+            (name.casefold(), pk, name, measurement_unit)
+            for pk, name, measurement_unit
+            in Ingredient.objects.values_list('id', 'name',
+                                              'measurement_unit')
+        )
+        keys = [row[0] for row in rows]
+        items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, pk, name, measurement_unit in rows
+        ]
+        return keys, items
+
+    def get_entries(self):
+        version = get_catalog_version()
+        entries = self.version, self.keys, self.items
+        if entries[0] != version:
+            with self.lock:
+                if self.version != version:
+                    self.keys, self.items = self.build()
+                    self.version = version
+                entries = self.version, self.keys, self.items
+        return entries[1:]
+
+    def search(self, prefix):
+        """Ингредиенты, начинающиеся с prefix: точное совпадение первым,
+        затем более короткие названия."""
+        keys, items = self.get_entries()
+        prefix = prefix.strip().casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + MAX_CHAR, start)
+        matches = sorted(
+            range(start, end),
+            key=lambda position: (len(keys[position]), keys[position],
+                                  position)
+        )
+        return [items[position] for position in matches]
+
+
+ingredient_index = IngredientIndex()
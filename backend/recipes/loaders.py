@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+from time import perf_counter
+
+from django.db import connection, transaction
+
+from backend.constants import LOADER_READ_SIZE
+
+FORMATS = ('json', 'ndjson', 'csv')
+EXTENSION_FORMATS = {'.json': 'json', '.ndjson': 'ndjson',
+                     '.jsonl': 'ndjson', '.csv': 'csv'}
+
+
+class LoaderError(Exception):
+    pass
+
+
+def iter_json_array(file, read_size=LOADER_READ_SIZE):
+    """Элементы JSON-массива по одному, без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != '[':
+                    raise LoaderError('Ожидался JSON-массив')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                obj, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise LoaderError('Некорректный JSON')
+            else:
+                if end < len(buffer) or eof:
+                    yield obj
+                    position = end
+                    continue
+        if eof:
+            raise LoaderError('Неожиданный конец файла')
+        chunk = file.read(read_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_ndjson(file):
+    for number, line in enumerate(file, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                raise LoaderError(f'Некорректный JSON в строке {number}')
+
+
+def iter_csv(file):
+    yield from csv.DictReader(file)
+
+
+def detect_format(file_path, file):
+    extension = os.path.splitext(file_path)[1].lower()
+    data_format = EXTENSION_FORMATS.get(extension)
+    if data_format != 'json':
+        return data_format or 'csv'
+    start = file.read(LOADER_READ_SIZE)
+    file.seek(0)
+    return 'json' if start.lstrip().startswith('[') else 'ndjson'
+
+
+def iter_records(file, data_format):
+    return {'json': iter_json_array, 'ndjson': iter_ndjson,
+            'csv': iter_csv}[data_format](file)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class CatalogLoader:
+    """Пакетная загрузка справочника с пропуском уже существующих строк.
+
+    На PostgreSQL пакет копируется COPY во временную таблицу и
+    переносится INSERT ... ON CONFLICT DO NOTHING, на остальных базах
+    используется bulk_create(ignore_conflicts=True).
+    """
+
+    def __init__(self, model, fields, batch_size, dry_run=False,
+                 progress=None):
+        self.model = model
+        self.fields = fields
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.progress = progress
+        self.max_lengths = {
+            name: model._meta.get_field(name).max_length for name in fields
+        }
+        self.stats = dict(read=0, invalid=0, inserted=0, seconds=0.0)
+
+    def clean(self, record):
+        if not isinstance(record, dict):
+            return None
+        row = []
+        for name in self.fields:
+            value = record.get(name)
+            value = '' if value is None else str(value).strip()
+            max_length = self.max_lengths[name]
+            if not value or (max_length and len(value) > max_length):
+                return None
+            row.append(value)
+        return tuple(row)
+
+    def load(self, records):
+        start = perf_counter()
+        initial_count = self.model.objects.count()
+        use_copy = connection.vendor == 'postgresql' and not self.dry_run
+        if use_copy:
+            self.create_staging_table()
+        try:
+            for batch in batched(records, self.batch_size):
+                rows = []
+                for record in batch:
+                    row = self.clean(record)
+                    if row is None:
+                        self.stats['invalid'] += 1
+                    else:
+                        rows.append(row)
+                self.stats['read'] += len(batch)
+                if rows and not self.dry_run:
+                    with transaction.atomic():
+                        if use_copy:
+                            self.copy_rows(rows)
+                        else:
+                            self.model.objects.bulk_create(
+                                [self.model(**dict(zip(self.fields, row)))
+                                 for row in rows],
+                                ignore_conflicts=True
+                            )
+                self.stats['seconds'] = perf_counter() - start
+                if self.progress:
+                    self.progress(self.stats)
+        finally:
+            if use_copy:
+                self.drop_staging_table()
+        if not self.dry_run:
+            self.stats['inserted'] = (self.model.objects.count()
+                                      - initial_count)
+        return self.stats
+
+    @property
+    def staging_table(self):
+        return f'{self.model._meta.db_table}_staging'
+
+    def create_staging_table(self):
+        columns = ', '.join(f'{connection.ops.quote_name(name)} text'
+                            for name in self.fields)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE '
+                f'{connection.ops.quote_name(self.staging_table)} '
+                f'({columns})'
+            )
+
+    def drop_staging_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DROP TABLE IF EXISTS '
+                f'{connection.ops.quote_name(self.staging_table)}'
+            )
+
+    def copy_rows(self, rows):
+        quote = connection.ops.quote_name
+        staging = quote(self.staging_table)
+        columns = ', '.join(quote(name) for name in self.fields)
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {staging}')
+            cursor.copy_expert(
+                f'COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {quote(self.model._meta.db_table)} '
+                f'({columns}) SELECT {columns} FROM {staging} '
+                'ON CONFLICT DO NOTHING'
+            )
@@ -0,0 +1,261 @@
+import base64
+import json
+import platform
+import random
+import subprocess
+from io import BytesIO
+from statistics import mean, median, quantiles
+from time import perf_counter
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag
+from users.models import User
+
+ENDPOINTS = ('recipe_list', 'recipe_detail', 'subscriptions',
+             'download_shopping_cart', 'ingredient_search',
+             'recipe_create', 'recipe_update')
+
+
+def percentile(values, point):
+    if len(values) < 2:
+        return values[0]
+    return quantiles(values, n=100, method='inclusive')[point - 1]
+
+
+def summarize(samples):
+    wall = [sample['wall_ms'] for sample in samples]
+    database = [sample['db_ms'] for sample in samples]
+    queries = [sample['queries'] for sample in samples]
+    return {
+        'requests': len(samples),
+        'statuses': sorted({sample['status'] for sample in samples}),
+        'queries': {'median': median(queries), 'max': max(queries)},
+        'db_ms': {'mean': round(mean(database), 3),
+                  'p50': round(percentile(database, 50), 3),
+                  'p95': round(percentile(database, 95), 3)},
+        'wall_ms': {'mean': round(mean(wall), 3),
+                    'p50': round(percentile(wall, 50), 3),
+                    'p95': round(percentile(wall, 95), 3)},
+    }
+
+
+class QueryTimer:
+    """Обертка выполнения SQL: число запросов и суммарное время."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += perf_counter() - start
+            self.queries += 1
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def image_data():
+    buffer = BytesIO()
+    Image.new('RGB', (800, 600), (120, 180, 90)).save(buffer, 'JPEG')
+    return ('data:image/jpeg;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+class Command(BaseCommand):
+    """Класс команды для замера основных эндпоинтов API."""
+
+    help = ('Замеряет число запросов к БД, время БД и p50/p95 времени '
+            'ответа основных эндпоинтов и сохраняет результат в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS,
+                            default=ENDPOINTS)
+        parser.add_argument('--output', default='benchmark.json',
+                            help='Файл для результатов.')
+        parser.add_argument('--compare',
+                            help='Предыдущий файл результатов для '
+                                 'сравнения.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть больше 0')
+        self.generator = random.Random(options['seed'])
+        self.prepare()
+        setup_test_environment()
+        try:
+            results = {
+                name: self.measure(getattr(self, name), options)
+                for name in options['endpoints']
+            }
+        finally:
+            teardown_test_environment()
+            self.cleanup()
+        report = {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'dataset': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'ingredients': Ingredient.objects.count(),
+            },
+            'iterations': options['iterations'],
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        previous = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)['results']
+        self.print_report(results, previous)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'
+        ))
+
+    def prepare(self):
+        recipes = list(Recipe.objects.values_list('id', flat=True))
+        self.ingredients = list(
+            Ingredient.objects.values_list('id', 'name')[:1000]
+        )
+        self.tags = list(Tag.objects.values_list('id', flat=True))
+        if not (recipes and self.ingredients and self.tags):
+            raise CommandError('Нет данных: выполните load_json '
+                               'и generate_data')
+        self.recipes = recipes
+        self.reader = (
+            User.objects.order_by('-subscriptions_count').first()
+        )
+        self.shopper = User.objects.filter(
+            id__in=ShoppingCart.objects.values('user')
+        ).annotate(
+            carts=Count('shopping_cart')
+        ).order_by('-carts').first() or self.reader
+        self.clients = {}
+        self.created = []
+        self.image = image_data()
+
+    def cleanup(self):
+        Recipe.objects.filter(id__in=self.created).delete()
+
+    def client(self, user):
+        if user.id not in self.clients:
+            token, _ = Token.objects.get_or_create(user=user)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            self.clients[user.id] = client
+        return self.clients[user.id]
+
+    def measure(self, request, options):
+        samples = []
+        for iteration in range(options['warmup'] + options['iterations']):
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer):
+                start = perf_counter()
+                response = request()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                wall = (perf_counter() - start) * 1000
+            if iteration >= options['warmup']:
+                samples.append({
+                    'status': response.status_code,
+                    'queries': timer.queries,
+                    'db_ms': timer.seconds * 1000,
+                    'wall_ms': wall,
+                })
+        return summarize(samples)
+
+    def print_report(self, results, previous):
+        for name, result in results.items():
+            line = (f'{name}: запросов {result["queries"]["median"]}, '
+                    f'БД p50 {result["db_ms"]["p50"]} мс, '
+                    f'p50 {result["wall_ms"]["p50"]} мс, '
+                    f'p95 {result["wall_ms"]["p95"]} мс')
+            before = (previous or {}).get(name, {}).get('wall_ms', {})
+            before = before.get('p50')
+            if before:
+                change = (result['wall_ms']['p50'] - before) / before
+                line += f' ({change:+.0%} к прошлому замеру)'
+            self.stdout.write(line)
+
+    def recipe_payload(self):
+        return {
+            'name': 'Рецепт для замера',
+            'text': 'Текст',
+            'cooking_time': self.generator.randint(1, 120),
+            'image': self.image,
+            'tags': self.generator.sample(self.tags, 1),
+            'ingredients': [
+                {'id': ingredient_id, 'amount': self.generator.randint(1, 50)}
+                for ingredient_id, _ in self.generator.sample(
+                    self.ingredients, min(5, len(self.ingredients))
+                )
+            ],
+        }
+
+    def recipe_list(self):
+        return self.client(self.reader).get(
+            '/api/recipes/', {'page': self.generator.randint(1, 10)}
+        )
+
+    def recipe_detail(self):
+        return self.client(self.reader).get(
+            f'/api/recipes/{self.generator.choice(self.recipes)}/'
+        )
+
+    def subscriptions(self):
+        return self.client(self.reader).get(
+            '/api/users/subscriptions/', {'recipes_limit': 3}
+        )
+
+    def download_shopping_cart(self):
+        return self.client(self.shopper).get(
+            '/api/recipes/download_shopping_cart/'
+        )
+
+    def ingredient_search(self):
+        _, name = self.generator.choice(self.ingredients)
+        return self.client(self.reader).get(
+            '/api/ingredients/',
+            {'name': name[:self.generator.randint(1, 3)]}
+        )
+
+    def recipe_create(self):
+        response = self.client(self.reader).post(
+            '/api/recipes/', self.recipe_payload(), format='json'
+        )
+        if response.status_code == 201:
+            self.created.append(response.data['id'])
+        return response
+
+    def recipe_update(self):
+        if not self.created:
+            self.recipe_create()
+        return self.client(self.reader).patch(
+            f'/api/recipes/{self.generator.choice(self.created)}/',
+            self.recipe_payload(), format='json'
+        )
@@ -0,0 +1,62 @@
+import random
+from statistics import mean, quantiles
+from time import perf_counter
+
+from django.core.management import BaseCommand, CommandError
+
+from recipes.ingredient_index import IngredientIndex
+from recipes.models import Ingredient
+
+
+def measure(function, prefixes):
+    timings = []
+    for prefix in prefixes:
+        start = perf_counter()
+        function(prefix)
+        timings.append((perf_counter() - start) * 1_000_000)
+    return timings
+
+
+class Command(BaseCommand):
+    """Класс команды для сравнения поиска ингредиентов по префиксу."""
+
+    help = ('Сравнивает поиск по префиксу через БД (istartswith) '
+            'с индексом в памяти.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=1000,
+                            help='Количество поисковых запросов.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('В базе нет ингредиентов, '
+                               'сначала выполните load_json')
+        generator = random.Random(options['seed'])
+        prefixes = [
+            name[:generator.randint(1, min(len(name), 4))]
+            for name in generator.choices(names, k=options['queries'])
+        ]
+        index = IngredientIndex()
+        start = perf_counter()
+        index.get_entries()
+        build_ms = (perf_counter() - start) * 1000
+        results = {
+            'БД istartswith': measure(
+                lambda prefix: list(Ingredient.objects.filter(
+                    name__istartswith=prefix
+                ).values('id', 'name', 'measurement_unit')),
+                prefixes
+            ),
+            'индекс в памяти': measure(index.search, prefixes),
+        }
+        self.stdout.write(f'Ингредиентов: {len(names)}, '
+                          f'построение индекса: {build_ms:.1f} мс')
+        for label, timings in results.items():
+            percentiles = quantiles(timings, n=100)
+            self.stdout.write(
+                f'{label}: среднее {mean(timings):.1f} мкс, '
+                f'p50 {percentiles[49]:.1f} мкс, '
+                f'p95 {percentiles[94]:.1f} мкс'
+            )
@@ -0,0 +1,203 @@
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from statistics import mean
+from time import monotonic, perf_counter, sleep
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+from .benchmark_api import git_revision, percentile
+
+SERVERS = {
+    'wsgi': ('wsgi', '/api'),
+    'asgi': ('asgi', '/api'),
+    'asgi-threadpool': ('asgi', '/api/async'),
+}
+NOTES = ('Django 3.2 не имеет асинхронного ORM: эндпоинты /api/async '
+         'выполняют синхронные представления и запросы к БД в пуле '
+         'потоков (sync_to_async), asgi — те же представления /api под '
+         'uvicorn. Сравнение измеряет модель исполнения, а не '
+         'асинхронный доступ к БД.')
+ENDPOINTS = ('recipe_list', 'recipe_detail', 'tags', 'ingredients',
+             'users')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def fetch(url, headers):
+    start = perf_counter()
+    try:
+        with urlopen(Request(url, headers=headers), timeout=60) as response:
+            response.read()
+            status = response.status
+    except HTTPError as error:
+        status = error.code
+    except (URLError, OSError):
+        status = None
+    return status, (perf_counter() - start) * 1000
+
+
+class Command(BaseCommand):
+    """Класс команды для сравнения WSGI и ASGI под нагрузкой."""
+
+    help = ('Запускает gunicorn с синхронными воркерами и с воркерами '
+            'uvicorn, нагружает эндпоинты чтения параллельными клиентами '
+            'и сохраняет пропускную способность и p50/p95 в JSON. '
+            'Несколько воркеров требуют общего кеша в CACHE_BACKEND.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=tuple(SERVERS),
+                            default=tuple(SERVERS))
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS,
+                            default=ENDPOINTS)
+        parser.add_argument('--concurrency', nargs='+', type=int,
+                            default=(1, 8, 32),
+                            help='Числа параллельных клиентов.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на эндпоинт и уровень '
+                                 'параллельности.')
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--output', default='benchmark_servers.json')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or min(options['concurrency']) < 1:
+            raise CommandError('--requests и --concurrency должны быть '
+                               'больше 0')
+        self.generator = random.Random(options['seed'])
+        self.prepare()
+        results = {}
+        for server in options['servers']:
+            interface, prefix = SERVERS[server]
+            with self.run_server(interface, options['workers']) as base_url:
+                results[server] = {
+                    name: {
+                        str(clients): self.load(
+                            base_url, prefix, name, clients,
+                            options['requests']
+                        )
+                        for clients in options['concurrency']
+                    }
+                    for name in options['endpoints']
+                }
+        report = {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'workers': options['workers'],
+            'requests': options['requests'],
+            'notes': NOTES,
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.print_report(results)
+        self.stdout.write(NOTES)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'
+        ))
+
+    def prepare(self):
+        self.recipes = list(Recipe.objects.values_list('id', flat=True))
+        if not (self.recipes and Ingredient.objects.exists()
+                and Tag.objects.exists()):
+            raise CommandError('Нет данных: выполните load_json '
+                               'и generate_data')
+        reader = User.objects.order_by('-subscriptions_count').first()
+        token, _ = Token.objects.get_or_create(user=reader)
+        self.headers = {'Authorization': f'Token {token.key}',
+                        'Accept': 'application/json'}
+
+    @contextmanager
+    def run_server(self, interface, workers):
+        port = free_port()
+        environment = dict(
+            os.environ, SERVER_INTERFACE=interface,
+            GUNICORN_BIND=f'127.0.0.1:{port}',
+            GUNICORN_WORKERS=str(workers), GUNICORN_MAX_REQUESTS='0',
+            REQUEST_LOG_LEVEL='WARNING',
+        )
+        process = subprocess.Popen(
+            (sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'),
+            cwd=settings.BASE_DIR, env=environment,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            self.wait_ready(process, base_url)
+            yield base_url
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def wait_ready(self, process, base_url, timeout=30):
+        deadline = monotonic() + timeout
+        while monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError('Сервер завершился при запуске')
+            status, _ = fetch(f'{base_url}/api/tags/', self.headers)
+            if status == 200:
+                return
+            sleep(0.2)
+        raise CommandError('Сервер не ответил за отведенное время')
+
+    def path(self, prefix, name):
+        if name == 'recipe_detail':
+            return f'{prefix}/recipes/{self.generator.choice(self.recipes)}/'
+        return prefix + {'recipe_list': '/recipes/', 'tags': '/tags/',
+                         'ingredients': '/ingredients/',
+                         'users': '/users/'}[name]
+
+    def load(self, base_url, prefix, name, clients, requests):
+        urls = [base_url + self.path(prefix, name) for _ in range(requests)]
+        with ThreadPoolExecutor(clients) as pool:
+            list(pool.map(lambda url: fetch(url, self.headers),
+                          urls[:clients]))
+            start = perf_counter()
+            samples = list(pool.map(lambda url: fetch(url, self.headers),
+                                    urls))
+            elapsed = perf_counter() - start
+        latencies = [latency for status, latency in samples
+                     if status == 200]
+        errors = len(samples) - len(latencies)
+        if not latencies:
+            return {'errors': errors}
+        return {
+            'errors': errors,
+            'rps': round(len(latencies) / elapsed, 1),
+            'latency_ms': {'mean': round(mean(latencies), 3),
+                           'p50': round(percentile(latencies, 50), 3),
+                           'p95': round(percentile(latencies, 95), 3)},
+        }
+
+    def print_report(self, results):
+        for server, endpoints in results.items():
+            for name, levels in endpoints.items():
+                for clients, result in levels.items():
+                    line = (f'{server} {name} x{clients}: '
+                            f'ошибок {result["errors"]}')
+                    if 'rps' in result:
+                        line += (f', {result["rps"]} запр./с, '
+                                 f'p50 {result["latency_ms"]["p50"]} мс, '
+                                 f'p95 {result["latency_ms"]["p95"]} мс')
+                    self.stdout.write(line)
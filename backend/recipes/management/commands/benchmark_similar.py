@@ -0,0 +1,130 @@
+import heapq
+import json
+import platform
+import random
+from statistics import mean
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+
+from backend.constants import SIMILAR_BANDS, SIMILAR_NUM_PERM
+from recipes.similar import SimilarIndex, jaccard
+from .benchmark_api import git_revision, percentile
+
+
+def exact_similar(sets, recipe_id, limit):
+    ingredients = sets[recipe_id]
+    return heapq.nlargest(
+        limit,
+        ((candidate, jaccard(ingredients, other))
+         for candidate, other in sets.items() if candidate != recipe_id),
+        key=lambda item: (item[1], -item[0])
+    )
+
+
+def recall(approximate, exact):
+    """Доля точного топа, найденная индексом.
+
+    Рецепт из индекса засчитывается, если его коэффициент не ниже
+    последнего в точном топе, поэтому равные по сходству рецепты
+    взаимозаменяемы.
+    """
+    exact = [score for _, score in exact if score > 0]
+    if not exact:
+        return 1.0
+    found = sum(1 for _, score in approximate if score >= exact[-1])
+    return min(found, len(exact)) / len(exact)
+
+
+def latency_summary(samples):
+    return {'mean': round(mean(samples), 3),
+            'p50': round(percentile(samples, 50), 3),
+            'p95': round(percentile(samples, 95), 3)}
+
+
+class Command(BaseCommand):
+    """Класс команды для оценки полноты индекса похожих рецептов."""
+
+    help = ('Строит индекс похожих рецептов во временном каталоге и '
+            'сравнивает его выдачу с точным перебором по коэффициенту '
+            'Жаккара: полнота, время построения и запросов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200,
+                            help='Число случайных рецептов-запросов.')
+        parser.add_argument('--limit', type=int, default=10,
+                            help='Размер выдачи.')
+        parser.add_argument('--output', default='benchmark_similar.json')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['queries'] < 1 or options['limit'] < 1:
+            raise CommandError('--queries и --limit должны быть больше 0')
+        with TemporaryDirectory() as directory:
+            index = SimilarIndex(directory)
+            start = perf_counter()
+            recipes = index.build()
+            build_seconds = perf_counter() - start
+            if not recipes:
+                raise CommandError('Нет рецептов с ингредиентами')
+            start = perf_counter()
+            with index.lock:
+                index.sync()
+            load_seconds = perf_counter() - start
+            sample = random.Random(options['seed']).sample(
+                sorted(index.sets), min(options['queries'], recipes)
+            )
+            results = self.measure(index, sample, options['limit'])
+        report = {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'recipes': recipes,
+            'num_perm': SIMILAR_NUM_PERM,
+            'bands': SIMILAR_BANDS,
+            'limit': options['limit'],
+            'queries': len(sample),
+            'build_seconds': round(build_seconds, 3),
+            'load_seconds': round(load_seconds, 3),
+            **results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(
+            f'Рецептов: {recipes}, построение {report["build_seconds"]} с, '
+            f'загрузка {report["load_seconds"]} с'
+        )
+        self.stdout.write(
+            f'Полнота@{options["limit"]}: {report["recall"]["mean"]} '
+            f'(минимум {report["recall"]["min"]})'
+        )
+        self.stdout.write(f'Кандидатов на запрос: {report["candidates"]}')
+        for name in ('index_ms', 'exact_ms'):
+            self.stdout.write(
+                f'{name}: p50 {report[name]["p50"]} мс, '
+                f'p95 {report[name]["p95"]} мс'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'
+        ))
+
+    def measure(self, index, sample, limit):
+        recalls, index_ms, exact_ms, candidates = [], [], [], []
+        for recipe_id in sample:
+            start = perf_counter()
+            approximate = index.similar(recipe_id, limit)
+            index_ms.append((perf_counter() - start) * 1000)
+            start = perf_counter()
+            exact = exact_similar(index.sets, recipe_id, limit)
+            exact_ms.append((perf_counter() - start) * 1000)
+            recalls.append(recall(approximate, exact))
+            candidates.append(len(index.candidates(recipe_id)))
+        return {
+            'recall': {'mean': round(mean(recalls), 4),
+                       'min': round(min(recalls), 4)},
+            'index_ms': latency_summary(index_ms),
+            'exact_ms': latency_summary(exact_ms),
+            'candidates': round(mean(candidates), 1),
+        }
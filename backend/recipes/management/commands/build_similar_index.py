@@ -0,0 +1,20 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from recipes.similar import similar_index
+
+
+class Command(BaseCommand):
+    """Класс команды для построения индекса похожих рецептов."""
+
+    help = ('Строит MinHash/LSH-индекс наборов ингредиентов рецептов и '
+            'сохраняет снимок в SIMILAR_INDEX_DIR.')
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        count = similar_index.build()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано рецептов: {count} '
+            f'за {perf_counter() - start:.1f} с'
+        ))
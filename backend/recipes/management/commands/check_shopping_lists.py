@@ -0,0 +1,32 @@
+from django.core.management import BaseCommand, CommandError
+
+from recipes.shopping_list import find_drift, rebuild
+
+
+class Command(BaseCommand):
+    """Класс команды для проверки сохраненных списков покупок."""
+
+    help = 'Сверяет списки покупок с содержимым корзин пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Пересобрать списки пользователей с расхождениями.'
+        )
+
+    def handle(self, *args, **options):
+        drift = find_drift()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Списки покупок в порядке'))
+            return
+        self.stdout.write(
+            'Расхождения у пользователей: '
+            + ', '.join(str(user_id) for user_id in drift)
+        )
+        if not options['fix']:
+            raise CommandError(f'Списков с расхождениями: {len(drift)}')
+        rebuild(drift)
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано списков: {len(drift)}')
+        )
@@ -0,0 +1,228 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from recipes import feed
+from recipes.catalog import bump_catalog_version
+from recipes.counters import rebuild_recipes, rebuild_users
+from recipes.images import store_variants, variant_path
+from recipes.loaders import batched
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.shopping_list import rebuild as rebuild_shopping_lists
+from users.models import Follow, User
+
+BATCH_SIZE = 2000
+REBUILD_CHUNK_SIZE = 500
+
+
+class Skewed:
+    """Выбор элементов с распределением Ципфа.
+
+    Ранги популярности перемешаны, поэтому популярность не связана с
+    порядком id.
+    """
+
+    def __init__(self, items, skew, generator):
+        self.items = list(items)
+        generator.shuffle(self.items)
+        self.cum_weights = list(accumulate(
+            1 / rank ** skew for rank in range(1, len(self.items) + 1)
+        ))
+        self.generator = generator
+
+    def choose(self, k=1):
+        return self.generator.choices(self.items,
+                                      cum_weights=self.cum_weights, k=k)
+
+    def sample(self, k):
+        """До k различных элементов."""
+        return list(dict.fromkeys(self.choose(k * 2)))[:k]
+
+
+def placeholder_image():
+    buffer = BytesIO()
+    Image.new('RGB', (1200, 900), (230, 160, 90)).save(buffer, 'JPEG')
+    image_hash = store_variants(buffer.getvalue())
+    return variant_path(image_hash, 'full'), image_hash
+
+
+class Command(BaseCommand):
+    """Класс команды для генерации синтетических данных."""
+
+    help = ('Создает пользователей, рецепты, избранное, списки покупок и '
+            'подписки с неравномерным распределением популярности.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=8,
+                            help='Минимальное количество тегов.')
+        parser.add_argument('--ingredients', type=int, default=0,
+                            help='Минимальное количество ингредиентов, '
+                                 'недостающие создаются.')
+        parser.add_argument('--min-ingredients', type=int, default=3)
+        parser.add_argument('--max-ingredients', type=int, default=12)
+        parser.add_argument('--favorites', type=float, default=20,
+                            help='Среднее число избранного на пользователя.')
+        parser.add_argument('--carts', type=float, default=5,
+                            help='Среднее число рецептов в корзине.')
+        parser.add_argument('--follows', type=float, default=10,
+                            help='Среднее число подписок на пользователя.')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Показатель распределения Ципфа.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить публикации.')
+        parser.add_argument('--password', default='generated-password')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.generator = random.Random(options['seed'])
+        self.options = options
+        if options['min_ingredients'] > options['max_ingredients']:
+            raise CommandError('--min-ingredients больше --max-ingredients')
+        catalog_changed = self.ensure_tags() | self.ensure_ingredients()
+        if catalog_changed:
+            bump_catalog_version()
+        user_ids = self.create_users()
+        recipe_ids = self.create_recipes(user_ids)
+        self.create_recipe_relations(recipe_ids)
+        self.create_user_relations(user_ids, recipe_ids)
+        self.rebuild(user_ids, recipe_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, '
+            f'рецептов: {len(recipe_ids)}'
+        ))
+
+    def ensure_tags(self):
+        missing = self.options['tags'] - Tag.objects.count()
+        if missing <= 0:
+            return False
+        start = Tag.objects.aggregate(last=Max('id'))['last'] or 0
+        Tag.objects.bulk_create(
+            Tag(name=f'Тег {number}', slug=f'tag-{number}',
+                color=f'#{self.generator.randrange(0x1000000):06X}')
+            for number in range(start + 1, start + missing + 1)
+        )
+        return True
+
+    def ensure_ingredients(self):
+        missing = self.options['ingredients'] - Ingredient.objects.count()
+        if missing > 0:
+            start = Ingredient.objects.aggregate(last=Max('id'))['last'] or 0
+            Ingredient.objects.bulk_create(
+                (Ingredient(name=f'ингредиент {number}',
+                            measurement_unit='г')
+                 for number in range(start + 1, start + missing + 1)),
+                batch_size=BATCH_SIZE
+            )
+        if not Ingredient.objects.exists():
+            raise CommandError('Нет ингредиентов: выполните load_json '
+                               'или передайте --ingredients')
+        return missing > 0
+
+    def create_users(self):
+        last_id = User.objects.aggregate(last=Max('id'))['last'] or 0
+        password = make_password(self.options['password'])
+        User.objects.bulk_create(
+            (User(email=f'generated{number}@example.com',
+                  username=f'generated{number}',
+                  first_name='Имя', last_name='Фамилия',
+                  password=password)
+             for number in range(last_id + 1,
+                                 last_id + self.options['users'] + 1)),
+            batch_size=BATCH_SIZE
+        )
+        return list(User.objects.filter(id__gt=last_id)
+                    .values_list('id', flat=True))
+
+    def create_recipes(self, user_ids):
+        if not user_ids:
+            return []
+        image, image_hash = placeholder_image()
+        authors = Skewed(user_ids, self.options['skew'], self.generator)
+        last_id = Recipe.objects.aggregate(last=Max('id'))['last'] or 0
+        Recipe.objects.bulk_create(
+            (Recipe(author_id=author_id, name=f'Рецепт {number}',
+                    text='Сгенерированный рецепт. ' * 10,
+                    cooking_time=self.generator.randint(5, 180),
+                    image=image, image_hash=image_hash)
+             for number, author_id in enumerate(
+                 authors.choose(self.options['recipes']), last_id + 1)),
+            batch_size=BATCH_SIZE
+        )
+        recipes = list(Recipe.objects.filter(id__gt=last_id).only('id'))
+        now = timezone.now()
+        seconds = self.options['days'] * 24 * 60 * 60
+        for recipe in recipes:
+            recipe.pub_date = now - timedelta(
+                seconds=self.generator.randrange(seconds or 1)
+            )
+        Recipe.objects.bulk_update(recipes, ('pub_date',),
+                                   batch_size=BATCH_SIZE // 4)
+        return [recipe.id for recipe in recipes]
+
+    def create_recipe_relations(self, recipe_ids):
+        tags = Skewed(Tag.objects.values_list('id', flat=True),
+                      self.options['skew'], self.generator)
+        ingredients = Skewed(Ingredient.objects.values_list('id', flat=True),
+                             self.options['skew'], self.generator)
+        for batch in batched(recipe_ids, BATCH_SIZE):
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in batch
+                for tag_id in tags.sample(self.generator.randint(1, 3))
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe_id=recipe_id,
+                                 ingredient_id=ingredient_id,
+                                 amount=self.generator.randint(1, 500))
+                for recipe_id in batch
+                for ingredient_id in ingredients.sample(
+                    self.generator.randint(self.options['min_ingredients'],
+                                           self.options['max_ingredients'])
+                )
+            )
+
+    def activity(self, mean):
+        return int(self.generator.expovariate(1 / mean)) if mean else 0
+
+    def create_user_relations(self, user_ids, recipe_ids):
+        if not recipe_ids:
+            return
+        recipes = Skewed(recipe_ids, self.options['skew'], self.generator)
+        authors = Skewed(user_ids, self.options['skew'], self.generator)
+        for batch in batched(user_ids, BATCH_SIZE // 10):
+            for model, option in ((Favorite, 'favorites'),
+                                  (ShoppingCart, 'carts')):
+                model.objects.bulk_create(
+                    (model(user_id=user_id, recipe_id=recipe_id)
+                     for user_id in batch
+                     for recipe_id in recipes.sample(
+                         self.activity(self.options[option]))),
+                    batch_size=BATCH_SIZE, ignore_conflicts=True
+                )
+            Follow.objects.bulk_create(
+                (Follow(user_id=user_id, author_id=author_id)
+                 for user_id in batch
+                 for author_id in authors.sample(
+                     self.activity(self.options['follows']))
+                 if author_id != user_id),
+                batch_size=BATCH_SIZE, ignore_conflicts=True
+            )
+
+    def rebuild(self, user_ids, recipe_ids):
+        for chunk in batched(recipe_ids, REBUILD_CHUNK_SIZE):
+            rebuild_recipes(chunk)
+        for chunk in batched(user_ids, REBUILD_CHUNK_SIZE):
+            rebuild_users(chunk)
+            rebuild_shopping_lists(chunk)
+        for chunk in batched(user_ids, REBUILD_CHUNK_SIZE):
+            feed.rebuild(chunk)
@@ -1,35 +1,92 @@
-import json
 import os
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
 
+from backend.constants import LOADER_BATCH_SIZE
+from recipes.catalog import bump_catalog_version
+from recipes.loaders import (FORMATS, CatalogLoader, LoaderError,
+                             detect_format, iter_records)
 from recipes.models import Ingredient, Tag
 
-
-def load_data(filename, model):
-    file_path = os.path.join(settings.DATA_DIR_PATH, filename)
-    if not os.path.exists(file_path):
-        print(f'Файл по пути {file_path} не найден')
-        return
-    try:
-        with open(file_path, encoding='utf-8') as file:
-            data = json.load(file)
-    except IOError:
-        print("Что-то пошло не так. Файл уже открыт.")
-        return
-    if not file.closed:
-        file.close()
-    model_data = []
-    for obj_data in data:
-        model_data.append(model(**obj_data))
-    model.objects.bulk_create(model_data)
-    print(f'Все данные модели {model.__name__} были успешно загружены')
+CATALOGS = {
+    'ingredients': (Ingredient, ('name', 'measurement_unit')),
+    'tags': (Tag, ('name', 'color', 'slug')),
+}
+DEFAULT_FILES = (
+    ('ingredients', 'ingredients.json'),
+    ('tags', 'tags.json'),
+)
 
 
 class Command(BaseCommand):
-    """Класс команды для загрузки в базу данных."""
+    """Класс команды для загрузки справочников в базу данных."""
+
+    help = ('Загружает ингредиенты и теги из JSON, NDJSON или CSV. '
+            'Файл читается потоково, существующие записи пропускаются, '
+            'поэтому команду можно запускать повторно.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file', nargs='?',
+            help='Путь к файлу. Без него загружаются ingredients.json '
+                 'и tags.json из DATA_DIR_PATH.'
+        )
+        parser.add_argument('--catalog', choices=CATALOGS,
+                            default='ingredients',
+                            help='Справочник, в который загружается файл.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Формат файла, по умолчанию по расширению.')
+        parser.add_argument('--batch-size', type=int,
+                            default=LOADER_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только прочитать и проверить файл.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        sources = ([(options['catalog'], options['file'])]
+                   if options['file'] else
+                   [(catalog, os.path.join(settings.DATA_DIR_PATH, name))
+                    for catalog, name in DEFAULT_FILES])
+        inserted = sum(self.load(catalog, file_path, options)
+                       for catalog, file_path in sources)
+        if inserted:
+            bump_catalog_version()
+
+    def report(self, stats):
+        speed = stats['read'] / stats['seconds'] if stats['seconds'] else 0
+        self.stdout.write(
+            f'  прочитано {stats["read"]}, '
+            f'отклонено {stats["invalid"]}, '
+            f'{speed:.0f} строк/с'
+        )
 
-    def handle(self, *args, **kwargs):
-        load_data('ingredients.json', Ingredient)
-        load_data('tags.json', Tag)
+    def load(self, catalog, file_path, options):
+        if not os.path.exists(file_path):
+            raise CommandError(f'Файл по пути {file_path} не найден')
+        model, fields = CATALOGS[catalog]
+        loader = CatalogLoader(model, fields, options['batch_size'],
+                               dry_run=options['dry_run'],
+                               progress=self.report)
+        self.stdout.write(f'{file_path} -> {model._meta.verbose_name_plural}')
+        with open(file_path, encoding='utf-8', newline='') as file:
+            data_format = options['format'] or detect_format(file_path, file)
+            try:
+                stats = loader.load(iter_records(file, data_format))
+            except LoaderError as error:
+                raise CommandError(f'{file_path}: {error}')
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Проверено строк: {stats["read"]}, '
+                f'отклонено: {stats["invalid"]}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Добавлено: {stats["inserted"]}, '
+                f'уже были в базе: '
+                f'{stats["read"] - stats["invalid"] - stats["inserted"]}, '
+                f'отклонено: {stats["invalid"]} '
+                f'за {stats["seconds"]:.1f} с'
+            ))
+        return stats['inserted']
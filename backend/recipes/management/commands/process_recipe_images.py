@@ -0,0 +1,21 @@
+from django.core.management import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Класс команды для обработки картинок уже созданных рецептов."""
+
+    help = ('Строит варианты картинок для рецептов, загруженных '
+            'до появления фоновой обработки.')
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipe.objects.filter(image_hash='').exclude(
+            image=''
+        ).values_list('id', flat=True))
+        for recipe_id in recipe_ids:
+            process_recipe_image(recipe_id)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано картинок: {len(recipe_ids)}')
+        )
@@ -0,0 +1,46 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import (RECIPE_COUNTERS, USER_COUNTERS, find_drift,
+                              rebuild)
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Класс команды для пересчета счетчиков рецептов и пользователей."""
+
+    help = 'Пересчитывает и проверяет денормализованные счетчики.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счетчики, ничего не изменяя.'
+        )
+
+    def handle(self, *args, **options):
+        targets = (
+            (Recipe.objects.all(), RECIPE_COUNTERS),
+            (User.objects.all(), USER_COUNTERS),
+        )
+        if not options['check']:
+            with transaction.atomic():
+                for queryset, counters in targets:
+                    updated = rebuild(queryset, counters)
+                    self.stdout.write(
+                        f'{queryset.model.__name__}: пересчитано '
+                        f'{updated} записей'
+                    )
+        drift_total = 0
+        for queryset, counters in targets:
+            for obj, mismatched in find_drift(queryset, counters):
+                drift_total += 1
+                for name, (stored, actual) in mismatched.items():
+                    self.stdout.write(
+                        f'{queryset.model.__name__} {obj.pk}: {name} '
+                        f'= {stored}, ожидалось {actual}'
+                    )
+        if drift_total:
+            raise CommandError(f'Расхождений в счетчиках: {drift_total}')
+        self.stdout.write(self.style.SUCCESS('Счетчики в порядке'))
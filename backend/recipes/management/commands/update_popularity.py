@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+
+from recipes.popularity import refresh
+
+
+class Command(BaseCommand):
+    """Класс команды для пересчета популярности рецептов."""
+
+    help = ('Обновляет оценки популярности рецептов по добавлениям в '
+            'избранное и списки покупок. Запускается периодически.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Пересчитать оценки заново вместо обновления.'
+        )
+
+    def handle(self, *args, **options):
+        updated, pruned = refresh(rebuild=options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {updated}, удалено оценок: {pruned}'
+        ))
@@ -0,0 +1,76 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FEED_BACKFILL_SIZE = 100
+FEED_FANOUT_FOLLOWERS_LIMIT = 10000
+
+
+def fill_feeds(apps, schema_editor):
+    """Последние рецепты авторов в ленты подписчиков одним INSERT ... SELECT.
+
+    Номер рецепта у автора считается оконной функцией ROW_NUMBER.
+    """
+    Follow = apps.get_model('users', 'Follow')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {quote(FeedEntry._meta.db_table)} '
+        '("user_id", "recipe_id", "author_id", "pub_date") '
+        'SELECT follow."user_id", recipe."id", recipe."author_id", '
+        'recipe."pub_date" '
+        f'FROM {quote(Follow._meta.db_table)} follow '
+        f'INNER JOIN {quote(User._meta.db_table)} author '
+        'ON author."id" = follow."author_id" '
+        'INNER JOIN (SELECT "id", "author_id", "pub_date", ROW_NUMBER() '
+        'OVER (PARTITION BY "author_id" ORDER BY "pub_date" DESC, "id" DESC) '
+        f'AS position FROM {quote(Recipe._meta.db_table)}) recipe '
+        'ON recipe."author_id" = follow."author_id" '
+        'WHERE author."followers_count" <= %s AND recipe.position <= %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (FEED_FANOUT_FOLLOWERS_LIMIT, FEED_BACKFILL_SIZE))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0007_recipe_image_hash'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации рецепта')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор рецепта')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Владелец ленты')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи лент',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_TRIGGERS = ('recipes_recipe_fts_insert', 'recipes_recipe_fts_delete',
+                'recipes_recipe_fts_update')
+POSTGRESQL_CREATE = (
+    'ALTER TABLE recipes_recipe ADD COLUMN IF NOT EXISTS search_vector '
+    'tsvector GENERATED ALWAYS AS ('
+    "setweight(to_tsvector('russian', coalesce(name, '')), 'A') "
+    "|| setweight(to_tsvector('russian', coalesce(text, '')), 'B')"
+    ') STORED',
+    'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+    'ON recipes_recipe USING GIN (search_vector)',
+)
+POSTGRESQL_DROP = (
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+SQLITE_DELETE = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text) "
+    "VALUES ('delete', old.id, old.name, old.text);"
+)
+SQLITE_INSERT = (
+    f'INSERT INTO {FTS_TABLE}(rowid, name, text) '
+    'VALUES (new.id, new.name, new.text);'
+)
+SQLITE_CREATE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    "name, text, content='recipes_recipe', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TRIGGERS[0]} '
+    f'AFTER INSERT ON recipes_recipe BEGIN {SQLITE_INSERT} END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TRIGGERS[1]} '
+    f'AFTER DELETE ON recipes_recipe BEGIN {SQLITE_DELETE} END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TRIGGERS[2]} '
+    'AFTER UPDATE OF name, text ON recipes_recipe '
+    f'BEGIN {SQLITE_DELETE} {SQLITE_INSERT} END',
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+SQLITE_DROP = (
+    *(f'DROP TRIGGER IF EXISTS {trigger}' for trigger in FTS_TRIGGERS),
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def run_statements(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            cursor.execute(statement)
+
+
+def create_index(apps, schema_editor):
+    run_statements(schema_editor, {'postgresql': POSTGRESQL_CREATE,
+                                   'sqlite': SQLITE_CREATE})
+
+
+def drop_index(apps, schema_editor):
+    run_statements(schema_editor, {'postgresql': POSTGRESQL_DROP,
+                                   'sqlite': SQLITE_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_feedentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
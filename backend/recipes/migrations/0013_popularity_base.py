@@ -0,0 +1,24 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:37
+
+from django.db import migrations, models
+
+
+def reset_popularity(apps, schema_editor):
+    """Пустая таблица пересчитывается заново при следующем обновлении."""
+    apps.get_model('recipes', 'RecipePopularity').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipepopularity',
+            name='base',
+            field=models.FloatField(default=0, verbose_name='Популярность без последних добавлений'),
+        ),
+        migrations.RunPython(reset_popularity, migrations.RunPython.noop),
+    ]
@@ -3,7 +3,9 @@ from django.db import models
 from colorfield.fields import ColorField
 
 from backend.constants import (RECIPES_NAME_SIZE, REPR_SIZE,
-                               MIN_VALUE, MAX_P_INT_VALUE)
+                               MIN_VALUE, MAX_P_INT_VALUE,
+                               RECIPE_IMAGE_HASH_LENGTH)
+from backend.deletion import CascadeModelMixin, CascadeQuerySet
 from users.models import User
 
 
@@ -41,7 +43,7 @@ class Ingredient(models.Model):
         return self.name[:REPR_SIZE]
 
 
-class Recipe(models.Model):
+class Recipe(CascadeModelMixin, models.Model):
     author = models.ForeignKey(User,
                                related_name='recipes',
                                on_delete=models.CASCADE,
@@ -49,6 +51,12 @@ class Recipe(models.Model):
     name = models.CharField('Название рецепта', max_length=RECIPES_NAME_SIZE)
     text = models.TextField('Текст рецепта')
     image = models.ImageField('Картинка рецепта', upload_to='recipes/images/')
+    image_hash = models.CharField(
+        'Хеш картинки',
+        max_length=RECIPE_IMAGE_HASH_LENGTH,
+        blank=True,
+        editable=False
+    )
     cooking_time = models.PositiveSmallIntegerField(
         'Время приготовления',
         validators=(
@@ -68,11 +76,32 @@ class Recipe(models.Model):
         'Дата публикации рецепта',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Добавлений в списки покупок',
+        default=0,
+        editable=False
+    )
+    version = models.PositiveIntegerField(
+        'Версия рецепта',
+        default=1,
+        editable=False
+    )
+
+    objects = CascadeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='recipe_pub_date_id_idx'),
+        )
 
     def __str__(self):
         return self.name[:RECIPES_NAME_SIZE]
@@ -110,6 +139,11 @@ class UserRecipeAbstractModel(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Рецепт в избранном'
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         abstract = True
@@ -135,3 +169,107 @@ class ShoppingCart(UserRecipeAbstractModel):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
         default_related_name = 'shopping_cart'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Владелец списка покупок'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField('Общее количество ингредиента')
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient} ({self.amount}) у {self.user}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Владелец ленты'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта'
+    )
+    pub_date = models.DateTimeField('Дата публикации рецепта')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'),
+        )
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-recipe'),
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=('user', 'author'),
+                         name='feed_user_author_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class RecipePopularity(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField('Популярность')
+    base = models.FloatField('Популярность без последних добавлений',
+                             default=0)
+    updated = models.DateTimeField('Дата пересчета')
+
+    class Meta:
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+        indexes = (
+            models.Index(fields=('-score', '-recipe'),
+                         name='popularity_score_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe}: {self.score:.2f}'
+
+
+class CatalogVersion(models.Model):
+    version = models.BigIntegerField('Версия справочников')
+
+    class Meta:
+        verbose_name = 'Версия справочников'
+        verbose_name_plural = 'Версии справочников'
+
+    def __str__(self):
+        return str(self.version)
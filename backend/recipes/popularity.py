@@ -0,0 +1,100 @@
+from collections import defaultdict
+from datetime import timedelta
+from math import exp, log
+
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from backend.constants import (POPULARITY_BATCH_SIZE, POPULARITY_HALF_LIFE,
+                               POPULARITY_MIN_SCORE, POPULARITY_OVERLAP)
+from .models import Favorite, RecipePopularity, ShoppingCart
+
+EVENT_MODELS = (Favorite, ShoppingCart)
+DECAY_RATE = log(2) / POPULARITY_HALF_LIFE
+WINDOW = timedelta(seconds=log(1 / POPULARITY_MIN_SCORE) / DECAY_RATE)
+OVERLAP = timedelta(seconds=POPULARITY_OVERLAP)
+
+
+def decay(seconds):
+    return exp(-DECAY_RATE * seconds)
+
+
+def event_scores(since, until, now):
+    """Сумма затухающих весов добавлений в избранное и корзину по рецептам.
+
+    Каждое добавление весит 1 в момент создания и вдвое меньше через
+    каждые POPULARITY_HALF_LIFE секунд.
+    """
+    scores = defaultdict(float)
+    for model in EVENT_MODELS:
+        events = model.objects.filter(
+            created__gt=since, created__lte=until
+        ).values_list('recipe_id', 'created')
+        for recipe_id, created in events.iterator():
+            scores[recipe_id] += decay((now - created).total_seconds())
+    return scores
+
+
+def refresh(rebuild=False):
+    """Пересчитывает таблицу популярности рецептов.
+
+    Добавление могло быть создано до прошлого пересчета, а
+    зафиксировано после него, поэтому последние POPULARITY_OVERLAP
+    секунд перечитываются при каждом пересчете. В base хранится сумма
+    весов добавлений старше этого окна, она умножается на затухание с
+    прошлого пересчета и пополняется добавлениями, вышедшими из окна;
+    score — это base плюс веса добавлений внутри окна.
+
+    Если таблица пуста или передан rebuild, оценки считаются заново по
+    событиям за окно, вне которого вклад события меньше
+    POPULARITY_MIN_SCORE. Оценки ниже POPULARITY_MIN_SCORE удаляются.
+    Удаление из избранного оценку не уменьшает.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        last = None if rebuild else RecipePopularity.objects.aggregate(
+            last=Max('updated')
+        )['last']
+        if last is None:
+            RecipePopularity.objects.all().delete()
+            since = now - WINDOW
+        else:
+            since = last - OVERLAP
+            factor = decay((now - last).total_seconds())
+            RecipePopularity.objects.update(base=F('base') * factor,
+                                            score=F('base') * factor,
+                                            updated=now)
+        settled_until = max(now - OVERLAP, since)
+        settled = event_scores(since, settled_until, now)
+        recent = event_scores(settled_until, now, now)
+        recipe_ids = settled.keys() | recent.keys()
+        existing = RecipePopularity.objects.in_bulk(list(recipe_ids))
+        for recipe_id, popularity in existing.items():
+            popularity.base += settled[recipe_id]
+            popularity.score = popularity.base + recent[recipe_id]
+        RecipePopularity.objects.bulk_update(
+            existing.values(), ('base', 'score'),
+            batch_size=POPULARITY_BATCH_SIZE
+        )
+        RecipePopularity.objects.bulk_create(
+            (RecipePopularity(recipe_id=recipe_id, base=settled[recipe_id],
+                              score=settled[recipe_id] + recent[recipe_id],
+                              updated=now)
+             for recipe_id in recipe_ids if recipe_id not in existing),
+            batch_size=POPULARITY_BATCH_SIZE
+        )
+        pruned, _ = RecipePopularity.objects.filter(
+            score__lt=POPULARITY_MIN_SCORE
+        ).delete()
+    return len(recipe_ids), pruned
+
+
+def popular_recipes(queryset):
+    """Рецепты с оценкой популярности, от самых популярных.
+
+    Рецепты без записи в таблице популярности не попадают в выдачу.
+    """
+    return queryset.filter(popularity__isnull=False).annotate(
+        popularity_score=F('popularity__score')
+    ).order_by('-popularity_score', '-id')
@@ -0,0 +1,35 @@
+from django.db import connection
+
+from .models import Recipe
+
+PREVIEW_FIELDS = ('id', 'author_id', 'name', 'image', 'image_hash',
+                  'cooking_time', 'pub_date')
+
+
+def latest_recipes(author_ids, limit=None):
+    """Последние рецепты авторов, не больше limit на автора.
+
+    Один запрос с ROW_NUMBER() OVER (PARTITION BY author_id); без limit
+    возвращаются все рецепты. Порядок: автор, затем от новых к старым.
+    """
+    if limit is None:
+        return list(Recipe.objects.filter(
+            author_id__in=author_ids
+        ).only(*PREVIEW_FIELDS).order_by('author_id', '-pub_date', '-id'))
+    if not author_ids or not limit:
+        return []
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(name) for name in PREVIEW_FIELDS)
+    placeholders = ', '.join(['%s'] * len(author_ids))
+    return list(Recipe.objects.raw(
+        f'SELECT {columns} FROM ('
+        f'SELECT {columns}, ROW_NUMBER() OVER ('
+        f'PARTITION BY {quote("author_id")} '
+        f'ORDER BY {quote("pub_date")} DESC, {quote("id")} DESC'
+        f') AS {quote("position")} '
+        f'FROM {quote(Recipe._meta.db_table)} '
+        f'WHERE {quote("author_id")} IN ({placeholders})'
+        f') {quote("ranked")} WHERE {quote("position")} <= %s '
+        f'ORDER BY {quote("author_id")}, {quote("position")}',
+        (*author_ids, limit)
+    ))
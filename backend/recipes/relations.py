@@ -0,0 +1,144 @@
+import sqlite3
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from users.models import Follow, User
+from . import feed, shopping_list
+from .counters import increment
+from .models import Recipe, ShoppingCart
+from .signals import RECIPE_COUNTER_FIELDS
+
+
+def returns_rows():
+    return connection.vendor == 'postgresql' or (
+        connection.vendor == 'sqlite'
+        and sqlite3.sqlite_version_info >= (3, 35)
+    )
+
+
+def execute_returning(sql, params, ids, column):
+    """Выполняет INSERT/DELETE по списку ids и возвращает затронутые id.
+
+    Запрос с RETURNING выполняется один раз; если база его не
+    поддерживает, запрос повторяется для каждого id, а результат
+    определяется по rowcount.
+    """
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        if returns_rows():
+            cursor.execute(
+                sql.format(ids=placeholders)
+                + f' RETURNING {quote(column)}',
+                (*params, *ids)
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+        affected = []
+        for pk in ids:
+            cursor.execute(sql.format(ids='%s'), (*params, pk))
+            if cursor.rowcount:
+                affected.append(pk)
+        return affected
+
+
+def insert_relations(model, column, target, user_id, ids, **values):
+    """INSERT ... SELECT существующих строк target с пропуском дублей.
+
+    values задает значения остальных колонок, одинаковые для всех строк.
+    """
+    quote = connection.ops.quote_name
+    columns = ''.join(f', {quote(name)}' for name in values)
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} '
+        f'({quote("user_id")}, {quote(column)}{columns}) '
+        f'SELECT %s, {quote("id")}{", %s" * len(values)} '
+        f'FROM {quote(target._meta.db_table)} '
+        f'WHERE {quote("id")} <> %s AND {quote("id")} IN ({{ids}}) '
+        f'ON CONFLICT ({quote("user_id")}, {quote(column)}) DO NOTHING'
+    )
+    exclude = user_id if target is User else 0
+    return execute_returning(sql, (user_id, *values.values(), exclude),
+                             ids, column)
+
+
+def delete_relations(model, column, user_id, ids):
+    quote = connection.ops.quote_name
+    sql = (
+        f'DELETE FROM {quote(model._meta.db_table)} '
+        f'WHERE {quote("user_id")} = %s AND {quote(column)} IN ({{ids}})'
+    )
+    return execute_returning(sql, (user_id,), ids, column)
+
+
+def add_recipes(model, user_id, recipe_ids):
+    """Добавляет рецепты в избранное или корзину одним INSERT.
+
+    Уже добавленные и несуществующие рецепты пропускаются. Счетчики и
+    список покупок обновляются в той же транзакции. Возвращает id
+    добавленных рецептов.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    if not recipe_ids:
+        return []
+    with transaction.atomic():
+        added = insert_relations(
+            model, 'recipe_id', Recipe, user_id, recipe_ids,
+            created=connection.ops.adapt_datetimefield_value(timezone.now())
+        )
+        if added:
+            increment(Recipe.objects.filter(pk__in=added),
+                      RECIPE_COUNTER_FIELDS[model])
+            if model is ShoppingCart:
+                shopping_list.add_recipes(user_id, added)
+    return added
+
+
+def remove_recipes(model, user_id, recipe_ids):
+    """Убирает рецепты из избранного или корзины одним DELETE."""
+    recipe_ids = sorted(set(recipe_ids))
+    if not recipe_ids:
+        return []
+    with transaction.atomic():
+        removed = delete_relations(model, 'recipe_id', user_id, recipe_ids)
+        if removed:
+            increment(Recipe.objects.filter(pk__in=removed),
+                      RECIPE_COUNTER_FIELDS[model], -1)
+            if model is ShoppingCart:
+                shopping_list.remove_recipes(user_id, removed)
+    return removed
+
+
+def follow(user_id, author_ids):
+    """Подписывает пользователя на авторов одним INSERT.
+
+    Подписка на себя, несуществующих и уже отслеживаемых авторов
+    пропускается. Возвращает id новых авторов.
+    """
+    author_ids = sorted(set(author_ids))
+    if not author_ids:
+        return []
+    with transaction.atomic():
+        added = insert_relations(Follow, 'author_id', User, user_id,
+                                 author_ids)
+        if added:
+            increment(User.objects.filter(pk__in=added), 'followers_count')
+            increment(User.objects.filter(pk=user_id),
+                      'subscriptions_count', len(added))
+            feed.follows_created(user_id, added)
+    return added
+
+
+def unfollow(user_id, author_ids):
+    author_ids = sorted(set(author_ids))
+    if not author_ids:
+        return []
+    with transaction.atomic():
+        removed = delete_relations(Follow, 'author_id', user_id, author_ids)
+        if removed:
+            increment(User.objects.filter(pk__in=removed),
+                      'followers_count', -1)
+            increment(User.objects.filter(pk=user_id),
+                      'subscriptions_count', -len(removed))
+            feed.follows_deleted(user_id, removed)
+    return removed
@@ -0,0 +1,124 @@
+import re
+
+from django.db import NotSupportedError, connections
+from django.db.models import BooleanField, FloatField, Value
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.expressions import RawSQL
+
+from .models import Recipe
+
+SEARCH_CONFIG = 'russian'
+SEARCH_MIGRATION = ('recipes', '0009_recipe_search')
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_TRIGGERS = ('recipes_recipe_fts_insert', 'recipes_recipe_fts_delete',
+                'recipes_recipe_fts_update')
+NAME_WEIGHT = 10.0
+TEXT_WEIGHT = 1.0
+
+POSTGRESQL_CREATE = (
+    f'ALTER TABLE recipes_recipe ADD COLUMN IF NOT EXISTS search_vector '
+    f'tsvector GENERATED ALWAYS AS ('
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') "
+    f"|| setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')), 'B')"
+    f') STORED',
+    'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+    'ON recipes_recipe USING GIN (search_vector)',
+)
+SQLITE_TABLE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    "name, text, content='recipes_recipe', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+SQLITE_DELETE = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text) "
+    "VALUES ('delete', old.id, old.name, old.text);"
+)
+SQLITE_INSERT = (
+    f'INSERT INTO {FTS_TABLE}(rowid, name, text) '
+    'VALUES (new.id, new.name, new.text);'
+)
+SQLITE_TRIGGERS = (
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TRIGGERS[0]} '
+    f'AFTER INSERT ON recipes_recipe BEGIN {SQLITE_INSERT} END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TRIGGERS[1]} '
+    f'AFTER DELETE ON recipes_recipe BEGIN {SQLITE_DELETE} END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TRIGGERS[2]} '
+    'AFTER UPDATE OF name, text ON recipes_recipe '
+    f'BEGIN {SQLITE_DELETE} {SQLITE_INSERT} END',
+)
+
+
+def ensure_search_index(connection):
+    """Создает полнотекстовый индекс рецептов, если его нет.
+
+    На PostgreSQL это генерируемый столбец tsvector с GIN-индексом, на
+    SQLite — внешняя таблица FTS5 с триггерами. SQLite теряет триггеры,
+    когда миграция пересоздает таблицу рецептов, поэтому функция
+    вызывается и после каждого migrate: недостающие триггеры
+    создаются заново, а индекс перестраивается.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for statement in POSTGRESQL_CREATE:
+                cursor.execute(statement)
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' "
+                f"AND name IN ({', '.join(['%s'] * len(FTS_TRIGGERS))})",
+                FTS_TRIGGERS
+            )
+            if cursor.fetchone()[0] == len(FTS_TRIGGERS):
+                return
+            cursor.execute(SQLITE_TABLE)
+            for statement in SQLITE_TRIGGERS:
+                cursor.execute(statement)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+
+
+def search_index_migrated(sender, using, **kwargs):
+    connection = connections[using]
+    if SEARCH_MIGRATION in MigrationRecorder(connection).applied_migrations():
+        ensure_search_index(connection)
+
+
+def fts_query(query):
+    """Запрос FTS5 из слов пользователя: все слова как префиксы."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def search_recipes(queryset, query, connection):
+    """Рецепты, найденные по названию и тексту, с аннотацией search_rank.
+
+    Чем выше search_rank, тем релевантнее рецепт; название весит больше
+    текста.
+    """
+    table = Recipe._meta.db_table
+    if connection.vendor == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.alias(search_match=RawSQL(
+            f'"{table}"."search_vector" @@ {tsquery}', (query,),
+            output_field=BooleanField()
+        )).filter(search_match=True).annotate(search_rank=RawSQL(
+            f'ts_rank_cd("{table}"."search_vector", {tsquery})::float8',
+            (query,), output_field=FloatField()
+        ))
+    if connection.vendor == 'sqlite':
+        match = fts_query(query)
+        if not match:
+            return queryset.annotate(
+                search_rank=Value(0.0, output_field=FloatField())
+            ).none()
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,)
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {NAME_WEIGHT}, {TEXT_WEIGHT}) '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = "{table}"."id"',
+            (match,), output_field=FloatField()
+        ))
+    raise NotSupportedError(
+        f'Полнотекстовый поиск не поддерживается для {connection.vendor}'
+    )
@@ -0,0 +1,170 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from users.models import User
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def recipe_amounts(recipe_ids):
+    """Количество каждого ингредиента в рецептах: {recipe_id: {id: amount}}."""
+    amounts = defaultdict(dict)
+    rows = (
+        RecipeIngredient.objects
+        .filter(recipe_id__in=recipe_ids)
+        .values('recipe_id', 'ingredient_id')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    for row in rows:
+        amounts[row['recipe_id']][row['ingredient_id']] = row['total']
+    return amounts
+
+
+def apply_delta(user_ids, delta):
+    """Изменяет списки покупок пользователей на delta: {ingredient_id: n}."""
+    delta = {ingredient: n for ingredient, n in delta.items() if n}
+    user_ids = sorted(set(user_ids))
+    if not delta or not user_ids:
+        return
+    with transaction.atomic():
+        list(User.objects.select_for_update()
+             .filter(pk__in=user_ids).order_by('pk').values_list('pk'))
+        items = ShoppingListItem.objects.filter(user_id__in=user_ids,
+                                                ingredient_id__in=delta)
+        existing = set(items.values_list('user_id', 'ingredient_id'))
+        if existing:
+            items.update(amount=Greatest(
+                F('amount') + Case(
+                    *(When(ingredient_id=ingredient, then=Value(n))
+                      for ingredient, n in delta.items()),
+                    output_field=IntegerField()
+                ),
+                0
+            ))
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(user_id=user, ingredient_id=ingredient,
+                             amount=n)
+            for user in user_ids
+            for ingredient, n in delta.items()
+            if n > 0 and (user, ingredient) not in existing
+        )
+        if any(n < 0 for n in delta.values()):
+            items.filter(amount=0).delete()
+
+
+def add_recipe(user_id, recipe_id):
+    apply_delta((user_id,), recipe_amounts((recipe_id,))[recipe_id])
+
+
+def remove_recipe(user_id, recipe_id):
+    apply_delta((user_id,), {
+        ingredient: -amount for ingredient, amount
+        in recipe_amounts((recipe_id,))[recipe_id].items()
+    })
+
+
+def remove_recipe_from_carts(recipe_id):
+    """Убирает рецепт из списков покупок всех, у кого он в корзине."""
+    apply_recipe_delta(recipe_id, {
+        ingredient: -amount for ingredient, amount
+        in recipe_amounts((recipe_id,))[recipe_id].items()
+    })
+
+
+def recipes_delta(recipe_ids, sign):
+    delta = defaultdict(int)
+    for amounts in recipe_amounts(recipe_ids).values():
+        for ingredient, amount in amounts.items():
+            delta[ingredient] += sign * amount
+    return delta
+
+
+def add_recipes(user_id, recipe_ids):
+    apply_delta((user_id,), recipes_delta(recipe_ids, 1))
+
+
+def remove_recipes(user_id, recipe_ids):
+    apply_delta((user_id,), recipes_delta(recipe_ids, -1))
+
+
+@contextmanager
+def tracking_recipe_ingredients(recipe_ids):
+    """Переносит изменения ингредиентов рецептов в списки покупок."""
+    recipe_ids = set(recipe_ids)
+    with transaction.atomic():
+        before = recipe_amounts(recipe_ids)
+        yield
+        after = recipe_amounts(recipe_ids)
+        for recipe_id in recipe_ids:
+            old, new = before[recipe_id], after[recipe_id]
+            apply_recipe_delta(recipe_id, {
+                ingredient: new.get(ingredient, 0) - old.get(ingredient, 0)
+                for ingredient in old.keys() | new.keys()
+            })
+
+
+def apply_recipe_delta(recipe_id, delta):
+    """Переносит изменение ингредиентов рецепта в корзины с ним."""
+    if any(delta.values()):
+        apply_delta(
+            ShoppingCart.objects.filter(recipe_id=recipe_id)
+            .values_list('user_id', flat=True),
+            delta
+        )
+
+
+def expected_items(user_ids=None):
+    """Списки покупок, посчитанные по корзинам, упорядоченные по user_id."""
+    lookup = ({'recipe__shopping_cart__user__in': user_ids}
+              if user_ids is not None
+              else {'recipe__shopping_cart__isnull': False})
+    return (
+        RecipeIngredient.objects
+        .filter(**lookup)
+        .values_list('recipe__shopping_cart__user', 'ingredient_id')
+        .annotate(total=Sum('amount'))
+        .order_by('recipe__shopping_cart__user', 'ingredient_id')
+        .iterator()
+    )
+
+
+def stored_items(user_ids=None):
+    queryset = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    return (
+        queryset
+        .values_list('user_id', 'ingredient_id', 'amount')
+        .order_by('user_id', 'ingredient_id')
+        .iterator()
+    )
+
+
+def by_user(rows):
+    for user_id, group in groupby(rows, key=lambda row: row[0]):
+        yield user_id, {ingredient: amount for _, ingredient, amount in group}
+
+
+def find_drift(user_ids=None):
+    """Возвращает id пользователей, чьи списки расходятся с корзинами."""
+    expected = dict(by_user(expected_items(user_ids)))
+    drift = []
+    for user_id, items in by_user(stored_items(user_ids)):
+        if expected.pop(user_id, {}) != items:
+            drift.append(user_id)
+    return sorted(drift + list(expected))
+
+
+def rebuild(user_ids):
+    with transaction.atomic():
+        ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(user_id=user, ingredient_id=ingredient,
+                             amount=amount)
+            for user, ingredient, amount in expected_items(user_ids)
+        )
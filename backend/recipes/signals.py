@@ -0,0 +1,133 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from backend.deletion import deleting_users
+from users.models import Follow, User
+from . import feed, shopping_list
+from .counters import increment
+from .catalog import bump_catalog_version
+from .fragments import invalidate_recipe_fragment
+from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from .similar import schedule_similar_update
+from .tasks import run_in_background
+
+RECIPE_COUNTER_FIELDS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def user_recipe_created(sender, instance, created, **kwargs):
+    if created:
+        increment(Recipe.objects.filter(pk=instance.recipe_id),
+                  RECIPE_COUNTER_FIELDS[sender])
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def user_recipe_deleted(sender, instance, **kwargs):
+    if deleting_users.get() is not None:
+        return
+    increment(Recipe.objects.filter(pk=instance.recipe_id),
+              RECIPE_COUNTER_FIELDS[sender], -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_created(sender, instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_deleting(sender, instance, **kwargs):
+    # pre_delete: ингредиенты рецепта к post_delete могут быть удалены.
+    if deleting_users.get() is not None:
+        return
+    shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        increment(User.objects.filter(pk=instance.author_id),
+                  'recipes_count')
+        run_in_background(feed.fan_out, instance.id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    # Избранное и корзины удаляемого рецепта: его счетчики не нужны,
+    # списки покупок меняются одним запросом на всех пользователей.
+    if deleting_users.get() is not None:
+        shopping_list.remove_recipe_from_carts(instance.id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    if instance.author_id not in (deleting_users.get() or ()):
+        increment(User.objects.filter(pk=instance.author_id),
+                  'recipes_count', -1)
+    schedule_similar_update(instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_recipe_fragment(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        increment(User.objects.filter(pk=instance.author_id),
+                  'followers_count')
+        increment(User.objects.filter(pk=instance.user_id),
+                  'subscriptions_count')
+        feed.follow_created(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    if deleting_users.get() is not None:
+        return
+    increment(User.objects.filter(pk=instance.author_id),
+              'followers_count', -1)
+    increment(User.objects.filter(pk=instance.user_id),
+              'subscriptions_count', -1)
+    feed.follow_deleted(
+        instance.user_id, instance.author_id,
+        User.objects.filter(pk=instance.author_id).values_list(
+            'followers_count', flat=True
+        ).first()
+    )
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Избранное, корзины и подписки удаляемого пользователя: по одному
+    # UPDATE на счетчик. Его собственный список покупок и лента
+    # удаляются каскадом, рецепты обрабатывает recipe_deleting.
+    if deleting_users.get() is None:
+        return
+    for model, field in RECIPE_COUNTER_FIELDS.items():
+        increment(Recipe.objects.filter(
+            pk__in=model.objects.filter(user=instance).values('recipe_id')
+        ), field, -1)
+    authors = list(Follow.objects.filter(user=instance)
+                   .values_list('author_id', flat=True))
+    increment(User.objects.filter(pk__in=authors), 'followers_count', -1)
+    increment(User.objects.filter(
+        pk__in=Follow.objects.filter(author=instance).values('user_id')
+    ), 'subscriptions_count', -1)
+    if authors:
+        feed.follows_deleted(instance.id, authors)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
@@ -0,0 +1,242 @@
+import heapq
+import json
+import logging
+import os
+import pickle
+import random
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+
+from django.conf import settings
+
+from backend.constants import SIMILAR_BANDS, SIMILAR_NUM_PERM
+from .models import RecipeIngredient
+from .tasks import run_in_background
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+HASH_PRIME = (1 << 61) - 1
+SIGNATURE_MASK = (1 << 32) - 1
+ROWS = SIMILAR_NUM_PERM // SIMILAR_BANDS
+SNAPSHOT_FORMAT = (2, SIMILAR_NUM_PERM, SIMILAR_BANDS)
+SNAPSHOT_NAME = 'snapshot.pickle'
+JOURNAL_NAME = 'journal.jsonl'
+
+generator = random.Random(0)
+HASHES = [(generator.randrange(1, HASH_PRIME), generator.randrange(HASH_PRIME))
+          for _ in range(SIMILAR_NUM_PERM)]
+
+
+def minhash(ingredient_ids):
+    return tuple(
+        min((a * pk + b) % HASH_PRIME for pk in ingredient_ids)
+        & SIGNATURE_MASK
+        for a, b in HASHES
+    )
+
+
+def band_keys(signature):
+    return [hash((band, signature[band * ROWS:(band + 1) * ROWS]))
+            for band in range(SIMILAR_BANDS)]
+
+
+def jaccard(first, second):
+    return len(first & second) / len(first | second)
+
+
+def recipe_sets(recipe_ids=None):
+    rows = RecipeIngredient.objects.values_list('recipe_id', 'ingredient_id')
+    if recipe_ids is not None:
+        rows = rows.filter(recipe_id__in=recipe_ids)
+    sets = defaultdict(set)
+    for recipe_id, ingredient_id in rows.iterator():
+        sets[recipe_id].add(ingredient_id)
+    return {recipe_id: frozenset(ingredients)
+            for recipe_id, ingredients in sets.items()}
+
+
+class SimilarIndex:
+    """MinHash/LSH-индекс наборов ингредиентов рецептов.
+
+    Сигнатура рецепта из SIMILAR_NUM_PERM минимальных хешей делится на
+    SIMILAR_BANDS полос; кандидаты — рецепты, совпавшие с данным хотя бы
+    в одной полосе. Кандидаты ранжируются по точному коэффициенту
+    Жаккара.
+
+    На диске хранится снимок индекса и журнал изменений после него.
+    Снимок строит команда build_similar_index, изменения рецептов
+    дописываются в журнал, а каждый процесс перед запросом подхватывает
+    новый снимок и непрочитанные записи журнала. Пока снимка нет,
+    похожих рецептов нет: запросы индекс не строят.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = Lock()
+        self.snapshot_key = None
+        self.loaded = False
+        self.offset = 0
+        self.reset({}, {})
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.directory, SNAPSHOT_NAME)
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.directory, JOURNAL_NAME)
+
+    def reset(self, sets, signatures):
+        self.sets = sets
+        self.signatures = signatures
+        self.buckets = defaultdict(set)
+        for recipe_id, signature in signatures.items():
+            for key in band_keys(signature):
+                self.buckets[key].add(recipe_id)
+
+    def add(self, recipe_id, ingredient_ids):
+        self.remove(recipe_id)
+        if not ingredient_ids:
+            return
+        signature = minhash(ingredient_ids)
+        self.sets[recipe_id] = frozenset(ingredient_ids)
+        self.signatures[recipe_id] = signature
+        for key in band_keys(signature):
+            self.buckets[key].add(recipe_id)
+
+    def remove(self, recipe_id):
+        signature = self.signatures.pop(recipe_id, None)
+        self.sets.pop(recipe_id, None)
+        if signature is None:
+            return
+        for key in band_keys(signature):
+            bucket = self.buckets[key]
+            bucket.discard(recipe_id)
+            if not bucket:
+                del self.buckets[key]
+
+    @contextmanager
+    def journal(self, shared=False):
+        """Журнал под блокировкой: общей для чтения, иначе исключительной."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.journal_path, 'a+b') as journal:
+            if fcntl is not None:
+                fcntl.flock(journal,
+                            fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield journal
+
+    def build(self):
+        """Строит снимок по всем рецептам и сохраняет его на диск.
+
+        Записи журнала, добавленные во время построения, переносятся в
+        новый журнал, остальные уже учтены в снимке.
+        """
+        with self.journal() as journal:
+            start = journal.seek(0, os.SEEK_END)
+        sets = recipe_sets()
+        signatures = {recipe_id: minhash(ingredients)
+                      for recipe_id, ingredients in sets.items()}
+        temporary = f'{self.snapshot_path}.{os.getpid()}'
+        with open(temporary, 'wb') as file:
+            pickle.dump(SNAPSHOT_FORMAT, file, pickle.HIGHEST_PROTOCOL)
+            pickle.dump((sets, signatures), file, pickle.HIGHEST_PROTOCOL)
+        with self.journal() as journal:
+            journal.seek(start)
+            tail = journal.read()
+            os.replace(temporary, self.snapshot_path)
+            journal.truncate(0)
+            journal.write(tail)
+        return len(sets)
+
+    def load(self):
+        """Загружает снимок; False, если формат снимка устарел."""
+        with open(self.snapshot_path, 'rb') as file:
+            try:
+                if pickle.load(file) != SNAPSHOT_FORMAT:
+                    return False
+            except (pickle.UnpicklingError, EOFError, ValueError):
+                return False
+            sets, signatures = pickle.load(file)
+        self.reset(sets, signatures)
+        return True
+
+    def sync(self):
+        """Подхватывает новый снимок и записи журнала после него.
+
+        Возвращает False, если снимка нет или его формат устарел: такой
+        снимок перестраивает команда build_similar_index.
+        """
+        # Снимок заменяется под исключительной блокировкой журнала,
+        # поэтому снимок и смещение в журнале читаются под общей.
+        with self.journal(shared=True) as journal:
+            try:
+                stat = os.stat(self.snapshot_path)
+                snapshot_key = (stat.st_ino, stat.st_mtime_ns)
+            except FileNotFoundError:
+                snapshot_key = None
+            if snapshot_key != self.snapshot_key:
+                self.snapshot_key = snapshot_key
+                self.offset = 0
+                self.loaded = snapshot_key is not None and self.load()
+                if not self.loaded:
+                    self.reset({}, {})
+                    logger.warning('Нет снимка индекса похожих рецептов в '
+                                   '%s: выполните build_similar_index',
+                                   self.directory)
+            if not self.loaded:
+                return False
+            journal.seek(self.offset)
+            data = journal.read()
+        for line in data.splitlines():
+            entry = json.loads(line)
+            self.add(entry['id'], entry['ingredients'])
+        self.offset += len(data)
+        return True
+
+    def update(self, recipe_ids):
+        """Записывает в журнал текущие наборы ингредиентов рецептов."""
+        sets = recipe_sets(recipe_ids)
+        lines = ''.join(
+            json.dumps({'id': recipe_id,
+                        'ingredients': sorted(sets.get(recipe_id, ()))})
+            + '\n'
+            for recipe_id in recipe_ids
+        )
+        with self.journal() as journal:
+            journal.write(lines.encode())
+
+    def candidates(self, recipe_id):
+        """Рецепты, совпавшие с данным хотя бы в одной полосе."""
+        candidates = set()
+        for key in band_keys(self.signatures[recipe_id]):
+            candidates |= self.buckets.get(key, set())
+        candidates.discard(recipe_id)
+        return candidates
+
+    def similar(self, recipe_id, limit):
+        """До limit пар (id рецепта, коэффициент Жаккара) по убыванию."""
+        with self.lock:
+            if not self.sync():
+                return []
+            ingredients = self.sets.get(recipe_id)
+            if not ingredients:
+                return []
+            return heapq.nlargest(
+                limit,
+                ((candidate, jaccard(ingredients, self.sets[candidate]))
+                 for candidate in self.candidates(recipe_id)),
+                key=lambda item: (item[1], -item[0])
+            )
+
+
+similar_index = SimilarIndex(settings.SIMILAR_INDEX_DIR)
+
+
+def schedule_similar_update(*recipe_ids):
+    run_in_background(similar_index.update, recipe_ids)
@@ -0,0 +1,35 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+executor = (ThreadPoolExecutor(max_workers=settings.BACKGROUND_WORKERS,
+                               thread_name_prefix='foodgram-worker')
+            if settings.BACKGROUND_WORKERS else None)
+
+
+def run_task(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s', function.__name__)
+    finally:
+        if executor is not None:
+            connection.close()
+
+
+def run_in_background(function, *args):
+    """Выполняет задачу в пуле потоков после фиксации транзакции.
+
+    При BACKGROUND_WORKERS = 0 задача выполняется синхронно.
+    """
+    def submit():
+        if executor is None:
+            run_task(function, *args)
+        else:
+            executor.submit(run_task, function, *args)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,114 @@
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.admin_tools import EstimatedCountPaginator
+from recipes.models import Favorite, Recipe
+from users.models import Follow, User
+from .utils import (FoodgramTestCase, create_ingredients, create_recipe,
+                    create_tags, create_user)
+
+CHANGELISTS = (
+    '/admin/recipes/recipe/',
+    '/admin/recipes/recipeingredient/',
+    '/admin/recipes/favorite/',
+    '/admin/recipes/shoppingcart/',
+    '/admin/users/user/',
+    '/admin/users/follow/',
+)
+
+
+class AdminChangelistTests(FoodgramTestCase):
+    """Списки админки не зависят от размера таблиц."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', is_staff=True, is_superuser=True)
+        cls.tags = create_tags(2)
+        cls.ingredients = create_ingredients(3)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            author = create_user(f'author{User.objects.count()}')
+            recipe = create_recipe(author, self.ingredients, self.tags,
+                                   name=f'Суп {author.username}')
+            Favorite.objects.create(user=self.admin, recipe=recipe)
+            Follow.objects.create(user=self.admin, author=author)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_queries_constant(self):
+        urls = [*CHANGELISTS,
+                '/admin/recipes/recipe/?name=Суп&author=author',
+                '/admin/users/user/?username=author']
+        self.add_rows(2)
+        counts = [self.count_queries(url) for url in urls]
+        self.add_rows(10)
+        self.assertEqual([self.count_queries(url) for url in urls], counts)
+
+    def test_input_filter(self):
+        self.add_rows(3)
+        first, *_ = Recipe.objects.order_by('id')
+        response = self.client.get('/admin/recipes/recipe/',
+                                   {'author': first.author.username})
+        self.assertEqual(list(response.context['cl'].result_list), [first])
+        response = self.client.get('/admin/recipes/recipe/',
+                                   {'name': 'Суп', 'author': '', 'o': '1'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertContains(response,
+                            '<input type="hidden" name="o" value="1">',
+                            html=True)
+        response = self.client.get('/admin/recipes/recipe/',
+                                   {'name': 'борщ'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_change_pages(self):
+        self.add_rows(1)
+        recipe = Recipe.objects.get()
+        for url in (f'/admin/recipes/recipe/{recipe.id}/change/',
+                    f'/admin/users/user/{recipe.author_id}/change/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class EstimatedCountPaginatorTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        for number in range(3):
+            create_recipe(author, name=f'Рецепт {number}')
+
+    def test_filtered_count_exact(self):
+        paginator = EstimatedCountPaginator(
+            Recipe.objects.filter(name__startswith='Рецепт').order_by('id'),
+            2
+        )
+        self.assertEqual(paginator.count, 3)
+
+    def test_small_table_count_exact(self):
+        paginator = EstimatedCountPaginator(Recipe.objects.order_by('id'), 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+    @skipUnless(connection.vendor == 'postgresql', 'нужен PostgreSQL')
+    def test_large_table_estimated(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE recipes_recipe')
+        with mock.patch('recipes.admin_tools.ADMIN_ESTIMATED_COUNT_MIN', 1), \
+                CaptureQueriesContext(connection) as context:
+            count = EstimatedCountPaginator(
+                Recipe.objects.order_by('id'), 2
+            ).count
+        self.assertGreaterEqual(count, 1)
+        self.assertIn('pg_class', context.captured_queries[0]['sql'])
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'])
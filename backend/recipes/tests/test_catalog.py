@@ -0,0 +1,137 @@
+from time import time
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from api.views import IngredientViewSet, TagViewSet
+from backend.constants import CATALOG_VERSION_TIMEOUT
+from recipes.catalog import (bump_catalog_version, catalog_objects,
+                             get_catalog_version)
+from recipes.models import Ingredient, Tag
+from .utils import (FoodgramTestCase, create_ingredients, create_tags,
+                    create_user, image_data)
+
+
+def other_process():
+    """Кеш другого процесса: изменения видны только через БД."""
+    return mock.patch('recipes.catalog.cache',
+                      LocMemCache('other-process', {}))
+
+
+def cache_expired():
+    clock = mock.Mock(time=lambda: time() + CATALOG_VERSION_TIMEOUT + 1)
+    return mock.patch('django.core.cache.backends.locmem.time', clock)
+
+
+class CatalogVersionTests(FoodgramTestCase):
+
+    def test_bump_increases_version(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_catalog_version()
+        self.assertGreater(get_catalog_version(), version)
+
+    def test_bump_in_other_process(self):
+        version = get_catalog_version()
+        with other_process():
+            bump_catalog_version()
+        self.assertEqual(get_catalog_version(), version)
+        with cache_expired():
+            self.assertGreater(get_catalog_version(), version)
+
+    def test_catalog_response_after_bump_in_other_process(self):
+        tag, = create_tags(1)
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.data[0]['name'], tag.name)
+        Tag.objects.filter(pk=tag.pk).update(name='Новое название')
+        with other_process():
+            bump_catalog_version()
+        with cache_expired():
+            updated = self.client.get('/api/tags/')
+        self.assertEqual(updated.data[0]['name'], 'Новое название')
+        self.assertNotEqual(updated['ETag'], response['ETag'])
+
+
+class CatalogResponseCacheTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = create_tags(3)
+        create_ingredients(2)
+
+    def setUp(self):
+        super().setUp()
+        for viewset in (IngredientViewSet, TagViewSet):
+            viewset.catalog_cache_version = None
+
+    def test_unused_params_share_entry(self):
+        first = self.client.get('/api/tags/', {'junk': 1})
+        second = self.client.get('/api/tags/', {'other': 2})
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(len(TagViewSet.catalog_cache), 1)
+
+    def test_size_limited(self):
+        with mock.patch('api.caching.CATALOG_CACHE_SIZE', 2):
+            for tag in self.tags:
+                self.client.get(f'/api/tags/{tag.id}/')
+        self.assertEqual(list(TagViewSet.catalog_cache),
+                         [('retrieve', str(tag.id), ())
+                          for tag in self.tags[1:]])
+
+    def test_filtered_list_not_stored(self):
+        first = self.client.get('/api/ingredients/', {'name': 'Ингр'})
+        second = self.client.get('/api/ingredients/', {'name': 'Ин'})
+        self.assertEqual(len(first.data), 2)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(len(IngredientViewSet.catalog_cache), 0)
+
+
+class CatalogObjectsTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = create_tags(2)
+        cls.ingredients = create_ingredients(2)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def post_recipe(self):
+        return self.client.post('/api/recipes/', {
+            'name': 'Рецепт',
+            'text': 'Текст',
+            'cooking_time': 5,
+            'image': image_data(),
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [{'id': ingredient.id, 'amount': 10}
+                            for ingredient in self.ingredients],
+        }, format='json')
+
+    @staticmethod
+    def delete_in_other_process(model, pk):
+        with other_process():
+            model.objects.filter(pk=pk).delete()
+
+    def test_one_query_per_model(self):
+        catalog_objects.get_many(Tag, {tag.id for tag in self.tags})
+        with self.assertNumQueries(1):
+            found = catalog_objects.get_many(Tag,
+                                             {tag.id for tag in self.tags})
+        self.assertEqual(set(found), {tag.id for tag in self.tags})
+
+    def test_deleted_ingredient_rejected(self):
+        self.assertEqual(self.post_recipe().status_code, 201)
+        self.delete_in_other_process(Ingredient, self.ingredients[1].id)
+        response = self.post_recipe()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['ingredients'][0], {})
+        self.assertIn('id', response.data['ingredients'][1])
+
+    def test_deleted_tag_rejected(self):
+        self.assertEqual(self.post_recipe().status_code, 201)
+        self.delete_in_other_process(Tag, self.tags[0].id)
+        response = self.post_recipe()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.data)
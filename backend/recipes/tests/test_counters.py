@@ -0,0 +1,83 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes import counters, shopping_list
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+from .utils import (FoodgramTestCase, create_ingredients, create_recipe,
+                    create_user)
+
+
+class CascadeDeleteTests(FoodgramTestCase):
+    """Удаление рецепта или пользователя не обходит связи по одной."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.ingredients = create_ingredients(3)
+        cls.recipes = [create_recipe(cls.author, cls.ingredients[:number])
+                       for number in (2, 3)]
+        cls.users = [create_user(f'user{number}') for number in range(6)]
+
+    def mark(self, users, recipes):
+        for user in users:
+            for recipe in recipes:
+                Favorite.objects.create(user=user, recipe=recipe)
+                ShoppingCart.objects.create(user=user, recipe=recipe)
+
+    def assert_consistent(self):
+        self.assertEqual(counters.find_drift(Recipe.objects.all(),
+                                             counters.RECIPE_COUNTERS), [])
+        self.assertEqual(counters.find_drift(User.objects.all(),
+                                             counters.USER_COUNTERS), [])
+        self.assertEqual(shopping_list.find_drift(), [])
+
+    def count_queries(self, delete):
+        with CaptureQueriesContext(connection) as context:
+            delete()
+        return len(context)
+
+    def test_recipe_delete_queries_constant(self):
+        first, second = self.recipes
+        self.mark(self.users[:2], [first])
+        self.mark(self.users, [second])
+        few = self.count_queries(first.delete)
+        many = self.count_queries(second.delete)
+        self.assertEqual(few, many)
+        self.assert_consistent()
+
+    def test_recipe_delete_keeps_other_recipes(self):
+        self.mark(self.users[:3], self.recipes)
+        Recipe.objects.filter(pk=self.recipes[0].pk).delete()
+        self.assert_consistent()
+        self.assertEqual(self.users[0].shopping_list.count(), 3)
+        self.assertEqual(User.objects.get(pk=self.author.pk).recipes_count,
+                         1)
+
+    def follow(self, users, author):
+        Follow.objects.bulk_create(Follow(user=user, author=author)
+                                   for user in users)
+        User.objects.filter(pk=author.pk).update(
+            followers_count=len(users)
+        )
+        User.objects.filter(pk__in=[user.pk for user in users]).update(
+            subscriptions_count=1
+        )
+
+    def test_user_delete_queries_constant(self):
+        few, many = self.users[0], self.users[1]
+        for user, others in ((few, self.users[2:3]),
+                             (many, self.users[2:])):
+            self.mark([user], self.recipes)
+            self.follow(others, user)
+            Follow.objects.create(user=user, author=self.author)
+        self.assertEqual(self.count_queries(few.delete),
+                         self.count_queries(many.delete))
+        self.assert_consistent()
+
+    def test_author_delete(self):
+        self.mark(self.users[:3], self.recipes)
+        self.follow(self.users[:3], self.author)
+        User.objects.filter(pk=self.author.pk).delete()
+        self.assertFalse(Recipe.objects.exists())
+        self.assert_consistent()
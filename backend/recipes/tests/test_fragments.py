@@ -0,0 +1,84 @@
+import json
+
+from django.core.cache import cache
+
+from backend.constants import RECIPE_FRAGMENT_TIMEOUT
+from recipes.fragments import fragment_key, get_stats, invalidate_fragment
+from recipes.models import Ingredient, Recipe
+from .utils import (FoodgramTestCase, create_ingredients, create_recipe,
+                    create_tags, create_user)
+
+
+class RecipeFragmentTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = create_tags(2)
+        cls.ingredients = create_ingredients(3)
+        cls.recipe = create_recipe(cls.author, cls.ingredients[:2],
+                                   cls.tags[:1])
+
+    def get_recipe(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_fragment_cached(self):
+        self.get_recipe()
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertIn(fragment_key(recipe), cache)
+
+    def test_old_fragment_written_after_change_is_not_read(self):
+        old = self.get_recipe()
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        self.recipe.tags.set(self.tags)
+        invalidate_fragment(self.recipe.id)
+        cache.set(fragment_key(stale), dict(old), RECIPE_FRAGMENT_TIMEOUT)
+        tags = [tag['id'] for tag in self.get_recipe()['tags']]
+        self.assertEqual(tags, [tag.id for tag in self.tags])
+
+    def test_update_through_api(self):
+        self.get_recipe()
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            {'tags': [self.tags[1].id],
+             'ingredients': [{'id': self.ingredients[2].id, 'amount': 5}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        for data in (response.data, self.get_recipe()):
+            self.assertEqual([tag['id'] for tag in data['tags']],
+                             [self.tags[1].id])
+            self.assertEqual(
+                [(item['id'], item['amount'])
+                 for item in data['ingredients']],
+                [(self.ingredients[2].id, 5)]
+            )
+
+    def test_catalog_change(self):
+        self.get_recipe()
+        ingredient = Ingredient.objects.get(pk=self.ingredients[0].pk)
+        ingredient.name = 'Мука'
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+        names = [item['name'] for item in self.get_recipe()['ingredients']]
+        self.assertIn('Мука', names)
+
+    def test_hits_and_misses_reported(self):
+        before = get_stats()
+        with self.assertLogs('backend.requests', 'INFO') as logs:
+            first = self.client.get(f'/api/recipes/{self.recipe.id}/')
+            second = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertIn('fragments;desc="hits=0 misses=1"',
+                      first['Server-Timing'])
+        self.assertIn('fragments;desc="hits=1 misses=0"',
+                      second['Server-Timing'])
+        logged = [json.loads(record.getMessage())['fragments']
+                  for record in logs.records]
+        self.assertEqual(logged, [{'hits': 0, 'misses': 1},
+                                  {'hits': 1, 'misses': 0}])
+        after = get_stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
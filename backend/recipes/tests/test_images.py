@@ -0,0 +1,138 @@
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+
+from backend.constants import RECIPE_IMAGE_VARIANTS
+from recipes import images
+from recipes.images import (available_extensions, process_recipe_image,
+                            store_variants, variant_path)
+from recipes.models import Recipe
+from .utils import (FoodgramTestCase, create_ingredients, create_tags,
+                    create_user, image_data)
+
+EXIF_ORIENTATION = 0x0112
+ROTATED_90 = 6
+
+
+def jpeg_with_exif(size=(2000, 1000)):
+    image = Image.new('RGB', size, (10, 200, 10))
+    exif = image.getexif()
+    exif[EXIF_ORIENTATION] = ROTATED_90
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class StoreVariantsTests(FoodgramTestCase):
+
+    def open_variant(self, image_hash, variant, extension='jpg'):
+        with default_storage.open(
+            variant_path(image_hash, variant, extension)
+        ) as file:
+            image = Image.open(BytesIO(file.read()))
+            image.load()
+        return image
+
+    def test_variants_sized_and_stripped(self):
+        image_hash = store_variants(jpeg_with_exif())
+        for variant, (width, height) in RECIPE_IMAGE_VARIANTS.items():
+            for extension in available_extensions():
+                image = self.open_variant(image_hash, variant, extension)
+                self.assertLessEqual(image.width, width)
+                self.assertLessEqual(image.height, height)
+                self.assertGreater(image.height, image.width)
+                self.assertNotIn(EXIF_ORIENTATION, image.getexif())
+
+    def test_duplicate_content_stored_once(self):
+        content = jpeg_with_exif()
+        image_hash = store_variants(content)
+        with mock.patch.object(default_storage, 'save') as save:
+            self.assertEqual(store_variants(content), image_hash)
+        save.assert_not_called()
+
+
+class RecipeImageProcessingTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = create_tags(1)
+        cls.ingredients = create_ingredients(1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def post_recipe(self, image):
+        response = self.client.post('/api/recipes/', {
+            'name': 'Рецепт',
+            'text': 'Текст',
+            'cooking_time': 5,
+            'image': image,
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 10}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(pk=response.data['id'])
+
+    def test_upload_processed_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe = self.post_recipe(image_data())
+        upload = recipe.image.name
+        self.assertEqual(recipe.image_hash, '')
+        response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertTrue(response.data['image'].endswith(upload))
+        for callback in callbacks:
+            callback()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name,
+                         variant_path(recipe.image_hash, 'full'))
+        self.assertFalse(default_storage.exists(upload))
+        detail = self.client.get(f'/api/recipes/{recipe.id}/').data
+        listed = self.client.get('/api/recipes/').data['results'][0]
+        self.assertTrue(detail['image'].endswith(
+            variant_path(recipe.image_hash, 'full')
+        ))
+        self.assertTrue(listed['image'].endswith(
+            variant_path(recipe.image_hash, 'card')
+        ))
+
+    def test_same_image_shared(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.post_recipe(image_data())
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.post_recipe(image_data())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image_hash, second.image_hash)
+        self.assertEqual(first.image.name, second.image.name)
+
+    def test_image_replaced_during_processing(self):
+        with self.captureOnCommitCallbacks():
+            recipe = self.post_recipe(image_data())
+        replacement = default_storage.save('recipes/images/new.png',
+                                           ContentFile(b'new'))
+        real_store = images.store_variants
+
+        def replaced_meanwhile(content):
+            Recipe.objects.filter(pk=recipe.pk).update(image=replacement)
+            return real_store(content)
+
+        with mock.patch.object(images, 'store_variants', replaced_meanwhile):
+            process_recipe_image(recipe.id)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, replacement)
+        self.assertEqual(recipe.image_hash, '')
+
+    def test_command_processes_pending(self):
+        with self.captureOnCommitCallbacks():
+            recipe = self.post_recipe(image_data((1, 2, 3)))
+        output = StringIO()
+        call_command('process_recipe_images', stdout=output)
+        self.assertIn('Обработано картинок: 1', output.getvalue())
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.image_hash, '')
@@ -0,0 +1,56 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from recipes.models import Ingredient
+from .utils import FoodgramTestCase, create_ingredients
+
+MATCHES_COUNT = 60
+
+
+class IngredientSearchTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_ingredients(MATCHES_COUNT, prefix='Соль')
+        create_ingredients(3, prefix='Сахар')
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    def search(self, name):
+        response = self.client.get('/api/ingredients/', {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_returns_all_matches(self):
+        names = self.search('сол')
+        self.assertEqual(len(names), MATCHES_COUNT + 1)
+        self.assertTrue(all(name.casefold().startswith('сол')
+                            for name in names))
+
+    def test_exact_and_shorter_names_first(self):
+        names = self.search('Соль')
+        self.assertEqual(names[:3], ['соль', 'Соль 0', 'Соль 1'])
+        self.assertEqual(names[-1], f'Соль {MATCHES_COUNT - 1}')
+
+    def test_no_matches(self):
+        self.assertEqual(self.search('перец'), [])
+
+    def test_new_ingredient_found_after_catalog_change(self):
+        self.assertEqual(self.search('перец'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Перец', measurement_unit='г')
+        self.assertEqual(self.search('перец'), ['Перец'])
+
+
+class BenchmarkIngredientSearchTests(FoodgramTestCase):
+
+    def test_runs(self):
+        create_ingredients(5)
+        output = StringIO()
+        call_command('benchmark_ingredient_search', queries=20,
+                     stdout=output)
+        self.assertIn('индекс в памяти', output.getvalue())
+
+    def test_empty_catalog(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_ingredient_search', stdout=StringIO())
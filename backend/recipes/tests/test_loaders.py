@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from recipes.catalog import get_catalog_version
+from recipes.loaders import LoaderError, iter_json_array
+from recipes.models import Ingredient, Tag
+from .utils import FoodgramTestCase
+
+INGREDIENTS = [
+    {'name': 'Молоко', 'measurement_unit': 'мл'},
+    {'name': 'Мука', 'measurement_unit': 'г'},
+    {'name': 'Яйцо', 'measurement_unit': 'шт.'},
+]
+INVALID = [{'name': '', 'measurement_unit': 'г'}, {'name': 'Соль'}, 'соль']
+
+
+class IterJsonArrayTests(FoodgramTestCase):
+
+    def test_small_reads(self):
+        data = json.dumps([*INGREDIENTS, {'name': 'Текст, [с] "скобками"'}])
+        for read_size in (1, 7, len(data)):
+            with self.subTest(read_size=read_size):
+                self.assertEqual(
+                    list(iter_json_array(StringIO(data), read_size)),
+                    json.loads(data)
+                )
+
+    def test_malformed(self):
+        for data in ('{"name": "Мука"}', '[{"name": "Мука"}', '[{"name": }]'):
+            with self.subTest(data=data), self.assertRaises(LoaderError):
+                list(iter_json_array(StringIO(data), 4))
+
+
+class LoadJsonCommandTests(FoodgramTestCase):
+    """Команда load_json потоково и повторно загружает справочники."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def load(self, *args, **options):
+        output = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('load_json', *args, stdout=output, **options)
+        return output.getvalue()
+
+    def ingredients(self):
+        return list(Ingredient.objects.order_by('name').values(
+            'name', 'measurement_unit'
+        ))
+
+    def test_formats(self):
+        csv_rows = ''.join(f'{item["name"]},{item["measurement_unit"]}\n'
+                           for item in INGREDIENTS)
+        files = {
+            'ingredients.json': json.dumps(INGREDIENTS + INVALID),
+            'ingredients.ndjson': '\n'.join(
+                json.dumps(item) for item in INGREDIENTS + INVALID
+            ),
+            'ingredients.csv': f'name,measurement_unit\n{csv_rows},г\n',
+        }
+        for name, content in files.items():
+            with self.subTest(name=name):
+                Ingredient.objects.all().delete()
+                output = self.load(self.write(name, content), batch_size=2)
+                self.assertEqual(self.ingredients(), INGREDIENTS)
+                self.assertIn('Добавлено: 3', output)
+
+    def test_reload_skips_existing(self):
+        path = self.write('ingredients.json', json.dumps(INGREDIENTS[:2]))
+        self.load(path)
+        version = get_catalog_version()
+        path = self.write('ingredients.json', json.dumps(INGREDIENTS))
+        self.assertIn('Добавлено: 1, уже были в базе: 2', self.load(path))
+        self.assertEqual(self.ingredients(), INGREDIENTS)
+        self.assertGreater(get_catalog_version(), version)
+        version = get_catalog_version()
+        self.assertIn('Добавлено: 0', self.load(path))
+        self.assertEqual(get_catalog_version(), version)
+
+    def test_dry_run(self):
+        path = self.write('ingredients.json',
+                          json.dumps(INGREDIENTS + INVALID))
+        output = self.load(path, dry_run=True)
+        self.assertIn('Проверено строк: 6, отклонено: 3', output)
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_tags(self):
+        tags = [{'name': 'Завтрак', 'color': '#E26C2D', 'slug': 'breakfast'}]
+        self.load(self.write('tags.json', json.dumps(tags)), catalog='tags')
+        self.assertEqual(
+            list(Tag.objects.values('name', 'color', 'slug')), tags
+        )
+
+    def test_errors(self):
+        path = self.write('ingredients.json', '[{"name": "Мука"')
+        with self.assertRaises(CommandError):
+            self.load(path)
+        with self.assertRaises(CommandError):
+            self.load(os.path.join(self.directory, 'missing.json'))
+        with self.assertRaises(CommandError):
+            self.load(path, batch_size=0)
@@ -0,0 +1,58 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.db import connection
+
+from recipes.models import FeedEntry
+from users.models import Follow, User
+from .utils import FoodgramTestCase, create_recipe, create_user
+
+feed_migration = import_module('recipes.migrations.0008_feedentry')
+
+
+class FillFeedsTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.author = create_user('author')
+        cls.popular = create_user('popular')
+        cls.recipes = [create_recipe(cls.author) for _ in range(3)]
+        create_recipe(cls.popular)
+        for author in (cls.author, cls.popular):
+            Follow.objects.create(user=cls.reader, author=author)
+        FeedEntry.objects.all().delete()
+        User.objects.filter(pk=cls.popular.pk).update(followers_count=10001)
+
+    def test_fills_latest_recipes_in_one_query(self):
+        with mock.patch.object(feed_migration, 'FEED_BACKFILL_SIZE', 2):
+            with self.assertNumQueries(1):
+                feed_migration.fill_feeds(
+                    apps, mock.Mock(connection=connection)
+                )
+        entries = FeedEntry.objects.order_by('-pub_date', '-recipe_id')
+        self.assertEqual(
+            list(entries.values_list('user_id', 'author_id', 'recipe_id')),
+            [(self.reader.id, self.author.id, recipe.id)
+             for recipe in reversed(self.recipes[1:])]
+        )
+
+
+class RecipeSearchIndexTests(FoodgramTestCase):
+    """Индекс из миграции 0009 поддерживается при изменении рецептов."""
+
+    def search(self, query):
+        response = self.client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def test_search_follows_changes(self):
+        recipe = create_recipe(create_user('author'), name='Борщ')
+        self.assertEqual(self.search('борщ'), ['Борщ'])
+        recipe.name = 'Щи'
+        recipe.save()
+        self.assertEqual(self.search('борщ'), [])
+        self.assertEqual(self.search('щи'), ['Щи'])
+        recipe.delete()
+        self.assertEqual(self.search('щи'), [])
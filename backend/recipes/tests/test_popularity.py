@@ -0,0 +1,84 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from recipes.models import Favorite, RecipePopularity, ShoppingCart
+from recipes.popularity import decay, refresh
+from .utils import FoodgramTestCase, create_recipe, create_user
+
+
+class PopularityTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.users = [create_user(f'user{number}') for number in range(3)]
+        cls.recipes = [create_recipe(cls.author, name=f'Рецепт {number}')
+                       for number in range(3)]
+
+    def setUp(self):
+        super().setUp()
+        self.start = timezone.now()
+
+    def refresh_at(self, seconds, rebuild=False):
+        moment = self.start + timedelta(seconds=seconds)
+        with mock.patch('recipes.popularity.timezone.now',
+                        return_value=moment):
+            return refresh(rebuild=rebuild)
+
+    def add_event(self, model, user, recipe, seconds):
+        event = model.objects.create(user=user, recipe=recipe)
+        model.objects.filter(pk=event.pk).update(
+            created=self.start + timedelta(seconds=seconds)
+        )
+
+    def scores(self):
+        return dict(RecipePopularity.objects.values_list('recipe_id',
+                                                         'score'))
+
+    def test_event_committed_after_refresh(self):
+        first, second, _ = self.recipes
+        self.add_event(Favorite, self.users[0], first, -3600)
+        self.refresh_at(0)
+        self.add_event(Favorite, self.users[0], second, -30)
+        self.refresh_at(60)
+        self.assertAlmostEqual(self.scores()[second.id], decay(90))
+
+    def test_events_counted_once(self):
+        recipe = self.recipes[0]
+        self.add_event(Favorite, self.users[0], recipe, -7200)
+        self.add_event(ShoppingCart, self.users[1], recipe, -60)
+        for seconds in (0, 300, 900, 3600):
+            self.refresh_at(seconds)
+            self.assertAlmostEqual(
+                self.scores()[recipe.id],
+                decay(7200 + seconds) + decay(60 + seconds)
+            )
+
+    def test_incremental_matches_rebuild(self):
+        pairs = [(user, recipe) for user in self.users
+                 for recipe in self.recipes]
+        events = ((Favorite, -86400), (Favorite, -600), (ShoppingCart, -5),
+                  (Favorite, 200), (ShoppingCart, 1000), (Favorite, 4000))
+        for (user, recipe), (model, seconds) in zip(pairs, events):
+            self.add_event(model, user, recipe, seconds)
+        for seconds in (0, 500, 1500, 5000):
+            self.refresh_at(seconds)
+        incremental = self.scores()
+        self.refresh_at(5000, rebuild=True)
+        rebuilt = self.scores()
+        self.assertEqual(incremental.keys(), rebuilt.keys())
+        for recipe_id, score in rebuilt.items():
+            self.assertAlmostEqual(incremental[recipe_id], score)
+
+    def test_popular_endpoint(self):
+        first, second, third = self.recipes
+        for user in self.users:
+            self.add_event(Favorite, user, second, -60)
+        self.add_event(Favorite, self.users[0], first, -60)
+        self.refresh_at(0)
+        response = self.client.get('/api/recipes/popular/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([recipe['id'] for recipe in response.data['results']],
+                         [second.id, first.id])
@@ -0,0 +1,146 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from backend.constants import BULK_RELATIONS_LIMIT
+from recipes import counters, relations, shopping_list
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+from .utils import (FoodgramTestCase, create_ingredients, create_recipe,
+                    create_user)
+
+MISSING_ID = 10 ** 6
+
+
+class RelationEndpointsTests(FoodgramTestCase):
+    """Избранное, корзина и подписки меняются одним запросом на список."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.user = create_user('user')
+        cls.authors = [create_user(f'author{number}') for number in range(3)]
+        ingredients = create_ingredients(3)
+        cls.recipes = [create_recipe(cls.author, ingredients[:number])
+                       for number in range(1, 6)]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def assert_consistent(self):
+        self.assertEqual(counters.find_drift(Recipe.objects.all(),
+                                             counters.RECIPE_COUNTERS), [])
+        self.assertEqual(counters.find_drift(User.objects.all(),
+                                             counters.USER_COUNTERS), [])
+        self.assertEqual(shopping_list.find_drift(), [])
+
+    def ids(self, recipes):
+        return [recipe.id for recipe in recipes]
+
+    def test_duplicate_post_rejected(self):
+        for name in ('favorite', 'shopping_cart'):
+            url = f'/api/recipes/{self.recipes[0].id}/{name}/'
+            with self.subTest(name=name):
+                self.assertEqual(self.client.post(url).status_code, 201)
+                self.assertEqual(self.client.post(url).status_code, 400)
+                self.assertEqual(self.client.delete(url).status_code, 204)
+                self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(self.client.post(
+            f'/api/recipes/{MISSING_ID}/favorite/'
+        ).status_code, 404)
+        self.assert_consistent()
+
+    def test_bulk_add_and_remove(self):
+        for name, model in (('favorite', Favorite),
+                            ('shopping_cart', ShoppingCart)):
+            url = f'/api/recipes/{name}/'
+            existing, *rest = self.ids(self.recipes)
+            with self.subTest(name=name):
+                self.client.post(f'/api/recipes/{existing}/{name}/')
+                response = self.client.post(url, {
+                    'ids': [existing, *rest, rest[0], MISSING_ID]
+                }, format='json')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['added'], rest)
+                self.assertEqual(
+                    model.objects.filter(user=self.user).count(),
+                    len(self.recipes)
+                )
+                self.assert_consistent()
+                response = self.client.delete(url, {
+                    'ids': [*rest[:2], MISSING_ID]
+                }, format='json')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['removed'], rest[:2])
+                self.assert_consistent()
+
+    def test_bulk_queries_constant(self):
+        def count_queries(recipes):
+            with CaptureQueriesContext(connection) as context:
+                self.client.post('/api/recipes/favorite/',
+                                 {'ids': self.ids(recipes)}, format='json')
+            return len(context)
+
+        self.assertEqual(count_queries(self.recipes[:1]),
+                         count_queries(self.recipes[1:]))
+
+    def test_bulk_without_returning(self):
+        with mock.patch.object(relations, 'returns_rows', return_value=False):
+            response = self.client.post('/api/recipes/shopping_cart/', {
+                'ids': [*self.ids(self.recipes[:2]), MISSING_ID]
+            }, format='json')
+            self.assertEqual(response.data['added'],
+                             self.ids(self.recipes[:2]))
+            response = self.client.delete('/api/recipes/shopping_cart/', {
+                'ids': self.ids(self.recipes)
+            }, format='json')
+            self.assertEqual(response.data['removed'],
+                             self.ids(self.recipes[:2]))
+        self.assert_consistent()
+
+    def test_bulk_ids_validated(self):
+        for ids in ([], [0], ['один'], [1] * (BULK_RELATIONS_LIMIT + 1)):
+            with self.subTest(ids=ids):
+                response = self.client.post('/api/recipes/favorite/',
+                                            {'ids': ids}, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.client.post('/api/recipes/favorite/').status_code, 400
+        )
+
+    def test_bulk_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.post('/api/recipes/favorite/',
+                                    {'ids': [self.recipes[0].id]},
+                                    format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_subscribe(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.post(
+            f'/api/users/{self.user.id}/subscribe/'
+        ).status_code, 400)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assert_consistent()
+
+    def test_bulk_subscribe(self):
+        author_ids = [author.id for author in self.authors]
+        self.client.post(f'/api/users/{author_ids[0]}/subscribe/')
+        response = self.client.post('/api/users/subscribe/', {
+            'ids': [*author_ids, self.user.id, MISSING_ID]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added'], author_ids[1:])
+        self.assertEqual(Follow.objects.filter(user=self.user).count(),
+                         len(author_ids))
+        self.assert_consistent()
+        response = self.client.delete('/api/users/subscribe/',
+                                      {'ids': author_ids}, format='json')
+        self.assertEqual(response.data['removed'], author_ids)
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+        self.assert_consistent()
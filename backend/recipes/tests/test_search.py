@@ -0,0 +1,73 @@
+from django.db import connection
+
+from recipes.models import Recipe
+from recipes.search import search_recipes
+from .utils import FoodgramTestCase, create_recipe, create_user
+
+URL = '/api/recipes/'
+TIED_COUNT = 5
+
+
+class RankedSearchTests(FoodgramTestCase):
+    """Поиск упорядочивает рецепты по релевантности."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.in_text = create_recipe(author, name='Суп',
+                                    text='Почти как борщ, но без свеклы')
+        cls.in_name = create_recipe(author, name='Борщ',
+                                    text='Свекла, капуста и картофель')
+        cls.unrelated = create_recipe(author, name='Сырники',
+                                      text='Творог и яйца')
+        cls.tied = [create_recipe(author, name='Окрошка',
+                                  text='Квас и овощи').id
+                    for _ in range(TIED_COUNT)]
+
+    def search(self, query):
+        return list(search_recipes(
+            Recipe.objects.all(), query, connection
+        ).order_by('-search_rank').values_list('id', 'search_rank'))
+
+    def test_name_outranks_text(self):
+        (first, first_rank), (second, second_rank) = self.search('борщ')
+        self.assertEqual([first, second], [self.in_name.id, self.in_text.id])
+        self.assertGreater(first_rank, second_rank)
+
+    def test_no_match(self):
+        self.assertEqual(self.search('пельмени'), [])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_api_orders_by_rank(self):
+        response = self.client.get(URL, {'search': 'борщ'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.in_name.id, self.in_text.id]
+        )
+
+    def test_keyset_pages_over_rank(self):
+        response = self.client.get(
+            URL, {'search': 'окрошка', 'cursor': '', 'limit': 2}
+        )
+        seen = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen += [recipe['id'] for recipe in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, sorted(self.tied, reverse=True))
+
+    def test_keyset_previous_page_over_rank(self):
+        first = self.client.get(
+            URL, {'search': 'борщ', 'cursor': '', 'limit': 1}
+        ).data
+        second = self.client.get(first['next']).data
+        self.assertEqual(
+            [first['results'][0]['id'], second['results'][0]['id']],
+            [self.in_name.id, self.in_text.id]
+        )
+        self.assertIsNone(second['next'])
+        previous = self.client.get(second['previous']).data
+        self.assertEqual(previous['results'], first['results'])
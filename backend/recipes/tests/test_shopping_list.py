@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import RecipeIngredient, ShoppingListItem
+from recipes.shopping_list import find_drift
+from .utils import (FoodgramTestCase, create_ingredients, create_recipe,
+                    create_tags, create_user)
+
+
+class ShoppingListTests(FoodgramTestCase):
+    """Список покупок меняется вместе с корзиной и рецептами в ней."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.user = create_user('user')
+        cls.tags = create_tags(1)
+        cls.ingredients = create_ingredients(3)
+        cls.first = create_recipe(cls.author, cls.ingredients[:2], cls.tags)
+        cls.second = create_recipe(cls.author, cls.ingredients[1:], cls.tags)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def items(self, user=None):
+        return dict(ShoppingListItem.objects.filter(
+            user=user or self.user
+        ).values_list('ingredient_id', 'amount'))
+
+    def add_to_cart(self, recipe):
+        response = self.client.post(
+            f'/api/recipes/{recipe.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_add_and_remove(self):
+        first, second, third = (ingredient.id
+                                for ingredient in self.ingredients)
+        self.add_to_cart(self.first)
+        self.add_to_cart(self.second)
+        self.assertEqual(self.items(), {first: 10, second: 20, third: 10})
+        response = self.client.delete(
+            f'/api/recipes/{self.first.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.items(), {second: 10, third: 10})
+        self.client.delete(f'/api/recipes/{self.second.id}/shopping_cart/')
+        self.assertEqual(self.items(), {})
+        self.assertEqual(find_drift(), [])
+
+    def test_recipe_edit_updates_carts(self):
+        self.add_to_cart(self.first)
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(f'/api/recipes/{self.first.id}/', {
+            'name': 'Рецепт',
+            'text': 'Текст рецепта',
+            'cooking_time': 10,
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [{'id': self.ingredients[1].id, 'amount': 15},
+                            {'id': self.ingredients[2].id, 'amount': 5}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.items(), {self.ingredients[1].id: 15,
+                                        self.ingredients[2].id: 5})
+        self.assertEqual(find_drift(), [])
+
+    def test_download_reads_stored_list(self):
+        self.add_to_cart(self.first)
+        self.add_to_cart(self.second)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                '/api/recipes/download_shopping_cart/?format=json'
+            )
+            b''.join(response.streaming_content)
+        tables = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertIn('recipes_shoppinglistitem', tables)
+        self.assertNotIn('recipes_recipeingredient', tables)
+
+
+class CheckShoppingListsTests(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.recipe = create_recipe(cls.user, create_ingredients(2))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+
+    def test_consistent(self):
+        call_command('check_shopping_lists', stdout=StringIO())
+
+    def test_drift_detected_and_fixed(self):
+        RecipeIngredient.objects.filter(recipe=self.recipe).update(amount=7)
+        with self.assertRaises(CommandError):
+            call_command('check_shopping_lists', stdout=StringIO())
+        self.assertEqual(find_drift(), [self.user.id])
+        call_command('check_shopping_lists', fix=True, stdout=StringIO())
+        self.assertEqual(find_drift(), [])
+        self.assertEqual(
+            set(ShoppingListItem.objects.values_list('amount', flat=True)),
+            {7}
+        )
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import override_settings
+
+from recipes import similar
+from recipes.models import RecipeIngredient
+from recipes.similar import SimilarIndex
+from .utils import (FoodgramTestCase, create_ingredients, create_recipe,
+                    create_user)
+
+
+class SimilarIndexTests(FoodgramTestCase):
+    """Журнал изменений читают другие процессы — другие объекты индекса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.ingredients = create_ingredients(6)
+        cls.first = create_recipe(cls.author, cls.ingredients[:4])
+        cls.second = create_recipe(cls.author, cls.ingredients[:3])
+        cls.other = create_recipe(cls.author, cls.ingredients[4:])
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.index = SimilarIndex(self.directory)
+
+    def similar_ids(self, recipe, index=None):
+        index = index or SimilarIndex(self.directory)
+        return [recipe_id for recipe_id, _ in index.similar(recipe.id, 10)]
+
+    def test_without_snapshot(self):
+        self.assertEqual(self.similar_ids(self.first, self.index), [])
+        self.assertFalse(os.path.exists(self.index.snapshot_path))
+
+    def test_outdated_snapshot(self):
+        self.index.build()
+        with mock.patch.object(similar, 'SNAPSHOT_FORMAT', (0,)):
+            self.assertEqual(self.similar_ids(self.first), [])
+        self.assertEqual(self.similar_ids(self.first), [self.second.id])
+
+    def test_journal_replay(self):
+        self.index.build()
+        reader = SimilarIndex(self.directory)
+        self.assertEqual(self.similar_ids(self.first, reader),
+                         [self.second.id])
+        created = create_recipe(self.author, self.ingredients[:4])
+        self.index.update([created.id])
+        self.assertEqual(self.similar_ids(self.first, reader),
+                         [created.id, self.second.id])
+        RecipeIngredient.objects.filter(recipe=self.second).delete()
+        self.index.update([self.second.id])
+        self.assertEqual(self.similar_ids(self.first, reader), [created.id])
+        created_id = created.id
+        created.delete()
+        self.index.update([created_id])
+        self.assertEqual(self.similar_ids(self.first, reader), [])
+
+    def test_build_keeps_changes_made_during_build(self):
+        self.index.build()
+        created = create_recipe(self.author, self.ingredients[:4])
+        recipe_sets = similar.recipe_sets
+
+        def concurrent_change(recipe_ids=None):
+            sets = recipe_sets(recipe_ids)
+            if recipe_ids is None:
+                sets.pop(created.id)
+                self.index.update([created.id])
+            return sets
+
+        with mock.patch.object(similar, 'recipe_sets', concurrent_change):
+            self.index.build()
+        self.assertEqual(self.similar_ids(self.first),
+                         [created.id, self.second.id])
+        with open(self.index.journal_path, 'rb') as journal:
+            self.assertEqual(len(journal.read().splitlines()), 1)
+
+    def test_similar_endpoint(self):
+        self.index.build()
+        with mock.patch('api.views.similar_index', self.index):
+            response = self.client.get(
+                f'/api/recipes/{self.first.id}/similar/'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([recipe['id'] for recipe in response.data],
+                         [self.second.id])
+
+    @override_settings(QUERY_BUDGETS_STRICT=True)
+    def test_similar_endpoint_within_budget(self):
+        self.index.build()
+        with mock.patch('api.views.similar_index', self.index):
+            for user in (None, self.first.author):
+                self.client.force_authenticate(user)
+                response = self.client.get(
+                    f'/api/recipes/{self.first.id}/similar/'
+                )
+                self.assertEqual(response.status_code, 200)
+            response = self.client.get(
+                f'/api/recipes/{self.first.id + 100}/similar/'
+            )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+from base64 import b64encode
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+def image_data(color=(200, 10, 10)):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'PNG')
+    return f'data:image/png;base64,{b64encode(buffer.getvalue()).decode()}'
+
+
+def create_user(username, **fields):
+    return User.objects.create_user(
+        email=f'{username}@example.com',
+        username=username,
+        first_name='Имя',
+        last_name='Фамилия',
+        password='pass-12345-word',
+        **fields
+    )
+
+
+def create_tags(count):
+    return [Tag.objects.create(name=f'Тег {number}', color='#FFFFFF',
+                               slug=f'tag-{number}')
+            for number in range(count)]
+
+
+def create_ingredients(count, prefix='Ингредиент'):
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'{prefix} {number}', measurement_unit='г')
+        for number in range(count)
+    )
+    return list(Ingredient.objects.filter(name__startswith=prefix)
+                .order_by('id'))
+
+
+def create_recipe(author, ingredients=(), tags=(), **fields):
+    fields.setdefault('name', 'Рецепт')
+    fields.setdefault('text', 'Текст рецепта')
+    recipe = Recipe.objects.create(
+        author=author,
+        image='recipes/images/recipe.png',
+        cooking_time=fields.pop('cooking_time', 10),
+        **fields
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+        for ingredient in ingredients
+    )
+    recipe.tags.set(tags)
+    return recipe
+
+
+class FoodgramTestCase(APITestCase):
+    """Общая настройка тестов API.
+
+    Кеш очищается перед каждым тестом, картинки пишутся во временный
+    каталог, фоновые задачи выполняются синхронно.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+        cls.executor_patch = mock.patch('recipes.tasks.executor', None)
+        cls.executor_patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor_patch.stop()
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
@@ -1,28 +1,36 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from recipes.admin_tools import LargeTableAdminMixin, input_filter
 from .models import User, Follow
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
     list_display = ('id', 'username',
                     'email', 'first_name',
                     'last_name', 'get_follow_count', 'get_recipes_count')
-    list_filter = ('username', 'email',)
+    list_filter = (
+        input_filter('Имя пользователя', 'username',
+                     'username__istartswith'),
+        input_filter('Почта', 'email', 'email__istartswith'),
+    )
 
     def get_follow_count(self, obj):
-        return obj.follower.count()
+        return obj.subscriptions_count
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     get_follow_count.short_description = 'Количество подписок'
     get_recipes_count.short_description = 'Количество рецептов'
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'author')
-    list_filter = ('user',)
-    search_fields = ('user', 'author',)
+    list_filter = (input_filter('Пользователь', 'user', 'user__username',
+                                'user__email'),)
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username',)
+    autocomplete_fields = ('user', 'author')
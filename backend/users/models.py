@@ -1,11 +1,22 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import RegexValidator
 from django.db import models
 
 from backend.constants import EMAIL_LENGTH, PERSONAL_FIELDS_LENGTH, REPR_SIZE
+from backend.deletion import CascadeModelMixin, CascadeQuerySet
 
 
-class User(AbstractUser):
+class UserQuerySet(CascadeQuerySet):
+
+    def cascade_user_ids(self):
+        return self.values_list('pk', flat=True)
+
+
+class CascadeUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
+class User(CascadeModelMixin, AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name', 'password')
 
@@ -24,6 +35,23 @@ class User(AbstractUser):
                                  verbose_name='Фамилия')
     password = models.CharField(max_length=PERSONAL_FIELDS_LENGTH,
                                 verbose_name='Пароль')
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписок'
+    )
+
+    objects = CascadeUserManager()
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -33,6 +61,9 @@ class User(AbstractUser):
     def __str__(self):
         return self.username[:REPR_SIZE]
 
+    def cascade_user_ids(self):
+        return (self.pk,)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(User,